@@ -0,0 +1,136 @@
+""" Benchmark loading pgdf files of increasing size.
+Synthetic Gemini files are written to a temporary directory, then each
+is loaded with PGDF. Prints objects per second, MB per second and the
+peak memory traced while loading.
+
+With --save the results are written as JSON. With --baseline the run is
+compared against saved results, and exits with an error if the objects
+per second of any size have dropped by more than --tolerance, so it can
+catch slowdowns in CI.
+
+Example usage:
+    python bench/bench_pgdf.py --sizes 1000 10000 --save results.json
+    python bench/bench_pgdf.py --baseline results.json --tolerance 0.25
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from pypam.pgdf import PGDF
+from pypam.synthetic import write_gemini_pgdf
+
+
+def load_time(pgdf_path: str, repeats: int, memory_map: bool) -> float:
+    """Best time, in seconds, of loading the file."""
+    best = None
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        PGDF(pgdf_path, memory_map=memory_map)
+        taken = time.perf_counter() - start
+        best = taken if best is None else min(best, taken)
+
+    return best
+
+
+def peak_memory(pgdf_path: str, memory_map: bool) -> int:
+    """The peak bytes allocated by Python while loading the file. This
+    is a separate run, as tracing slows the load down."""
+    tracemalloc.start()
+
+    try:
+        PGDF(pgdf_path, memory_map=memory_map)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(sizes, num_points: int, repeats: int, memory_map: bool) -> list:
+    """Benchmark a file of each size, returning a dict per size."""
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_objects in sizes:
+            pgdf_path = os.path.join(tmp_dir, str(num_objects) + ".pgdf")
+            write_gemini_pgdf(pgdf_path, num_objects=num_objects, num_points=num_points)
+            mb = os.path.getsize(pgdf_path) / 1e6
+            taken = load_time(pgdf_path, repeats, memory_map)
+            results.append(
+                {
+                    "objects": num_objects,
+                    "points": num_points,
+                    "mb": round(mb, 3),
+                    "seconds": taken,
+                    "objects_per_s": num_objects / taken,
+                    "mb_per_s": mb / taken,
+                    "peak_mb": peak_memory(pgdf_path, memory_map) / 1e6,
+                }
+            )
+            os.remove(pgdf_path)
+
+    return results
+
+
+def regressions(results: list, baseline: list, tolerance: float) -> list:
+    """The sizes whose objects per second fell by more than tolerance
+    (a fraction) against the baseline."""
+    before = {(r["objects"], r["points"]): r["objects_per_s"] for r in baseline}
+    slower = []
+
+    for r in results:
+        key = (r["objects"], r["points"])
+
+        if key in before and r["objects_per_s"] < before[key] * (1 - tolerance):
+            slower.append(r["objects"])
+
+    return slower
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="bench_pgdf",
+        description="Time loading synthetic pgdf files of increasing size",
+        epilog="SMRU St Andrews",
+    )
+
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000]
+    )
+    parser.add_argument("--points", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--no-mmap", action="store_true")
+    parser.add_argument("--save")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.points, args.repeats, not args.no_mmap)
+    print("objects,MB,objects/s,MB/s,peak MB")
+
+    for r in results:
+        print(
+            r["objects"],
+            r["mb"],
+            round(r["objects_per_s"]),
+            round(r["mb_per_s"], 1),
+            round(r["peak_mb"], 1),
+            sep=",",
+        )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(results, json.load(f), args.tolerance)
+
+        if len(slower) > 0:
+            print("Slower than the baseline for sizes:", slower)
+            sys.exit(1)
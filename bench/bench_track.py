@@ -0,0 +1,63 @@
+""" Benchmark the cost of building Gemini tracks.
+Prints the time per point for tracks of increasing length. This
+should stay roughly flat - it grew with the square of the track
+length when the points were re-sorted after every insert.
+
+Example usage:
+    python bench/bench_track.py --repeats 5
+"""
+
+import struct
+import time
+
+import numpy as np
+
+from pypam.gemini import TRACK_POINT_DTYPE, GeminiData
+
+
+def pack_gemini(times) -> bytes:
+    """Pack a Gemini record with one point per entry in times."""
+    points = np.zeros(len(times), dtype=TRACK_POINT_DTYPE)
+    points["time_millis"] = times
+    body = struct.pack(">ibhfff", len(times), 1, 0, 0, 0, 0) + points.tobytes()
+    return struct.pack(">i", len(body)) + body
+
+
+def build_time(dat: bytes, repeats: int) -> float:
+    """Best time, in seconds, of decoding the record in dat."""
+    best = None
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        GeminiData(dat, 0)
+        taken = time.perf_counter() - start
+        best = taken if best is None else min(best, taken)
+
+    return best
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="bench_track",
+        description="Time building Gemini tracks of increasing length",
+        epilog="SMRU St Andrews",
+    )
+
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print("points,shuffled ns/point,sorted ns/point")
+
+    for num_points in (1000, 10000, 100000, 1000000):
+        times = np.arange(num_points, dtype=np.int64) * 100
+        shuffled = build_time(pack_gemini(rng.permutation(times)), args.repeats)
+        in_order = build_time(pack_gemini(times), args.repeats)
+        print(
+            num_points,
+            round(shuffled / num_points * 1e9, 1),
+            round(in_order / num_points * 1e9, 1),
+            sep=",",
+        )
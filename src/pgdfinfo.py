@@ -31,17 +31,13 @@ if __name__ == "__main__":
 
     print("Tracks")
 
-    tracks = []
     assert p.header.module_type == "Gemini Threshold Detector"
 
-    for obj in p.module.objects:
-        tracks.append(obj)
+    ids = [1861000198, 1861000199, 1861000200, 1861000201, 1861000202]
+    tracks = p.module.find_uids(ids)
 
     # Sort tracks in order of time if not already
     tracks = sorted(tracks, key=lambda track: track.data.track.time_start)
-    
-    ids = [1861000198, 1861000199, 1861000200, 1861000201, 1861000202]
 
     for track in tracks:
-        if track.pam.UID in ids:
-            print(track.pam.UID, track.data.track)
+        print(track.pam.UID, track.data.track)
@@ -0,0 +1,147 @@
+""" Reading pgdf files from asyncio code without blocking the event
+loop.
+
+The decoding is done in an executor - the loop's default thread pool
+unless another is given - a batch of objects at a time, so the loop
+only ever waits on a future. The number of files being read at once is
+bounded by a semaphore.
+
+This module contains the following:
+    - open_pgdf_async - Iterate over the objects of one file
+    - iter_directory_async - Iterate over the objects of many files,
+      reading several at once
+    - load_columns_async - Decode a file into ModuleColumns
+
+Examples:
+
+    >>> from pypam.aio import open_pgdf_async
+    >>> async for obj in open_pgdf_async("test.pgdf"):
+    ...     await store(obj)
+
+"""
+
+__all__ = ["iter_directory_async", "load_columns_async", "open_pgdf_async"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import asyncio
+import itertools
+
+from pypam.columns import ModuleColumns
+from pypam.dataset import PGDFDataset, load_columns
+from pypam.module import PGObject
+from pypam.pgdf import PGDF
+
+
+def _next_batch(records, batch_size: int) -> list:
+    return list(itertools.islice(records, batch_size))
+
+
+async def open_pgdf_async(
+    pgdf_path: str, batch_size=1000, executor=None, records=False
+):
+    """Iterate over the objects of a pgdf file, decoding them off the
+    event loop.
+
+    Args:
+        pgdf_path (str): full path and name of the pgdf file.
+        batch_size (int): the number of records decoded in the executor
+            each time. Larger batches cost less overhead; smaller ones
+            give the loop back more often.
+        executor (concurrent.futures.Executor): where to decode. None
+            uses the loop's default thread pool. This must be a thread
+            pool, as the file is read by a generator that stays open.
+        records (bool): yield every record - headers and footers too -
+            rather than just the PGObjects.
+
+    Yields:
+        PGObject: the objects of the file, in file order.
+    """
+    loop = asyncio.get_running_loop()
+    # Background records are only wanted with the other records
+    iterator = PGDF.iter_objects(pgdf_path, background=records)
+
+    try:
+        while True:
+            batch = await loop.run_in_executor(
+                executor, _next_batch, iterator, batch_size
+            )
+
+            if len(batch) == 0:
+                return
+
+            for record in batch:
+                if records or isinstance(record, PGObject):
+                    yield record
+    finally:
+        # Close the file, even if we stopped early. If we were cancelled
+        # while a batch was decoding, the generator is still running in
+        # the executor and the file is closed when it is collected.
+        try:
+            iterator.close()
+        except ValueError:
+            pass
+
+
+async def load_columns_async(pgdf_path: str, executor=None) -> ModuleColumns:
+    """Decode a whole file into ModuleColumns off the event loop. As the
+    columns pickle cheaply, this works with a process pool too."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, load_columns, pgdf_path)
+
+
+async def iter_directory_async(
+    source, pattern="*.pgdf", max_concurrency=8, batch_size=1000, executor=None
+):
+    """Iterate over the objects of many pgdf files, reading up to
+    max_concurrency of them at once. Objects of one file come in file
+    order, but those of different files are interleaved as they are
+    decoded.
+
+    Args:
+        source (str | list): a directory, a glob pattern or a list of
+            file paths, as for PGDFDataset.
+        pattern (str): the pattern of files to use within a directory.
+        max_concurrency (int): the most files read at once.
+        batch_size (int): as for open_pgdf_async.
+        executor (concurrent.futures.Executor): as for open_pgdf_async.
+
+    Yields:
+        tuple: the path of the file and a PGObject from it.
+    """
+    loop = asyncio.get_running_loop()
+    dataset = await loop.run_in_executor(executor, PGDFDataset, source, pattern)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    # Bounded, so a slow consumer holds up the readers rather than
+    # letting decoded objects pile up.
+    queue = asyncio.Queue(maxsize=max_concurrency * batch_size)
+    done = object()
+
+    async def read(pgdf_path):
+        async with semaphore:
+            async for obj in open_pgdf_async(pgdf_path, batch_size, executor):
+                await queue.put((pgdf_path, obj))
+
+    async def read_all():
+        try:
+            await asyncio.gather(*readers)
+        finally:
+            await queue.put(done)
+
+    readers = [asyncio.ensure_future(read(path)) for path in dataset.paths]
+    finished = asyncio.ensure_future(read_all())
+
+    try:
+        while True:
+            item = await queue.get()
+
+            if item is done:
+                break
+
+            yield item
+
+        # Raise any error from the readers.
+        await finished
+    finally:
+        for task in readers + [finished]:
+            task.cancel()
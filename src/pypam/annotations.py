@@ -2,6 +2,12 @@
 If annotations exist, we read them from the binary file 
 and add them to the end of the pgdf.
 
+Annotations are decoded lazily. Reading an object only copies the
+bytes of its annotations; the id, offset and length of each annotation
+are found the first time they are asked for, and an annotation is only
+decoded when its attribute is accessed. Jobs that never look at the
+annotations pay for little more than the copy.
+
 This module contains the following:
 
     - BeamAnglesAnno
@@ -10,10 +16,13 @@ This module contains the following:
     - ClickClasssifier1Anno
     - MatchedClkClsfrAnno
     - BasicClassificationAnno
+    - DLModelResult
     - DLClassificationAnno
     - UserFormAnno
     - TargetMotionAnno
     - Annotations
+    - ANNOTATION_TYPES
+    - DL_MODEL_TYPES
 
 """
 
@@ -24,18 +33,29 @@ __all__ = [
     "ClickClasssifier1Anno",
     "MatchedClkClsfrAnno",
     "BasicClassificationAnno",
+    "DLModelResult",
     "DLClassificationAnno",
     "UserFormAnno",
     "TargetMotionAnno",
     "Annotations",
+    "ANNOTATION_TYPES",
+    "DL_MODEL_TYPES",
 ]
 __version__ = "0.1"
 __author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
 
 import struct
+
+import numpy as np
+
 from pypam.util.read import read_java_string
 
 
+def _read_floats(dat: bytes, offset: int, count: int) -> np.ndarray:
+    """count big endian floats from offset, as a native float32 array."""
+    return np.frombuffer(dat, ">f4", count, offset).astype(np.float32)
+
+
 class Location:
     """Held inside the Target motion annotation."""
 
@@ -49,17 +69,13 @@ class Location:
 class BeamAnglesAnno:
     def __init__(self, dat: bytes, offset: int):
         ds = offset
-        self.hydrophones = struct.unpack(">I", dat[ds : ds + 4])[0]
-        self.array_type = struct.unpack(">h", dat[ds + 4 : ds + 6])[0]
-        self.localisation_content = struct.unpack(">I", dat[ds + 6 : ds + 10])[0]
-        self.num_angles = struct.unpack(">h", dat[ds + 10 : ds + 12])[0]
+        self.hydrophones = struct.unpack_from(">I", dat, ds)[0]
+        self.array_type = struct.unpack_from(">h", dat, ds + 4)[0]
+        self.localisation_content = struct.unpack_from(">I", dat, ds + 6)[0]
+        self.num_angles = struct.unpack_from(">h", dat, ds + 10)[0]
         ds += 12
-        self.angles = []
-
-        for i in range(self.num_angles):
-            self.angles.append(struct.unpack(">f", dat[ds : ds + 4])[0])
-            ds += 4
-
+        self.angles = _read_floats(dat, ds, self.num_angles)
+        ds += 4 * self.num_angles
         self.length = ds - offset
 
     def __len__(self):
@@ -73,33 +89,23 @@ class BearingAnno:
         ds += dv
         self.algorithm_name = name
         self.version = anno_ver
-        self.hydrophones = struct.unpack(">I", dat[ds : ds + 4])[0]
-        self.array_type = struct.unpack(">h", dat[ds + 4 : ds + 6])[0]
-        self.localisation_content = struct.unpack(">I", dat[ds + 6 : ds + 10])[0]
-        self.num_angles = struct.unpack(">h", dat[ds + 10 : ds + 12])[0]
-        self.angles = []
+        self.hydrophones = struct.unpack_from(">I", dat, ds)[0]
+        self.array_type = struct.unpack_from(">h", dat, ds + 4)[0]
+        self.localisation_content = struct.unpack_from(">I", dat, ds + 6)[0]
+        self.num_angles = struct.unpack_from(">h", dat, ds + 10)[0]
         ds += 12
-
-        for i in range(self.num_angles):
-            self.angles.append(struct.unpack(">f", dat[ds : ds + 4])[0])
-            ds += 4
-
-        self.errors = []
-        self.num_errors = struct.unpack(">h", dat[ds : ds + 2])[0]
+        self.angles = _read_floats(dat, ds, self.num_angles)
+        ds += 4 * self.num_angles
+        self.num_errors = struct.unpack_from(">h", dat, ds)[0]
         ds += 2
-
-        for i in range(self.num_errors):
-            self.errors.append(struct.unpack(">f", dat[ds : ds + 4])[0])
-            ds += 4
+        self.errors = _read_floats(dat, ds, self.num_errors)
+        ds += 4 * self.num_errors
 
         if anno_ver >= 2:
-            self.ref_angles = []
-            self.num_ref_angles = struct.unpack(">h", dat[ds : ds + 2])[0]
+            self.num_ref_angles = struct.unpack_from(">h", dat, ds)[0]
             ds += 2
-
-            for i in range(self.num_ref_angles):
-                self.ref_angles.append(struct.unpack(">f", dat[ds : ds + 4])[0])
-                ds += 4
+            self.ref_angles = _read_floats(dat, ds, self.num_ref_angles)
+            ds += 4 * self.num_ref_angles
 
         self.length = ds - offset
 
@@ -110,21 +116,14 @@ class BearingAnno:
 class TDBLAnno:
     def __init__(self, dat: bytes, offset: int):
         ds = offset
-        self.num_angles = struct.unpack(">h", dat[ds : ds + 2])[0]
+        self.num_angles = struct.unpack_from(">h", dat, ds)[0]
         ds += 2
-        self.angles = []
-
-        for i in range(self.num_angles):
-            self.angles.append(struct.unpack(">f", dat[ds : ds + 4])[0])
-            ds += 4
-
-        self.num_errors = struct.unpack(">h", dat[ds : ds + 2])[0]
+        self.angles = _read_floats(dat, ds, self.num_angles)
+        ds += 4 * self.num_angles
+        self.num_errors = struct.unpack_from(">h", dat, ds)[0]
         ds += 2
-        self.angle_errors = []
-
-        for i in range(self.num_errors):
-            self.angle_errors.append(struct.unpack(">f", dat[ds : ds + 4])[0])
-            ds += 4
+        self.angle_errors = _read_floats(dat, ds, self.num_errors)
+        ds += 4 * self.num_errors
 
         self.length = ds - offset
 
@@ -135,13 +134,11 @@ class TDBLAnno:
 class ClickClasssifier1Anno:
     def __init__(self, dat: bytes, offset: int):
         ds = offset
-        self.num_classifications = struct.unpack(">h", dat[ds : ds + 2])[0]
+        self.num_classifications = struct.unpack_from(">h", dat, ds)[0]
         ds += 2
-        self.classifications = []
-
-        for i in range(self.num_errors):
-            self.classifications.append(struct.unpack(">h", dat[ds : ds + 2])[0])
-            ds += 2
+        n = self.num_classifications
+        self.classifications = list(struct.unpack_from(">" + str(n) + "h", dat, ds))
+        ds += 2 * n
 
         self.length = ds - offset
 
@@ -154,22 +151,22 @@ class MatchedClkClsfrAnno:
         ds = offset
 
         if anno_ver == 1:
-            self.threshold = struct.unpack(">d", dat[ds : ds + 8])[0]
-            self.match_corr = struct.unpack(">d", dat[ds + 8 : ds + 16])[0]
-            self.reject_corr = struct.unpack(">d", dat[ds + 16 : ds + 24])[0]
+            self.threshold = struct.unpack_from(">d", dat, ds)[0]
+            self.match_corr = struct.unpack_from(">d", dat, ds + 8)[0]
+            self.reject_corr = struct.unpack_from(">d", dat, ds + 16)[0]
             ds += 24
 
         elif anno_ver == 2:
-            self.num_templates = struct.unpack(">h", dat[ds : ds + 2])[0]
+            self.num_templates = struct.unpack_from(">h", dat, ds)[0]
             ds += 2
 
             # Tuple of threshold, match_corr and reject_corr
             self.templates = []
 
             for i in range(self.num_templates):
-                threshold = struct.unpack(">d", dat[ds : ds + 8])[0]
-                match_corr = struct.unpack(">d", dat[ds + 8 : ds + 16])[0]
-                reject_corr = struct.unpack(">d", dat[ds + 16 : ds + 24])[0]
+                threshold = struct.unpack_from(">d", dat, ds)[0]
+                match_corr = struct.unpack_from(">d", dat, ds + 8)[0]
+                reject_corr = struct.unpack_from(">d", dat, ds + 16)[0]
                 ds += 24
                 self.templates.append((threshold, match_corr, reject_corr))
 
@@ -186,53 +183,74 @@ class BasicClassificationAnno:
         ds += dv
         self.method, dv = read_java_string(dat, ds)
         ds += dv
-        self.score = struct.unpack(">f", dat[ds : ds + 4])[0]
+        self.score = struct.unpack_from(">f", dat, ds)[0]
+        ds += 4
         self.length = ds - offset
 
     def __len__(self):
         return self.length
 
 
+# The model types of the deep learning classifier
+DL_MODEL_TYPES = {0: "generic", 1: "tensorflow", 2: "dummy"}
+
+# The class ids of each model, by their bytes, so the detections of a
+# model all share one read only array rather than each holding a copy.
+_class_ids = {}
+
+
+def _shared_class_ids(dat: bytes, offset: int, count: int) -> np.ndarray:
+    key = bytes(dat[offset : offset + 2 * count])
+    class_ids = _class_ids.get(key)
+
+    if class_ids is None:
+        class_ids = np.frombuffer(key, ">i2").astype(np.int16)
+        class_ids.flags.writeable = False
+        _class_ids[key] = class_ids
+
+    return class_ids
+
+
+class DLModelResult:
+    """The result of one deep learning model for one detection. The
+    scores are written as int16 values over scale, and read into a
+    float32 array of predictions, one per class, matching class_ids."""
+
+    def __init__(self, dat: bytes, offset: int):
+        ds = offset
+        self.model_type, self.is_binary, scale, num_species = struct.unpack_from(
+            ">b?fh", dat, ds
+        )
+        ds += 8
+        scores = np.frombuffer(dat, ">i2", num_species, ds)
+        self.predictions = scores.astype(np.float32) / np.float32(scale)
+        ds += 2 * num_species
+        num_classes = struct.unpack_from(">h", dat, ds)[0]
+        ds += 2
+        self.class_ids = _shared_class_ids(dat, ds, num_classes)
+        ds += 2 * num_classes
+        self.length = ds - offset
+
+    @property
+    def type_name(self) -> str:
+        return DL_MODEL_TYPES.get(self.model_type, "unknown")
+
+    def __len__(self):
+        return self.length
+
+
 class DLClassificationAnno:
+    """The results of each model of the deep learning classifier."""
+
     def __init__(self, dat: bytes, offset: int):
         ds = offset
-        self.num_models = struct.unpack(">h", dat[ds : ds + 2])[0]
+        self.num_models = struct.unpack_from(">h", dat, ds)[0]
+        ds += 2
         self.models = []
 
         for i in range(self.num_models):
-            model = {}
-            model_type = dat[ds : ds + 1]
-            is_binary = struct.unpack("?", dat[ds + 1 : ds + 2])[0]
-            scale = struct.unpack(">f", dat[ds + 2 : ds + 6])[0]
-            num_species = struct.unpack(">h", dat[ds + 6 : ds + 8])[0]
-            species = []
-            ds += 8
-
-            for i in range(num_species):
-                s = struct.unpack(">h", dat[ds : ds + 2])[0] / scale
-                species.append(s)
-                ds += 2
-
-            num_classes = struct.unpack(">h", dat[ds : ds + 2])[0]
-            classnames = []
-
-            for i in range(num_classes):
-                s = struct.unpack(">h", dat[ds : ds + 2])[0]
-                classnames.append(s)
-                ds += 2
-
-            # Dummy result
-            model["predictions"] = []
-            model["type"] = "dummy"
-            model["class_id"] = 0
-            model["is_binary"] = False
-
-            if model_type == 0 or model_type == 1:
-                model["predictions"] = species
-                model["type"] = model_type
-                model["class_id"] = classnames
-                model["is_binary"] = is_binary
-
+            model = DLModelResult(dat, ds)
+            ds += len(model)
             self.models.append(model)
 
         self.length = ds - offset
@@ -257,14 +275,15 @@ class TargetMotionAnno:
         ds = offset
         self.name, dv = read_java_string(dat, ds)
         ds += dv
-        self.num_locations = struct.unpack(">h", dat[ds : ds + 2])[0]
-        self.hydrophones = struct.unpack(">I", dat[ds + 2 : ds + 6])[0]
+        self.num_locations = struct.unpack_from(">h", dat, ds)[0]
+        self.hydrophones = struct.unpack_from(">I", dat, ds + 2)[0]
+        ds += 6
         self.locations = []
 
         for i in range(self.num_locations):
-            lat = struct.unpack(">d", dat[ds : ds + 8])[0]
-            lon = struct.unpack(">d", dat[ds + 8 : ds + 16])[0]
-            h = struct.unpack(">f", dat[ds + 16 : ds + 20])[0]
+            lat = struct.unpack_from(">d", dat, ds)[0]
+            lon = struct.unpack_from(">d", dat, ds + 8)[0]
+            h = struct.unpack_from(">f", dat, ds + 16)[0]
             ds += 20
 
             error_str, dv = read_java_string(dat, ds)
@@ -279,78 +298,104 @@ class TargetMotionAnno:
         return self.length
 
 
+def _user_form(dat: bytes, ds: int, anno_ver: int, length: int) -> UserFormAnno:
+    # UserFormAnno works out the text length from the length of the id
+    # (both ids are 4 long) and the annotation length after its own
+    # length field.
+    return UserFormAnno(dat, ds, 4, length + 8)
+
+
+# The annotation ids PAMGuard writes, with the attribute of Annotations
+# each is decoded into and how to decode it from (dat, offset, version,
+# length).
+ANNOTATION_TYPES = {
+    "Beer": ("beam_angles", lambda dat, ds, ver, n: BeamAnglesAnno(dat, ds)),
+    "Bearing": ("bearing", lambda dat, ds, ver, n: BearingAnno(dat, ds, ver)),
+    "TMAN": ("target_motion", lambda dat, ds, ver, n: TargetMotionAnno(dat, ds)),
+    "TDBL": ("toad_angles", lambda dat, ds, ver, n: TDBLAnno(dat, ds)),
+    "ClickClasssifier_1": (
+        "classification",
+        lambda dat, ds, ver, n: ClickClasssifier1Anno(dat, ds),
+    ),
+    "Matched_Clk_Clsfr": (
+        "m_classification",
+        lambda dat, ds, ver, n: MatchedClkClsfrAnno(dat, ds, ver),
+    ),
+    "BCLS": (
+        "basic_classification",
+        lambda dat, ds, ver, n: BasicClassificationAnno(dat, ds),
+    ),
+    "DLRE": (
+        "dl_classification",
+        lambda dat, ds, ver, n: DLClassificationAnno(dat, ds),
+    ),
+    "Delt": (
+        "dl_classification",
+        lambda dat, ds, ver, n: DLClassificationAnno(dat, ds),
+    ),
+    "Uson": ("user_form_data", _user_form),
+    "USON": ("user_form_data", _user_form),
+}
+
+_ATTRIBUTES = {attribute for attribute, _ in ANNOTATION_TYPES.values()}
+
+
 class Annotations:
     """The Annotations section of the PAMData. This part comes
-    at the end of the file before the footer and may or may not
-    be filled in."""
+    at the end of the object, after the module data, and may or may
+    not be filled in.
+
+    Creating this only finds the id, version, offset and length of each
+    annotation. Each is decoded the first time its attribute - for
+    example bearing or basic_classification - is accessed, which gives
+    None if the object has no annotation of that type."""
 
     def __init__(self, dat: bytes, offset: int):
-        self.beam_angles = None
-        self.bearing = None
-        self.target_motion = None
-        self.toad_angles = None
-        self.classification = None
-        self.m_classification = None
-        self.basic_classification = None
-        self.dl_classification = None
-        self.user_form_data = None
-        self.length = 0
+        self._dat = dat
+        # The version, offset and length of each annotation's data, by id
+        self.entries = {}
         ds = offset
-        self.anno_length = struct.unpack(">h", dat[ds : ds + 2])[0]
-        num_anno = struct.unpack(">h", dat[ds + 2 : ds + 4])[0]
+        self.anno_length = struct.unpack_from(">h", dat, ds)[0]
+        num_anno = struct.unpack_from(">h", dat, ds + 2)[0]
         ds += 4
 
         for i in range(num_anno):
-            anno_length = (
-                struct.unpack(">h", dat[ds : ds + 2])[0] - 2
-            )  # does not include the length field
+            # The length includes the length field itself
+            start = ds
+            anno_length = struct.unpack_from(">h", dat, ds)[0]
             ds += 2
 
-            # Read in a string
             anno_id, dv = read_java_string(dat, ds)
             ds += dv
 
-            anno_ver = struct.unpack(">h", dat[ds : ds + 2])[0]
+            anno_ver = struct.unpack_from(">h", dat, ds)[0]
             ds += 2
 
-            # Decide on the annotation type
-            if anno_id == "Beer":
-                self.beam_angles = BeamAnglesAnno(dat, ds)
-                ds += len(self.beam_angles)
+            self.entries[anno_id] = (anno_ver, ds, start + anno_length - ds)
+            ds = start + anno_length
 
-            elif anno_id == "Bearing":
-                self.bearing = BearingAnno(dat, ds, anno_ver)
-                ds += len(self.bearing)
-
-            elif anno_id == "TMAN":
-                self.target_motion = TargetMotionAnno(dat, ds)
-                ds += len(self.target_motion)
+        self.length = ds - offset
 
-            elif anno_id == "TDBL":
-                self.TDBL = TDBLAnno(dat, ds)
-                ds += len(self.TDBL)
+    def __getattr__(self, name):
+        # Only called for attributes not yet set, so each annotation is
+        # decoded once and then stored on the instance.
+        if name not in _ATTRIBUTES:
+            raise AttributeError(name)
 
-            elif anno_id == "ClickClasssifier_1":
-                self.click_classsifier_1 = ClickClasssifier1Anno(dat, ds)
-                ds += len(self.click_classsifier_1)
+        value = None
 
-            elif anno_id == "Matched_Clk_Clsfr":
-                self.matched_clk_clsfr = MatchedClkClsfrAnno(dat, ds)
-                ds += len(self.matched_clk_clsfr)
+        for anno_id, (anno_ver, ds, length) in self.entries.items():
+            attribute, decode = ANNOTATION_TYPES.get(anno_id, (None, None))
 
-            elif anno_id == "BCLS":
-                self.basic_classification = BasicClassificationAnno(dat, ds)
-                ds += len(self.basic_classification)
+            if attribute == name:
+                value = decode(self._dat, ds, anno_ver, length)
+                break
 
-            elif anno_id == "DLRE" or anno_id == "Delt":
-                self.dl_classification = DLClassificationAnno(dat, ds)
-                ds += len(self.dl_classification)
+        setattr(self, name, value)
+        return value
 
-            elif anno_id == "Uson" or anno_id == "USON":
-                self.dl_classification = UserFormAnno(
-                    dat, ds, len(anno_id), anno_length
-                )
-                ds += len(self.dl_classification)
+    def __contains__(self, anno_id: str) -> bool:
+        return anno_id in self.entries
 
     def __len__(self):
         return self.length
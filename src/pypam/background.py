@@ -0,0 +1,88 @@
+""" Background noise spectra, written between the objects of detectors
+such as the Click Detector and the WhistlesMoans detector.
+
+Every so often these detectors write a background record holding the
+spectrum of the background noise they measure against, from its first
+FFT bin. These are decoded into SpectrumBackground, kept in the
+background of the PGModule rather than with its objects, and
+background_columns puts the spectra of a module into one array.
+
+This module contains the following:
+    - SpectrumBackground - A background noise spectrum
+    - background_columns - The columns of a list of background records
+
+Examples:
+
+    >>> from pypam.pgdf import PGDF
+    >>> module = PGDF("WhistlesMoans_20220722_000000.pgdf").module
+    >>> spectra = module.background_columns()["background"]
+    >>> spectra.shape
+    (120, 512)
+
+"""
+
+__all__ = ["DECODER", "SpectrumBackground", "background_columns"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import struct
+
+import numpy as np
+
+from pypam.decoders import Decoder
+
+
+class SpectrumBackground:
+    """The spectrum of the background noise, as float32 levels from
+    first_bin on."""
+
+    def __init__(self, dat, offset, pam_data, module_header):
+        ds = offset
+        self.data_length = struct.unpack_from(">i", dat, ds)[0]
+        ds += 4
+        self.first_bin, num_bins = struct.unpack_from(">ii", dat, ds)
+        ds += 8
+        self.background = np.frombuffer(dat, ">f4", num_bins, ds).astype(np.float32)
+        self.length = 4 + self.data_length
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return (
+            str(self.length)
+            + ","
+            + str(self.first_bin)
+            + ","
+            + str(len(self.background))
+        )
+
+
+def background_columns(objects: list):
+    """The columns for a list of PGBackground records holding
+    SpectrumBackground. The spectra go into a single float32
+    "background" array of records x bins, filled with NaN where a
+    spectrum is shorter than the longest.
+
+    Args:
+        objects (list): the PGBackground records.
+
+    Returns:
+        tuple: a dict of columns with a row per record, and an empty
+        dict as there are no further tables.
+    """
+    spectra = [o.data for o in objects]
+    num_bins = max((len(s.background) for s in spectra), default=0)
+    background = np.full((len(spectra), num_bins), np.nan, np.float32)
+
+    for i, s in enumerate(spectra):
+        background[i, : len(s.background)] = s.background
+
+    columns = {
+        "first_bin": np.array([s.first_bin for s in spectra], dtype=np.int32),
+        "background": background,
+    }
+    return columns, {}
+
+
+DECODER = Decoder(SpectrumBackground, background_columns)
@@ -0,0 +1,219 @@
+""" An on-disk cache of decoded pgdf files, held as ModuleColumns, so
+that files that never change are only decoded once.
+
+Each file is cached under a key made from its full path, size and
+mtime and the pypam version, so a file that is rewritten, or a new
+version of pypam, misses the cache rather than returning stale data.
+When the cache grows past its size limit, the least recently used
+entries are removed.
+
+This module contains the following:
+    - ColumnCache - A directory of cached ModuleColumns
+    - default_cache_dir - Where the cache lives unless told otherwise
+
+Examples:
+
+    >>> from pypam.cache import ColumnCache
+    >>> cache = ColumnCache(max_bytes=10 * 1024**3)
+    >>> cache.warm("/data/deployment", max_workers=8)
+    >>> columns = cache.load("/data/deployment/test.pgdf")
+
+"""
+
+__all__ = ["CACHE_VERSION", "ColumnCache", "default_cache_dir"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import hashlib
+import os
+from importlib import metadata
+
+import numpy as np
+
+from pypam.columns import ModuleColumns
+from pypam.dataset import PGDFDataset, load_columns
+
+# Bump this if the layout of a cache entry, or what is decoded into
+# the columns, changes.
+CACHE_VERSION = 1
+
+CACHE_SUFFIX = ".npz"
+
+
+def default_cache_dir() -> str:
+    """The cache directory - $PYPAM_CACHE_DIR if set, otherwise pypam
+    under $XDG_CACHE_HOME or ~/.cache."""
+    if "PYPAM_CACHE_DIR" in os.environ:
+        return os.environ["PYPAM_CACHE_DIR"]
+
+    base = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(base, "pypam")
+
+
+def _pypam_version() -> str:
+    try:
+        return metadata.version("pypam")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+class ColumnCache:
+    """A directory of ModuleColumns, one .npz file per pgdf file."""
+
+    def __init__(self, cache_dir=None, max_bytes=4 * 1024**3):
+        """Open (and if need be create) the cache.
+
+        Args:
+            cache_dir (str): the directory to cache in. None uses
+                default_cache_dir().
+            max_bytes (int): the most the cache may hold. The least
+                recently used entries are removed to keep under it.
+        """
+        self.cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def entry_path(self, pgdf_path: str) -> str:
+        """The path of the cache entry for a pgdf file as it is now."""
+        stat = os.stat(pgdf_path)
+        key = "\n".join(
+            [
+                os.path.abspath(pgdf_path),
+                str(stat.st_size),
+                str(stat.st_mtime_ns),
+                _pypam_version(),
+                str(CACHE_VERSION),
+            ]
+        )
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, name + CACHE_SUFFIX)
+
+    def get(self, pgdf_path: str) -> ModuleColumns:
+        """The cached columns of a file, or None if they are not in the
+        cache."""
+        entry = self.entry_path(pgdf_path)
+
+        try:
+            with np.load(entry, allow_pickle=False) as saved:
+                columns = {}
+                tables = {}
+
+                for key in saved.files:
+                    kind, _, name = key.partition("/")
+
+                    if kind == "columns":
+                        columns[name] = saved[key]
+                    elif kind == "tables":
+                        table, _, name = name.partition("/")
+                        tables.setdefault(table, {})[name] = saved[key]
+
+                module_type = str(saved["module_type"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # Mark it as recently used.
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+
+        return ModuleColumns(module_type, columns, tables)
+
+    def put(self, pgdf_path: str, columns: ModuleColumns, evict=True):
+        """Cache the columns of a file, then, unless evict is False,
+        remove old entries if the cache has grown too big."""
+        arrays = {"module_type": np.array(str(columns.module_type))}
+
+        for name, col in columns.columns.items():
+            arrays["columns/" + name] = col
+
+        for table, table_columns in columns.tables.items():
+            for name, col in table_columns.items():
+                arrays["tables/" + table + "/" + name] = col
+
+        entry = self.entry_path(pgdf_path)
+        tmp_path = entry + "." + str(os.getpid()) + ".tmp"
+
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+
+        os.replace(tmp_path, entry)
+
+        if evict:
+            self.evict()
+
+    def load(self, pgdf_path: str) -> ModuleColumns:
+        """The columns of a file, from the cache if they are there,
+        otherwise decoded and added to the cache."""
+        columns = self.get(pgdf_path)
+
+        if columns is None:
+            columns = load_columns(pgdf_path)
+            self.put(pgdf_path, columns)
+
+        return columns
+
+    def size(self) -> int:
+        """The number of bytes in the cache."""
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def evict(self, max_bytes=None):
+        """Remove the least recently used entries until the cache holds
+        no more than max_bytes (by default the cache's own limit)."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime_ns)
+        total = sum(stat.st_size for _, stat in entries)
+
+        for path, stat in entries:
+            if total <= max_bytes:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            total -= stat.st_size
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        self.evict(0)
+
+    def warm(self, source, pattern="*.pgdf", max_workers=None) -> int:
+        """Decode and cache all the files of a directory, glob or list
+        that are not already cached.
+
+        Args:
+            source (str | list): as for PGDFDataset.
+            pattern (str): the pattern of files to use in a directory.
+            max_workers (int): the number of worker processes.
+
+        Returns:
+            int: the number of files that were decoded.
+        """
+        paths = [
+            path
+            for path in PGDFDataset(source, pattern).paths
+            if not os.path.exists(self.entry_path(path))
+        ]
+
+        for path, columns in PGDFDataset(paths, max_workers=max_workers).iter_columns():
+            self.put(path, columns, evict=False)
+
+        self.evict()
+        return len(paths)
+
+    def _entries(self) -> list:
+        entries = []
+
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(CACHE_SUFFIX):
+                try:
+                    entries.append((entry.path, entry.stat()))
+                except OSError:
+                    pass
+
+        return entries
+
+    def __len__(self):
+        return len(self._entries())
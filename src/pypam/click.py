@@ -0,0 +1,192 @@
+""" Clicks from the Click Detector and the SoundTrap Click Detector.
+
+PAMGuard writes each click waveform as int8 samples, channel after
+channel, with the value that 127 stands for. The samples are read with
+one np.frombuffer call and kept as int8; waveform scales them to
+amplitudes only when asked for. click_columns puts the clicks of a
+module into one int8 array of clicks x channels x samples.
+
+This module contains the following:
+    - ClickData - A single click
+    - click_columns - The columns of a list of clicks
+
+Examples:
+
+    >>> from pypam.pgdf import PGDF
+    >>> pgdf = PGDF("Click_Detector_Clicks_20220722_000000.pgdf")
+    >>> click = pgdf.module.objects[0].data
+    >>> click.waveform.shape
+    (2, 86)
+
+"""
+
+__all__ = ["DECODER", "ClickData", "click_columns"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import struct
+
+import numpy as np
+
+from pypam.background import DECODER as BACKGROUND_DECODER
+from pypam.decoders import Decoder
+
+
+def _read_floats(dat, offset: int) -> tuple:
+    """A count of floats then the floats, as written for the delays and
+    angles. Returns a native float32 array and the bytes read."""
+    count = struct.unpack_from(">h", dat, offset)[0]
+    floats = np.frombuffer(dat, ">f4", count, offset + 2).astype(np.float32)
+    return floats, 2 + 4 * count
+
+
+class ClickData:
+    """A click detected by the click detector.
+
+    From version 4 of the module the start sample, channel map, time
+    delays and duration are not written with the click, as they are
+    already in the PAMData, so they are taken from there."""
+
+    def __init__(self, dat, offset, pam_data, module_header):
+        ds = offset
+        version = module_header.version if module_header is not None else 4
+        self.data_length = struct.unpack_from(">i", dat, ds)[0]
+        ds += 4
+
+        if version <= 3:
+            self.start_sample, self.channel_map = struct.unpack_from(">qi", dat, ds)
+            ds += 12
+        else:
+            self.start_sample = pam_data.start_sample
+            self.channel_map = pam_data.channel_map
+
+        self.trigger_map, self.type = struct.unpack_from(">ih", dat, ds)
+        ds += 6
+        self.flags = 0
+
+        if version >= 2:
+            self.flags = struct.unpack_from(">i", dat, ds)[0]
+            ds += 4
+
+        if version <= 3:
+            self.delays, dv = _read_floats(dat, ds)
+            ds += dv
+        else:
+            self.delays = np.array(pam_data.time_delays, dtype=np.float32)
+
+        self.angles, dv = _read_floats(dat, ds)
+        ds += dv
+        self.angle_errors = np.empty(0, dtype=np.float32)
+
+        if version >= 3:
+            self.angle_errors, dv = _read_floats(dat, ds)
+            ds += dv
+
+        if version <= 3:
+            duration = struct.unpack_from(">i", dat, ds)[0]
+            ds += 4
+        else:
+            duration = pam_data.sample_duration
+
+        self.max_value = struct.unpack_from(">f", dat, ds)[0]
+        ds += 4
+        num_channels = bin(self.channel_map).count("1")
+
+        # Copied, so the buffer it came from can be released
+        self.wave = (
+            np.frombuffer(dat, np.int8, num_channels * duration, ds)
+            .reshape(num_channels, duration)
+            .copy()
+        )
+        self.length = 4 + self.data_length
+
+    @property
+    def num_channels(self) -> int:
+        return self.wave.shape[0]
+
+    @property
+    def duration(self) -> int:
+        """The number of samples in each channel."""
+        return self.wave.shape[1]
+
+    @property
+    def scale(self) -> float:
+        """The amplitude of one step of the int8 samples."""
+        return self.max_value / 127
+
+    @property
+    def waveform(self) -> np.ndarray:
+        """The waveform as float32 amplitudes, a row per channel."""
+        return self.wave.astype(np.float32) * self.scale
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return (
+            str(self.length)
+            + ","
+            + str(self.channel_map)
+            + ","
+            + str(self.trigger_map)
+            + ","
+            + str(self.type)
+            + ","
+            + str(self.flags)
+            + ","
+            + str(self.duration)
+            + ","
+            + str(self.max_value)
+        )
+
+
+def click_columns(objects: list):
+    """The click specific columns for a list of PGObjects holding
+    ClickData.
+
+    The waveforms go into a single int8 "wave" column of clicks x
+    channels x samples. Clicks with fewer channels or samples than the
+    largest are padded with zeros, so use the num_channels and duration
+    columns to find the samples of each. wave_scale turns the samples
+    into amplitudes. The first angle and angle error of each click, if
+    it has any, are kept as columns too.
+
+    Args:
+        objects (list): the PGObjects.
+
+    Returns:
+        tuple: a dict of columns with a row per object, and an empty
+        dict as clicks have no further tables.
+    """
+    clicks = [o.data for o in objects]
+    num_channels = np.array([c.num_channels for c in clicks], dtype=np.int32)
+    duration = np.array([c.duration for c in clicks], dtype=np.int32)
+    wave = np.zeros(
+        (len(clicks), num_channels.max(initial=0), duration.max(initial=0)),
+        dtype=np.int8,
+    )
+
+    for i, c in enumerate(clicks):
+        wave[i, : c.num_channels, : c.duration] = c.wave
+
+    columns = {
+        "trigger_map": np.array([c.trigger_map for c in clicks], dtype=np.int32),
+        "type": np.array([c.type for c in clicks], dtype=np.int16),
+        "flags": np.array([c.flags for c in clicks], dtype=np.int32),
+        "num_channels": num_channels,
+        "duration": duration,
+        "angle": np.array(
+            [c.angles[0] if len(c.angles) else np.nan for c in clicks],
+            dtype=np.float32,
+        ),
+        "angle_error": np.array(
+            [c.angle_errors[0] if len(c.angle_errors) else np.nan for c in clicks],
+            dtype=np.float32,
+        ),
+        "wave_scale": np.array([c.scale for c in clicks], dtype=np.float32),
+        "wave": wave,
+    }
+    return columns, {}
+
+
+DECODER = Decoder(ClickData, click_columns, background=BACKGROUND_DECODER)
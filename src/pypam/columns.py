@@ -0,0 +1,243 @@
+""" The decoded objects of a module held as columns - one numpy array
+per field - rather than as PGObjects. This is far more compact, is
+cheap to pickle between processes and is what the exporters and
+dataframes are built from.
+
+This module contains the following:
+    - ModuleColumns - The columns of the objects of one module
+    - pam_columns - Turn the PAMData of a list of PGObjects into columns
+
+Examples:
+
+    >>> from pypam.pgdf import PGDF
+    >>> from pypam.columns import ModuleColumns
+    >>> pgdf = PGDF("test.pgdf")
+    >>> columns = ModuleColumns.from_module(pgdf.header.module_type, pgdf.module)
+    >>> columns["UID"]
+    >>> frame = columns.to_dataframe()
+
+"""
+
+__all__ = ["DATE_COLUMNS", "PAM_COLUMNS", "ModuleColumns", "pam_columns"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import operator
+
+import numpy as np
+
+from pypam.decoders import get_decoder
+
+# The PAMData fields kept as columns, with their types.
+PAM_COLUMNS = [
+    ("millis", np.int64),
+    ("time_nanos", np.int64),
+    ("identifier", np.int32),
+    ("flag_bitmap", np.int32),
+    ("channel_map", np.int32),
+    ("UID", np.int64),
+    ("start_sample", np.int64),
+    ("sample_duration", np.int32),
+    ("duration_millis", np.float32),
+    ("sequence_map", np.int32),
+    ("noise", np.float32),
+    ("signal", np.float32),
+    ("signal_excess", np.float32),
+]
+
+_PAM_DTYPE = np.dtype(PAM_COLUMNS)
+_get_pam_fields = operator.attrgetter(*[name for name, _ in PAM_COLUMNS])
+
+# Columns of millis, and the datetime columns to_dataframe adds for them.
+DATE_COLUMNS = {"millis": "date", "time_millis": "time"}
+
+
+def _import_pandas():
+    try:
+        import pandas
+    except ImportError as e:
+        raise ImportError("DataFrames need pandas - pip install pandas") from e
+
+    return pandas
+
+
+def _concatenate(cols: list) -> np.ndarray:
+    """Join columns end to end. Columns with more than one dimension,
+    such as waveforms, are padded to the largest - with NaN if they
+    hold floats and zeros otherwise."""
+    if cols[0].ndim > 1:
+        shape = np.max([col.shape[1:] for col in cols], axis=0)
+        fill = np.nan if cols[0].dtype.kind == "f" else 0
+        cols = [
+            np.pad(
+                col,
+                [(0, 0)] + [(0, n - m) for n, m in zip(shape, col.shape[1:])],
+                constant_values=fill,
+            )
+            for col in cols
+        ]
+
+    return np.concatenate(cols)
+
+
+def pam_columns(objects: list) -> dict:
+    """Turn the PAMData of a list of PGObjects into columns.
+
+    Args:
+        objects (list): the PGObjects.
+
+    Returns:
+        dict: a numpy array per PAM_COLUMNS field, plus min_freq and
+        max_freq from the frequency limits.
+    """
+    # attrgetter pulls all the fields of an object in one C level call
+    table = np.array([_get_pam_fields(obj.pam) for obj in objects], dtype=_PAM_DTYPE)
+    columns = {name: np.ascontiguousarray(table[name]) for name in _PAM_DTYPE.names}
+    freq_limits = np.array(
+        [obj.pam.freq_limits for obj in objects], dtype=np.float32
+    ).reshape(-1, 2)
+    columns["min_freq"] = freq_limits[:, 0].copy()
+    columns["max_freq"] = freq_limits[:, 1].copy()
+    return columns
+
+
+class ModuleColumns:
+    """The objects of one module as columns. columns holds one array
+    per field with a row per object (some, like waveforms, have more
+    than one dimension). tables holds any further tables, such as the
+    points of Gemini tracks, each a dict of columns with a UID column
+    that joins it back to the objects."""
+
+    def __init__(self, module_type: str, columns: dict, tables=None):
+        self.module_type = module_type
+        self.columns = columns
+        self.tables = tables if tables is not None else {}
+
+    @staticmethod
+    def from_objects(module_type: str, objects: list, decoder=None, background=False):
+        """Build the columns for a list of PGObjects from a module of
+        the given type, or for a list of its PGBackground records if
+        background is set.
+
+        Args:
+            module_type (str): the module type of the file.
+            objects (list): the PGObjects, or PGBackground records.
+            decoder (Decoder): the decoder of the file the objects came
+                from - its FileHeader.decoder, which takes the module
+                name and stream into account. None looks one up by the
+                module type alone.
+            background (bool): the objects are PGBackground records.
+
+        Returns:
+            ModuleColumns: the columns of the objects.
+        """
+        columns = pam_columns(objects)
+        tables = {}
+
+        if decoder is None:
+            decoder = get_decoder(module_type)
+
+        if background and decoder is not None:
+            decoder = decoder.background
+
+        if decoder is not None and decoder.columns is not None:
+            module_columns, tables = decoder.columns(objects)
+            columns.update(module_columns)
+
+        return ModuleColumns(module_type, columns, tables)
+
+    @staticmethod
+    def from_module(module_type: str, module):
+        """Build the columns for all the objects in a PGModule."""
+        return ModuleColumns.from_objects(module_type, module.objects, module.decoder)
+
+    @staticmethod
+    def concatenate(parts: list):
+        """Join several ModuleColumns of the same module type, one
+        after the other. Columns with more than one dimension are
+        padded to the largest."""
+        parts = [p for p in parts if p is not None]
+
+        if len(parts) == 0:
+            return None
+
+        if len(parts) == 1:
+            return parts[0]
+
+        columns = {
+            name: _concatenate([p.columns[name] for p in parts])
+            for name in parts[0].columns
+        }
+        tables = {
+            table: {
+                name: _concatenate([p.tables[table][name] for p in parts])
+                for name in parts[0].tables[table]
+            }
+            for table in parts[0].tables
+        }
+        return ModuleColumns(parts[0].module_type, columns, tables)
+
+    def sorted(self, by="millis"):
+        """A copy with the objects in order of the given column."""
+        order = np.argsort(self.columns[by], kind="stable")
+        columns = {name: col[order] for name, col in self.columns.items()}
+        return ModuleColumns(self.module_type, columns, self.tables)
+
+    def between(self, start_millis: int, end_millis: int):
+        """A copy with only the objects with millis between start_millis
+        and end_millis inclusive, and the rows of the further tables
+        that belong to them."""
+        millis = self.columns["millis"]
+        keep = (millis >= start_millis) & (millis <= end_millis)
+        columns = {name: col[keep] for name, col in self.columns.items()}
+        uids = columns["UID"]
+        tables = {}
+
+        for table, table_columns in self.tables.items():
+            rows = np.isin(table_columns["UID"], uids)
+            tables[table] = {name: col[rows] for name, col in table_columns.items()}
+
+        return ModuleColumns(self.module_type, columns, tables)
+
+    def to_dataframe(self, table=None):
+        """A pandas DataFrame of the objects, or of one of the further
+        tables, built straight from the columns. Columns of millis also
+        get a UTC datetime column next to them. Columns with more than
+        one dimension hold an array per row.
+
+        Args:
+            table (str): the name of a further table, for example
+                "points" for Gemini tracks. None for the objects.
+
+        Returns:
+            pandas.DataFrame: a row per object, or per table row.
+        """
+        pd = _import_pandas()
+        columns = self.columns if table is None else self.tables[table]
+        frame = {}
+
+        for name, col in columns.items():
+            frame[name] = list(col) if col.ndim > 1 else col
+
+            if name in DATE_COLUMNS:
+                frame[DATE_COLUMNS[name]] = pd.to_datetime(col, unit="ms", utc=True)
+
+        return pd.DataFrame(frame, copy=False)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return len(self.columns["millis"])
+
+    def __str__(self):
+        return (
+            str(self.module_type)
+            + ","
+            + str(len(self))
+            + ",["
+            + ",".join(self.columns.keys())
+            + "],["
+            + ",".join(self.tables.keys())
+            + "]"
+        )
@@ -0,0 +1,290 @@
+""" Reading many pgdf files at once - for example a deployment's
+worth of Gemini_Threshold_Detector_*.pgdf files.
+
+Files are decoded in parallel across a pool of processes. Each worker
+sends its file back as ModuleColumns - a handful of numpy arrays -
+rather than pickling every PGObject.
+
+This module contains the following:
+    - PGDFDataset - A set of pgdf files, found in a directory or by glob
+
+Examples:
+
+    >>> from pypam.dataset import PGDFDataset
+    >>> dataset = PGDFDataset("/data/deployment", max_workers=8)
+    >>> columns = dataset.load()
+    >>> columns["UID"]
+    >>> window = dataset.load(start=datetime(2022, 7, 22), end=datetime(2022, 7, 23))
+
+"""
+
+__all__ = ["PGDFDataset", "load_columns"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import functools
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pypam.columns import ModuleColumns
+from pypam.pgdf import PGDF
+from pypam.util.time import as_millis
+
+
+def load_columns(
+    pgdf_path: str, start_millis=None, end_millis=None, slack_millis=0
+) -> ModuleColumns:
+    """Decode one pgdf file into ModuleColumns. This is what each
+    worker process runs.
+
+    Args:
+        pgdf_path (str): full path and name of the pgdf file.
+        start_millis (int): if given with end_millis, decode only the
+            objects between the two - see PGDF.iter_between.
+        end_millis (int): the end of the window.
+        slack_millis (int): how far past end_millis to keep looking.
+
+    Returns:
+        ModuleColumns: the objects of the file.
+    """
+    if start_millis is None or end_millis is None:
+        pgdf = PGDF(pgdf_path, background=False)
+        objects = pgdf.module.objects if pgdf.module is not None else []
+        return ModuleColumns.from_objects(
+            pgdf.header.module_type, objects, pgdf.header.decoder
+        )
+
+    header = PGDF.read_header(pgdf_path)
+    objects = list(PGDF.iter_between(pgdf_path, start_millis, end_millis, slack_millis))
+    return ModuleColumns.from_objects(header.module_type, objects, header.decoder)
+
+
+class PGDFDataset:
+    """A set of pgdf files, held in time order of their FileHeader
+    data dates, which can be decoded in parallel."""
+
+    def __init__(
+        self, source, pattern="*.pgdf", max_workers=None, chunksize=1, cache=None
+    ):
+        """Find the files of the dataset.
+
+        Args:
+            source (str | list): a directory, a glob pattern or a list
+                of file paths.
+            pattern (str): the pattern of files to use within a
+                directory.
+            max_workers (int): the number of worker processes. None
+                uses one per CPU, and 1 decodes in this process.
+            chunksize (int): the number of files handed to a worker at
+                a time. Larger chunks cut the overhead for many small
+                files.
+            cache (ColumnCache): a cache of decoded files to use before
+                decoding, and to add newly decoded files to.
+        """
+        if isinstance(source, (list, tuple)):
+            paths = [str(p) for p in source]
+        elif os.path.isdir(source):
+            paths = glob.glob(os.path.join(source, pattern))
+        else:
+            paths = glob.glob(str(source))
+
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+        self.cache = cache
+        self.headers = {path: PGDF.read_header(path) for path in paths}
+        self.footers = {}
+        self.paths = sorted(
+            paths, key=lambda path: (self.headers[path].data_millis, path)
+        )
+
+    def footer(self, pgdf_path: str):
+        """The FileFooter of one of the files, read on first use. None
+        if the file has no footer."""
+        if pgdf_path not in self.footers:
+            self.footers[pgdf_path] = PGDF.read_footer(pgdf_path)
+
+        return self.footers[pgdf_path]
+
+    def files_between(self, start, end, slack_millis=0) -> list:
+        """The files that could hold objects between start and end,
+        judged only from their FileHeader and FileFooter dates. A file
+        without a footer is kept unless it starts after end.
+
+        Args:
+            start (int | datetime): the start of the window, in millis
+                or as a datetime.
+            end (int | datetime): the end of the window.
+            slack_millis (int): how long after its millis an object may
+                be written - see PGDF.iter_between.
+
+        Returns:
+            list: the paths of the files, in time order.
+        """
+        start_millis = as_millis(start)
+        end_millis = as_millis(end)
+        paths = []
+
+        for path in self.paths:
+            # Objects written late can have millis before the file began.
+            if self.headers[path].data_millis - slack_millis > end_millis:
+                continue
+
+            footer = self.footer(path)
+
+            if footer is not None and footer.data_millis < start_millis:
+                continue
+
+            paths.append(path)
+
+        return paths
+
+    def _uids_in(self, pgdf_path: str, wanted: np.ndarray) -> np.ndarray:
+        """The sorted UIDs in wanted that fall in the UID range of a
+        file's FileFooter. Files without a footer, or from before
+        version 3 which have no UID range, could hold any of them."""
+        footer = self.footer(pgdf_path)
+
+        if footer is None or footer.lowest_UID < 0:
+            return wanted
+
+        lo = np.searchsorted(wanted, footer.lowest_UID, side="left")
+        hi = np.searchsorted(wanted, footer.highest_UID, side="right")
+        return wanted[lo:hi]
+
+    def files_with_uids(self, uids) -> list:
+        """The files that could hold any of the given UIDs, judged only
+        from the lowest_UID and highest_UID of their FileFooters.
+
+        Args:
+            uids (list): the UIDs to look for.
+
+        Returns:
+            list: the paths of the files, in time order.
+        """
+        wanted = np.unique(np.asarray(uids, dtype=np.int64))
+        return [path for path in self.paths if len(self._uids_in(path, wanted)) > 0]
+
+    def objects_by_uid(self, uids) -> list:
+        """Decode the objects with any of the given UIDs. Only the files
+        whose UID range could hold one are opened, and within those the
+        sidecar index finds the objects without decoding the rest.
+
+        Args:
+            uids (list): the UIDs to look for.
+
+        Returns:
+            list: the PGObjects found, in time order of their files and
+            file order within each.
+        """
+        wanted = np.unique(np.asarray(uids, dtype=np.int64))
+        objects = []
+
+        for path in self.paths:
+            in_range = self._uids_in(path, wanted)
+
+            if len(in_range) > 0:
+                objects += PGDF.objects_by_uid(path, in_range)
+
+        return objects
+
+    def iter_columns(self, start=None, end=None, slack_millis=0):
+        """Decode the files, yielding the ModuleColumns of each file in
+        time order as soon as it and all the files before it are done.
+        If start and end are given, only the files that overlap the
+        window are opened, and only the objects within it decoded.
+
+        Args:
+            start (int | datetime): the start of the window.
+            end (int | datetime): the end of the window.
+            slack_millis (int): see PGDF.iter_between.
+
+        Yields:
+            tuple: the path of the file and its ModuleColumns.
+        """
+        window = start is not None and end is not None
+
+        if not window:
+            paths = self.paths
+            load = load_columns
+        else:
+            paths = self.files_between(start, end, slack_millis)
+            start_millis = as_millis(start)
+            end_millis = as_millis(end)
+            load = functools.partial(
+                load_columns,
+                start_millis=start_millis,
+                end_millis=end_millis,
+                slack_millis=slack_millis,
+            )
+
+        cached = {}
+
+        if self.cache is not None:
+            for path in paths:
+                columns = self.cache.get(path)
+
+                if columns is not None:
+                    cached[path] = columns
+
+        decoded = self._map(load, [path for path in paths if path not in cached])
+
+        for path in paths:
+            if path in cached:
+                columns = cached[path]
+
+                if window:
+                    columns = columns.between(start_millis, end_millis)
+            else:
+                columns = next(decoded)
+
+                # Only whole files go in the cache.
+                if self.cache is not None and not window:
+                    self.cache.put(path, columns, evict=False)
+
+            yield path, columns
+
+        if self.cache is not None and len(cached) < len(paths):
+            self.cache.evict()
+
+    def _map(self, load, paths: list):
+        """Run load on each path, in this process or across the pool,
+        yielding the results in order."""
+        if self.max_workers == 1 or len(paths) == 0:
+            for path in paths:
+                yield load(path)
+
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            yield from executor.map(load, paths, chunksize=self.chunksize)
+
+    def load(self, start=None, end=None, slack_millis=0) -> ModuleColumns:
+        """Decode all the files into one ModuleColumns, with the
+        objects in time order.
+
+        Args:
+            start (int | datetime): if given with end, load only the
+                objects between the two.
+            end (int | datetime): the end of the window.
+            slack_millis (int): see PGDF.iter_between.
+
+        Returns:
+            ModuleColumns: the objects of every file, or None if there
+            are no files.
+        """
+        parts = [c for _, c in self.iter_columns(start, end, slack_millis)]
+        columns = ModuleColumns.concatenate(parts)
+
+        if columns is None:
+            return None
+
+        return columns.sorted("millis")
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __str__(self):
+        return str(len(self.paths)) + " files," + str(self.max_workers) + " workers"
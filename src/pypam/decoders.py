@@ -0,0 +1,157 @@
+""" The registry of decoders for the module specific part of each data
+object, by the module type in the FileHeader.
+
+The decoder for a file is looked up once, from its FileHeader, and the
+loop over objects then calls it directly. Decoder modules are only
+imported when a file of their type is first read. Other packages can
+add decoders through the "pypam.decoders" entry point group, naming the
+module type and pointing at a Decoder, for example in pyproject.toml:
+
+    [project.entry-points."pypam.decoders"]
+    "My Detector" = "my_package.decoder:DECODER"
+
+This module contains the following:
+    - Decoder - How to decode the objects of one module type
+    - register_decoder - Add or replace the decoder for a module type
+    - get_decoder - Find the decoder for a module type
+
+Examples:
+
+    >>> from pypam.decoders import get_decoder
+    >>> decoder = get_decoder("Gemini Threshold Detector")
+    >>> data = decoder.data(dat, offset, pam_data, module_header)
+
+"""
+
+__all__ = ["DECODERS", "Decoder", "get_decoder", "register_decoder"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import importlib
+from importlib import metadata
+
+ENTRY_POINT_GROUP = "pypam.decoders"
+
+
+class Decoder:
+    """How to decode the objects of one module type.
+
+    Args:
+        data (callable): called with the buffer, the offset of the
+            module specific part of an object, the PAMData before it
+            and the ModuleHeader of the file. It returns the data,
+            whose len() is the number of bytes read.
+        columns (callable): called with a list of PGObjects of this
+            type, returning the columns specific to the module and a
+            dict of further tables, as ModuleColumns wants. None if the
+            module only has the PAMData columns.
+        header (callable): called with the ModuleHeader, returning what
+            is in its module specific binary, which is kept as its
+            data. None if the module has nothing there.
+        streams (dict): Decoders for the objects of particular streams
+            of the module, by stream name, used in place of this one
+            for files of those streams.
+        background (Decoder): the Decoder for the module's background
+            records, whose data and columns are used for them in the
+            same way. None if the module writes none, or they are not
+            decoded.
+    """
+
+    def __init__(self, data, columns=None, header=None, streams=None, background=None):
+        self.data = data
+        self.columns = columns
+        self.header = header
+        self.streams = streams if streams is not None else {}
+        self.background = background
+
+    def for_stream(self, stream_name: str):
+        """The Decoder for the files of a stream of the module."""
+        return self.streams.get(stream_name, self)
+
+
+# The decoders for each module type, or (module type, module name) for
+# a decoder for just one module of a type. Each is a Decoder, or a
+# "module:attribute" string naming one, which is imported on first use.
+DECODERS = {
+    "Click Detector": "pypam.click:DECODER",
+    "Deep Learning Classifier": "pypam.deeplearning:DECODER",
+    "Gemini Threshold Detector": "pypam.gemini:DECODER",
+    "LTSA": "pypam.ltsa:DECODER",
+    "Noise Band": "pypam.noise:DECODER",
+    "Noise Monitor": "pypam.noise:DECODER",
+    "NoiseBand": "pypam.noise:BAND_DECODER",
+    "SoundTrap Click Detector": "pypam.click:DECODER",
+    "WhistlesMoans": "pypam.whistle:DECODER",
+}
+
+_entry_points_loaded = False
+
+
+def _load_entry_points():
+    """Add the decoders other packages have registered. Decoders
+    already in DECODERS take precedence."""
+    global _entry_points_loaded
+
+    if _entry_points_loaded:
+        return
+
+    _entry_points_loaded = True
+    found = metadata.entry_points()
+
+    if hasattr(found, "select"):
+        found = found.select(group=ENTRY_POINT_GROUP)
+    else:
+        # Python 3.8 and 3.9 give a dict of groups
+        found = found.get(ENTRY_POINT_GROUP, [])
+
+    for entry_point in found:
+        DECODERS.setdefault(entry_point.name, entry_point)
+
+
+def _resolve(key):
+    """The Decoder for a key of DECODERS, importing it if need be."""
+    decoder = DECODERS[key]
+
+    if isinstance(decoder, str):
+        module_name, attribute = decoder.split(":")
+        decoder = getattr(importlib.import_module(module_name), attribute)
+    elif not isinstance(decoder, Decoder):
+        # An entry point
+        decoder = decoder.load()
+
+    DECODERS[key] = decoder
+    return decoder
+
+
+def register_decoder(module_type: str, decoder, module_name=None):
+    """Add or replace the decoder for a module type.
+
+    Args:
+        module_type (str): the module type, as in the FileHeader.
+        decoder (Decoder | str): the decoder, or a "module:attribute"
+            string naming one, to import when it is first needed.
+        module_name (str): only use the decoder for the module of this
+            name, rather than every module of the type.
+    """
+    key = module_type if module_name is None else (module_type, module_name)
+    DECODERS[key] = decoder
+
+
+def get_decoder(module_type: str, module_name=None) -> Decoder:
+    """Find the decoder for a module type, preferring one registered
+    for the module name as well.
+
+    Args:
+        module_type (str): the module type, as in the FileHeader.
+        module_name (str): the module name, as in the FileHeader.
+
+    Returns:
+        Decoder: the decoder, or None if there is none for the type.
+    """
+    _load_entry_points()
+
+    for key in ((module_type, module_name), module_type):
+        if key in DECODERS:
+            return _resolve(key)
+
+    return None
@@ -0,0 +1,289 @@
+""" Detections and predictions from the Deep Learning Classifier.
+
+The classifier writes two streams. The detections stream holds the
+clip of sound each detection was made from, with the results of each
+model in a "Delt" annotation. The model data stream holds the results
+of the models for each segment of sound they were run on.
+
+Each result holds a score for each class of the model, written as
+int16 values, and the class ids the scores belong to. The class ids
+are the same for every result of a model, so one read only array of
+them is shared between the results. dl_predictions gathers the results
+of every detection into one float32 array of detections x classes for
+each model, for thresholding and re-scoring with numpy.
+
+This module contains the following:
+    - DLDetectionData - A clip of sound from the detections stream
+    - DLModelData - A result from the model data stream
+    - DLPredictions - The scores of one model for many detections
+    - dl_predictions - Gather the predictions of a list of objects
+    - detection_columns - The columns of a list of detections
+    - model_columns - The columns of a list of model data objects
+
+Examples:
+
+    >>> from pypam.pgdf import PGDF
+    >>> from pypam.deeplearning import dl_predictions
+    >>> pgdf = PGDF("Deep_Learning_Classifier_DL_detection_20220722_000000.pgdf")
+    >>> predictions = dl_predictions(pgdf.module.objects)[0]
+    >>> predictions.scores.shape
+    (1200, 3)
+    >>> whistles = predictions.uids[predictions.scores[:, 1] > 0.9]
+
+"""
+
+__all__ = [
+    "DECODER",
+    "DETECTION_DECODER",
+    "DLDetectionData",
+    "DLModelData",
+    "DLPredictions",
+    "detection_columns",
+    "dl_predictions",
+    "model_columns",
+]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import struct
+
+import numpy as np
+
+from pypam.annotations import DLModelResult
+from pypam.decoders import Decoder
+
+
+class DLDetectionData:
+    """A clip of sound a detection was made from. wave holds the int16
+    samples as written, a row per channel; waveform scales them."""
+
+    def __init__(self, dat, offset, pam_data, module_header):
+        ds = offset
+        self.data_length = struct.unpack_from(">i", dat, ds)[0]
+        ds += 4
+        num_channels, num_samples, self.max_value = struct.unpack_from(">hif", dat, ds)
+        ds += 10
+        # Copied, so the buffer it came from can be released
+        self.wave = (
+            np.frombuffer(dat, ">i2", num_channels * num_samples, ds)
+            .astype(np.int16)
+            .reshape(num_channels, num_samples)
+        )
+        self.length = 4 + self.data_length
+
+    @property
+    def num_channels(self) -> int:
+        return self.wave.shape[0]
+
+    @property
+    def num_samples(self) -> int:
+        return self.wave.shape[1]
+
+    @property
+    def scale(self) -> float:
+        """The amplitude of one step of the int16 samples."""
+        return 1 / self.max_value
+
+    @property
+    def waveform(self) -> np.ndarray:
+        """The clip as float32 amplitudes, a row per channel."""
+        return self.wave.astype(np.float32) * np.float32(self.scale)
+
+    @property
+    def models(self) -> list:
+        """The model results are held in the annotations instead."""
+        return []
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return (
+            str(self.length)
+            + ","
+            + str(self.num_channels)
+            + ","
+            + str(self.num_samples)
+            + ","
+            + str(self.max_value)
+        )
+
+
+class DLModelData:
+    """A result from the model data stream, for one segment of sound."""
+
+    def __init__(self, dat, offset, pam_data, module_header):
+        ds = offset
+        self.data_length = struct.unpack_from(">i", dat, ds)[0]
+        ds += 4
+        self.result = DLModelResult(dat, ds)
+        self.length = 4 + self.data_length
+
+    @property
+    def models(self) -> list:
+        return [self.result]
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return (
+            str(self.length)
+            + ","
+            + self.result.type_name
+            + ","
+            + str(self.result.predictions.tolist())
+        )
+
+
+def _model_results(obj) -> list:
+    """The results of each model for a PGObject of either stream."""
+    if obj.pam.has_annotations:
+        anno = obj.pam.annotations.dl_classification
+
+        if anno is not None:
+            return anno.models
+
+    return obj.data.models
+
+
+class DLPredictions:
+    """The predictions of one model for many detections.
+
+    scores is a float32 array of detections x classes, with NaN where a
+    detection has fewer scores than the most. uids gives the detection
+    of each row and class_ids the class of each column, shared by every
+    row. class_names, if a lookup was given, names each column."""
+
+    def __init__(self, uids, scores, class_ids, is_binary, class_names=None):
+        self.uids = uids
+        self.scores = scores
+        self.class_ids = class_ids
+        self.is_binary = is_binary
+        self.class_names = class_names
+
+    def __len__(self):
+        return len(self.uids)
+
+
+def dl_predictions(objects: list, class_names=None) -> list:
+    """Gather the predictions of a list of PGObjects, of either stream,
+    into one DLPredictions for each model. Objects without a result for
+    a model have no row in its DLPredictions.
+
+    Args:
+        objects (list): the PGObjects.
+        class_names (dict | list): the name of each class, indexed by
+            class id, to name the columns of the scores with.
+
+    Returns:
+        list: a DLPredictions for each model, in the order they were run.
+    """
+    by_model = []
+
+    for obj in objects:
+        for m, result in enumerate(_model_results(obj)):
+            if m == len(by_model):
+                by_model.append(([], []))
+
+            by_model[m][0].append(obj.pam.UID)
+            by_model[m][1].append(result)
+
+    predictions = []
+
+    for uids, results in by_model:
+        num_classes = max(len(r.predictions) for r in results)
+        scores = np.full((len(results), num_classes), np.nan, np.float32)
+
+        for i, r in enumerate(results):
+            scores[i, : len(r.predictions)] = r.predictions
+
+        # The class ids of the widest result cover every column
+        class_ids = next(
+            r.class_ids for r in results if len(r.predictions) == num_classes
+        )
+        names = None
+
+        if class_names is not None:
+            names = [class_names[c] for c in class_ids]
+
+        predictions.append(
+            DLPredictions(
+                np.array(uids, dtype=np.int64),
+                scores,
+                class_ids,
+                np.array([r.is_binary for r in results], dtype=bool),
+                names,
+            )
+        )
+
+    return predictions
+
+
+def detection_columns(objects: list):
+    """The columns for a list of PGObjects from the detections stream.
+    The clips go into a single int16 "wave" array of detections x
+    channels x samples, padded with zeros, and wave_scale turns them
+    into amplitudes. dl_predictions gives the predictions of the
+    detections, which are in their annotations.
+
+    Args:
+        objects (list): the PGObjects.
+
+    Returns:
+        tuple: a dict of columns with a row per object, and an empty
+        dict as there are no further tables.
+    """
+    clips = [o.data for o in objects]
+    num_channels = np.array([c.num_channels for c in clips], dtype=np.int32)
+    num_samples = np.array([c.num_samples for c in clips], dtype=np.int32)
+    wave = np.zeros(
+        (len(clips), num_channels.max(initial=0), num_samples.max(initial=0)),
+        dtype=np.int16,
+    )
+
+    for i, c in enumerate(clips):
+        wave[i, : c.num_channels, : c.num_samples] = c.wave
+
+    columns = {
+        "num_channels": num_channels,
+        "num_samples": num_samples,
+        "wave_scale": np.array([c.scale for c in clips], dtype=np.float32),
+        "wave": wave,
+    }
+    return columns, {}
+
+
+def model_columns(objects: list):
+    """The columns for a list of PGObjects from the model data stream.
+    The scores go into a single float32 "predictions" array of objects
+    x classes, padded with NaN.
+
+    Args:
+        objects (list): the PGObjects.
+
+    Returns:
+        tuple: a dict of columns with a row per object, and an empty
+        dict as there are no further tables.
+    """
+    results = [o.data.result for o in objects]
+    num_classes = max((len(r.predictions) for r in results), default=0)
+    scores = np.full((len(results), num_classes), np.nan, np.float32)
+
+    for i, r in enumerate(results):
+        scores[i, : len(r.predictions)] = r.predictions
+
+    columns = {
+        "model_type": np.array([r.model_type for r in results], dtype=np.int8),
+        "is_binary": np.array([r.is_binary for r in results], dtype=bool),
+        "predictions": scores,
+    }
+    return columns, {}
+
+
+DETECTION_DECODER = Decoder(DLDetectionData, detection_columns)
+DECODER = Decoder(
+    DLModelData,
+    model_columns,
+    streams={"DL_detection": DETECTION_DECODER, "DL detection": DETECTION_DECODER},
+)
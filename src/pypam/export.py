@@ -0,0 +1,174 @@
+""" Exporting the decoded objects of a pgdf file to Parquet or Arrow
+IPC files, for analysis tools that read columnar data.
+
+Objects are turned into columns and written in batches as the file is
+decoded, so memory use is bounded by the batch size rather than the
+size of the file. Each file gives one table with a row per object,
+plus any further tables of the module - for Gemini tracks, a points
+table joined to the tracks by UID.
+
+pyarrow is needed for this module. Install it with pip install pyarrow.
+
+This module contains the following:
+    - export_pgdf - Write the objects of a pgdf file to Parquet or Arrow
+    - columns_to_table - Turn a dict of numpy columns into an Arrow table
+
+Examples:
+
+    >>> from pypam.export import export_pgdf
+    >>> paths = export_pgdf("test.pgdf", "/data/parquet")
+    >>> paths["points"]
+    '/data/parquet/test.points.parquet'
+
+"""
+
+__all__ = ["EXPORT_FORMATS", "columns_to_table", "export_pgdf"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import os
+
+import numpy as np
+
+from pypam.columns import ModuleColumns
+from pypam.file import FileHeader
+from pypam.module import PGObject
+from pypam.pgdf import PGDF
+
+# The file extension for each format we can write.
+EXPORT_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Exporting needs pyarrow - pip install pyarrow") from e
+
+    return pyarrow
+
+
+def columns_to_table(columns: dict):
+    """Turn a dict of numpy columns into an Arrow table. Columns with
+    more than one dimension, such as waveforms, become lists of their
+    rows. These are variable size lists, so batches padded to different
+    sizes still share a schema.
+
+    Args:
+        columns (dict): the numpy arrays, all of the same length.
+
+    Returns:
+        pyarrow.Table: the table.
+    """
+    pa = _import_pyarrow()
+    arrays = []
+
+    for col in columns.values():
+        col = np.asarray(col)
+        array = pa.array(col.reshape(-1))
+
+        for axis in reversed(range(1, col.ndim)):
+            rows = int(np.prod(col.shape[:axis]))
+            offsets = np.arange(rows + 1, dtype=np.int32) * col.shape[axis]
+            array = pa.ListArray.from_arrays(offsets, array)
+
+        arrays.append(array)
+
+    return pa.Table.from_arrays(arrays, names=list(columns.keys()))
+
+
+class _TableWriter:
+    """Writes batches of one table to a Parquet or Arrow IPC file,
+    opening the file with the schema of the first batch."""
+
+    def __init__(self, path: str, export_format: str):
+        self.path = path
+        self.export_format = export_format
+        self.writer = None
+
+    def write(self, columns: dict):
+        pa = _import_pyarrow()
+        table = columns_to_table(columns)
+
+        if self.writer is None:
+            if self.export_format == "parquet":
+                import pyarrow.parquet as pq
+
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                self.writer = pa.ipc.new_file(self.path, table.schema)
+
+        # For Parquet each batch becomes a row group.
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def export_pgdf(
+    pgdf_path: str, out_dir: str, export_format="parquet", batch_size=10000
+) -> dict:
+    """Decode a pgdf file and write its objects out as columns, a
+    batch at a time.
+
+    The objects go to <out_dir>/<name>.parquet, and each further table
+    of the module to <out_dir>/<name>.<table>.parquet, where name is
+    the name of the pgdf file without its extension.
+
+    Args:
+        pgdf_path (str): full path and name of the pgdf file.
+        out_dir (str): the directory to write to.
+        export_format (str): "parquet" or "arrow" (Arrow IPC).
+        batch_size (int): the number of objects decoded before they are
+            written out - each batch is a Parquet row group.
+
+    Returns:
+        dict: the path written for each table, with the objects table
+        under "objects".
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError("export_format must be parquet or arrow")
+
+    _import_pyarrow()
+    os.makedirs(out_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(pgdf_path))[0]
+    ext = EXPORT_FORMATS[export_format]
+    writers = {}
+    header = None
+    batch = []
+
+    def flush():
+        parts = ModuleColumns.from_objects(header.module_type, batch, header.decoder)
+        tables = {"objects": parts.columns}
+        tables.update(parts.tables)
+
+        for table, columns in tables.items():
+            if table not in writers:
+                suffix = "" if table == "objects" else "." + table
+                path = os.path.join(out_dir, name + suffix + ext)
+                writers[table] = _TableWriter(path, export_format)
+
+            writers[table].write(columns)
+
+        batch.clear()
+
+    try:
+        for record in PGDF.iter_objects(pgdf_path, background=False):
+            if isinstance(record, FileHeader):
+                header = record
+            elif isinstance(record, PGObject):
+                batch.append(record)
+
+                if len(batch) >= batch_size:
+                    flush()
+
+        # Always write the last batch, so even an empty file gives
+        # tables with the right columns.
+        if len(batch) > 0 or len(writers) == 0:
+            flush()
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    return {table: writer.path for table, writer in writers.items()}
@@ -1,180 +1,209 @@
-""" The file headers and footers for the
-PAMGuard binary files.
-
-This module contains the following:
-    - FileHeader - A class that represents the Header of the PGDF File
-    - FileFooter - A class that represents the Footer of the PGDF File
-"""
-
-__all__ = ["FileHeader", "FileFooter"]
-__version__ = "0.1"
-__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
-
-import struct
-import datetime
-from pypam.util.time import epoch
-
-
-class FileHeader:
-    """Appears at the beginning of the pgdf file. Should be the
-    very first thing."""
-
-    def __init__(self, dat: bytes, offset: int):
-        ds = offset
-        # There is a module header first
-        self.length = struct.unpack(">i", dat[ds : ds + 4])[0]
-        self.identifier = struct.unpack(">i", dat[ds + 4 : ds + 8])[0]
-        self.file_version = struct.unpack(">i", dat[ds + 8 : ds + 12])[0]
-        self.pamguard = str(dat[ds + 12 : ds + 24], "utf-8")
-        ds += 24
-        dt = struct.unpack(">h", dat[ds : ds + 2])[0]
-        ds += 2
-
-        if dt > 0:
-            self.pamguard_version = str(dat[ds : ds + dt], "utf-8")
-            ds += dt
-        else:
-            self.pamguard_version = ""
-
-        dt = struct.unpack(">h", dat[ds : ds + 2])[0]
-        ds += 2
-
-        if dt > 0:
-            self.branch = str(dat[ds : ds + dt], "utf-8")
-            ds += dt
-        else:
-            self.branch = ""
-
-        # TODO - maybe round off milliseconds here as well
-        dm = struct.unpack(">q", dat[ds : ds + 8])[0]
-        self.data_date = epoch() + datetime.timedelta(milliseconds=dm)
-        dm = struct.unpack(">q", dat[ds + 8 : ds + 16])[0]
-        self.analysis_date = epoch() + datetime.timedelta(milliseconds=dm)
-        dm = struct.unpack(">q", dat[ds + 16 : ds + 24])[0]
-        self.start_sample = epoch() + datetime.timedelta(milliseconds=dm)
-        ds += 24
-
-        dt = struct.unpack(">h", dat[ds : ds + 2])[0]
-        ds += 2
-
-        if dt > 0:
-            self.module_type = str(dat[ds : ds + dt], "utf-8")
-            ds += dt
-        else:
-            self.module_type = ""
-
-        dt = struct.unpack(">h", dat[ds : ds + 2])[0]
-        ds += 2
-
-        if dt > 0:
-            self.module_name = str(dat[ds : ds + dt], "utf-8")
-            ds += dt
-        else:
-            self.module_name = ""
-
-        dt = struct.unpack(">h", dat[ds : ds + 2])[0]
-        ds += 2
-
-        if ds > 0:
-            self.stream_name = str(dat[ds : ds + dt], "utf-8")
-            ds += dt
-        else:
-            self.stream_name = ""
-
-        self.extra_info_len = struct.unpack(">i", dat[ds : ds + 4])[0]
-        ds += 4
-
-        # TODO - There is an extra info bit but for now, we skip it
-        ds += self.extra_info_len
-        self.length = ds
-
-    def __len__(self):
-        return self.length
-
-    def __str__(self):
-        return (
-            str(self.length)
-            + ","
-            + str(self.identifier)
-            + ","
-            + str(self.file_version)
-            + ","
-            + str(self.pamguard)
-            + ","
-            + str(self.pamguard_version)
-            + ","
-            + str(self.branch)
-            + ","
-            + str(self.data_date)
-            + ","
-            + str(self.analysis_date)
-            + ","
-            + str(self.start_sample)
-            + ","
-            + str(self.module_type)
-            + ","
-            + str(self.module_name)
-            + ","
-            + str(self.stream_name)
-            + ","
-            + str(self.extra_info_len)
-            + ","
-            + str(self.length)
-        )
-
-
-class FileFooter:
-    def __init__(self, version, dat, offset):
-        ds = offset
-        self.length = struct.unpack(">i", dat[ds : ds + 4])[0]
-        self.identifier = struct.unpack(">i", dat[ds + 4 : ds + 8])[0]
-        self.num_objects = struct.unpack(">i", dat[ds + 8 : ds + 12])[0]
-        dm = struct.unpack(">q", dat[ds + 12 : ds + 20])[0]
-        self.data_date = epoch() + datetime.timedelta(milliseconds=dm)
-        dm = struct.unpack(">q", dat[ds + 20 : ds + 28])[0]
-        self.analysis_date = epoch() + datetime.timedelta(milliseconds=dm)
-        self.end_sample = struct.unpack(">q", dat[ds + 28 : ds + 36])[0]
-        ds += 36
-
-        self.lowest_UID = -1
-        self.highest_UID = -1
-
-        if version >= 3:
-            self.lowest_UID = struct.unpack(">q", dat[ds : ds + 8])[0]
-            self.highest_UID = struct.unpack(">q", dat[ds + 8 : ds + 16])[0]
-            ds += 16
-
-        self.file_length = struct.unpack(">q", dat[ds : ds + 8])[0]
-        self.end_reason = struct.unpack(">i", dat[ds + 4 : ds + 8])[0]
-        ds += 8
-        # self.length = ds
-
-    def __str__(self):
-        return (
-            str(self.length)
-            + ","
-            + str(self.identifier)
-            + ","
-            + str(self.num_objects)
-            + ","
-            + str(self.data_date)
-            + ","
-            + str(self.end_sample)
-            + ","
-            + str(self.data_date)
-            + ","
-            + str(self.analysis_date)
-            + ","
-            + str(self.end_sample)
-            + ","
-            + str(self.lowest_UID)
-            + ","
-            + str(self.highest_UID)
-            + ","
-            + str(self.file_length)
-            + ","
-            + str(self.end_reason)
-        )
-
-    def __len__(self):
-        return self.length
+""" The file headers and footers for the
+PAMGuard binary files.
+
+This module contains the following:
+    - FileHeader - A class that represents the Header of the PGDF File
+    - FileFooter - A class that represents the Footer of the PGDF File
+    - pack_file_footer - The bytes of a FileFooter record
+"""
+
+__all__ = ["FileHeader", "FileFooter", "pack_file_footer"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import struct
+import datetime
+import functools
+from pypam.decoders import Decoder, get_decoder
+from pypam.util.time import millis_to_datetime
+from pypam.util.read import read_java_string
+
+
+class FileHeader:
+    """Appears at the beginning of the pgdf file. Should be the
+    very first thing."""
+
+    def __init__(self, dat: bytes, offset: int):
+        ds = offset
+        # There is a module header first
+        self.length, self.identifier, self.file_version = struct.unpack_from(
+            ">iii", dat, ds
+        )
+        self.pamguard = str(dat[ds + 12 : ds + 24], "utf-8")
+        ds += 24
+        self.pamguard_version, dv = read_java_string(dat, ds)
+        ds += dv
+        self.branch, dv = read_java_string(dat, ds)
+        ds += dv
+
+        # TODO - maybe round off milliseconds here as well
+        (
+            self.data_millis,
+            self.analysis_millis,
+            self.start_sample_millis,
+        ) = struct.unpack_from(">qqq", dat, ds)
+        ds += 24
+
+        self.module_type, dv = read_java_string(dat, ds)
+        ds += dv
+        self.module_name, dv = read_java_string(dat, ds)
+        ds += dv
+        self.stream_name, dv = read_java_string(dat, ds)
+        ds += dv
+
+        self.extra_info_len = struct.unpack_from(">i", dat, ds)[0]
+        ds += 4
+
+        # TODO - There is an extra info bit but for now, we skip it
+        ds += self.extra_info_len
+        self.length = ds - offset
+
+    @functools.cached_property
+    def decoder(self) -> Decoder:
+        """The decoder for the objects of this file, looked up once
+        from the module type, name and stream. None if there is no
+        decoder."""
+        decoder = get_decoder(self.module_type, self.module_name)
+
+        if decoder is not None:
+            decoder = decoder.for_stream(self.stream_name)
+
+        return decoder
+
+    @property
+    def data_date(self) -> datetime.datetime:
+        return millis_to_datetime(self.data_millis)
+
+    @property
+    def analysis_date(self) -> datetime.datetime:
+        return millis_to_datetime(self.analysis_millis)
+
+    @property
+    def start_sample(self) -> datetime.datetime:
+        return millis_to_datetime(self.start_sample_millis)
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return (
+            str(self.length)
+            + ","
+            + str(self.identifier)
+            + ","
+            + str(self.file_version)
+            + ","
+            + str(self.pamguard)
+            + ","
+            + str(self.pamguard_version)
+            + ","
+            + str(self.branch)
+            + ","
+            + str(self.data_date)
+            + ","
+            + str(self.analysis_date)
+            + ","
+            + str(self.start_sample)
+            + ","
+            + str(self.module_type)
+            + ","
+            + str(self.module_name)
+            + ","
+            + str(self.stream_name)
+            + ","
+            + str(self.extra_info_len)
+            + ","
+            + str(self.length)
+        )
+
+
+class FileFooter:
+    def __init__(self, version, dat, offset):
+        ds = offset
+        self.length, self.identifier, self.num_objects = struct.unpack_from(
+            ">iii", dat, ds
+        )
+        (
+            self.data_millis,
+            self.analysis_millis,
+            self.end_sample,
+        ) = struct.unpack_from(">qqq", dat, ds + 12)
+        ds += 36
+
+        self.lowest_UID = -1
+        self.highest_UID = -1
+
+        if version >= 3:
+            self.lowest_UID, self.highest_UID = struct.unpack_from(">qq", dat, ds)
+            ds += 16
+
+        self.file_length = struct.unpack_from(">q", dat, ds)[0]
+        self.end_reason = 0
+        ds += 8
+
+        if ds + 4 <= offset + self.length:
+            self.end_reason = struct.unpack_from(">i", dat, ds)[0]
+            ds += 4
+        # self.length = ds
+
+    @property
+    def data_date(self) -> datetime.datetime:
+        return millis_to_datetime(self.data_millis)
+
+    @property
+    def analysis_date(self) -> datetime.datetime:
+        return millis_to_datetime(self.analysis_millis)
+
+    def __str__(self):
+        return (
+            str(self.length)
+            + ","
+            + str(self.identifier)
+            + ","
+            + str(self.num_objects)
+            + ","
+            + str(self.data_date)
+            + ","
+            + str(self.end_sample)
+            + ","
+            + str(self.data_date)
+            + ","
+            + str(self.analysis_date)
+            + ","
+            + str(self.end_sample)
+            + ","
+            + str(self.lowest_UID)
+            + ","
+            + str(self.highest_UID)
+            + ","
+            + str(self.file_length)
+            + ","
+            + str(self.end_reason)
+        )
+
+    def __len__(self):
+        return self.length
+
+
+def pack_file_footer(
+    num_objects: int,
+    end_millis: int,
+    lowest_uid: int,
+    highest_uid: int,
+    file_length: int,
+    version=3,
+    end_reason=1,
+) -> bytes:
+    """The FileFooter record. The UID range is only written from
+    version 3, and end_reason is left off if it is None."""
+    body = struct.pack(">iqqq", num_objects, end_millis, end_millis, 0)
+
+    if version >= 3:
+        body += struct.pack(">qq", lowest_uid, highest_uid)
+
+    body += struct.pack(">q", file_length)
+
+    if end_reason is not None:
+        body += struct.pack(">i", end_reason)
+
+    return struct.pack(">ii", 8 + len(body), -2) + body
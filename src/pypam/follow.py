@@ -0,0 +1,202 @@
+""" Following pgdf files while PAMGuard is still writing them.
+
+A PGDFFollower remembers the byte offset just past the last complete
+record it has read. Each poll reads only what has been appended since,
+decodes the complete records and leaves any partly written record at
+the end for the next poll. A file without a FileFooter is simply one
+that is not finished yet.
+
+follow goes a step further and follows a whole directory, moving on to
+the next file when PAMGuard starts one. It waits between polls with
+inotify if the inotify_simple package is installed, and by sleeping
+otherwise.
+
+This module contains the following:
+    - PGDFFollower - Read the records appended to a pgdf file
+    - follow - Yield the objects written to a directory as they appear
+
+Examples:
+
+    >>> from pypam.follow import follow
+    >>> for obj in follow("/data/live", pattern="Gemini_*.pgdf"):
+    ...     print(obj.pam.UID, obj.pam.date)
+
+"""
+
+__all__ = ["PGDFFollower", "follow"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import glob
+import os
+import struct
+import time
+
+from pypam.file import FileFooter, FileHeader
+from pypam.module import ModuleHeader, PGObject
+from pypam.pgdf import BACKGROUND, read_record
+
+
+class PGDFFollower:
+    """Reads a pgdf file a bit at a time as it grows."""
+
+    def __init__(self, pgdf_path: str, background=False):
+        self.pgdf_path = pgdf_path
+        self.background = background
+        self.offset = 0
+        self.header = None
+        self.module_header = None
+        self.footer = None
+
+    @property
+    def finished(self) -> bool:
+        """Whether the FileFooter has been read, so nothing more will
+        be written to the file."""
+        return self.footer is not None
+
+    def poll(self) -> list:
+        """Read the records that have been completed since the last
+        poll.
+
+        Returns:
+            list: the new records, in file order. Background records
+            are skipped, without being decoded, unless background was
+            set.
+        """
+        if self.finished:
+            return []
+
+        try:
+            with open(self.pgdf_path, "rb") as f:
+                f.seek(self.offset)
+                dat = f.read()
+        except FileNotFoundError:
+            return []
+
+        records = []
+        ds = 0
+
+        # Stop at a record that has not been completely written yet.
+        while ds + 8 <= len(dat):
+            length, rec_type = struct.unpack_from(">ii", dat, ds)
+
+            if length <= 0 or ds + length > len(dat):
+                break
+
+            if rec_type == BACKGROUND and not self.background:
+                ds += length
+                continue
+
+            record = read_record(dat, ds, self.header, self.module_header)
+            ds += length
+
+            if isinstance(record, FileHeader):
+                self.header = record
+            elif isinstance(record, ModuleHeader):
+                self.module_header = record
+            elif isinstance(record, FileFooter):
+                self.footer = record
+
+            records.append(record)
+
+        self.offset += ds
+        return records
+
+
+class _Waiter:
+    """Waits for the next poll - until something in the directory
+    changes if inotify is available, otherwise for the interval."""
+
+    def __init__(self, directory: str, interval: float, use_inotify: bool):
+        self.interval = interval
+        self.inotify = None
+
+        if use_inotify:
+            try:
+                from inotify_simple import INotify, flags
+            except ImportError:
+                return
+
+            self.inotify = INotify()
+            self.inotify.add_watch(
+                directory, flags.MODIFY | flags.CREATE | flags.CLOSE_WRITE
+            )
+
+    def wait(self):
+        if self.inotify is not None:
+            # Returns as soon as there are events, or after the interval.
+            self.inotify.read(timeout=int(self.interval * 1000))
+        elif self.interval > 0:
+            time.sleep(self.interval)
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+
+
+def follow(
+    directory: str,
+    pattern="*.pgdf",
+    interval=1.0,
+    use_inotify=True,
+    from_start=False,
+    stop=None,
+):
+    """Yield the objects written to the files of a directory, as
+    PAMGuard writes them, moving on to each new file as it starts.
+
+    Files are taken in order of name, which for PAMGuard's names,
+    ending in the date and time, is the order they were started. A
+    file is left once its FileFooter is read, or once a later file
+    appears and everything written to it so far has been read.
+
+    Args:
+        directory (str): the directory PAMGuard writes to.
+        pattern (str): the pattern of files to follow.
+        interval (float): the seconds to wait between polls.
+        use_inotify (bool): wake up as soon as a file changes, if the
+            inotify_simple package is installed.
+        from_start (bool): read every file already in the directory,
+            rather than starting with the latest.
+        stop (callable): called before each wait - return True to stop
+            following. None follows forever.
+
+    Yields:
+        PGObject: each new object, in file order.
+    """
+    waiter = _Waiter(directory, interval, use_inotify)
+    done = set()
+    follower = None
+    started = from_start
+
+    try:
+        while True:
+            paths = sorted(glob.glob(os.path.join(directory, pattern)))
+            waiting = [p for p in paths if p not in done]
+
+            if follower is None and len(waiting) > 0:
+                # After the first file, never skip one.
+                follower = PGDFFollower(waiting[0] if started else waiting[-1])
+                started = True
+
+            while follower is not None:
+                # Look for a later file before polling, so that if there
+                # is one, the poll reads all PAMGuard wrote to this file.
+                later = [p for p in waiting if p > follower.pgdf_path]
+
+                for record in follower.poll():
+                    if isinstance(record, PGObject):
+                        yield record
+
+                if not follower.finished and len(later) == 0:
+                    break
+
+                done.update(p for p in waiting if p <= follower.pgdf_path)
+                follower = PGDFFollower(later[0]) if len(later) > 0 else None
+
+            if stop is not None and stop():
+                return
+
+            waiter.wait()
+    finally:
+        waiter.close()
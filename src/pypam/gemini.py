@@ -3,13 +3,47 @@ subsequently annotated.
 
 """
 
-__all__ = ["GeminiData"]
+__all__ = [
+    "DECODER",
+    "TRACK_POINT_COLUMNS",
+    "TRACK_POINT_DTYPE",
+    "GeminiData",
+    "Track",
+    "TrackPoint",
+    "gemini_columns",
+]
 __version__ = "0.1"
 __author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
 
-import struct
 import datetime
-from pypam.util.time import epoch
+import struct
+
+import numpy as np
+
+from pypam.decoders import Decoder
+from pypam.util.time import epoch, millis_to_datetime, millis_to_datetime64
+
+# The layout of a single 50 byte track point, as written by PAMGuard.
+TRACK_POINT_DTYPE = np.dtype(
+    [
+        ("time_millis", ">i8"),
+        ("sonar_id", ">i2"),
+        ("min_bearing", ">f4"),
+        ("max_bearing", ">f4"),
+        ("peak_bearing", ">f4"),
+        ("min_range", ">f4"),
+        ("max_range", ">f4"),
+        ("peak_range", ">f4"),
+        ("obj_size", ">f4"),
+        ("occupancy", ">f4"),
+        ("average_value", ">i2"),
+        ("total_value", ">i4"),
+        ("max_value", ">i2"),
+    ]
+)
+
+# The same layout in native byte order, which is what we keep in memory.
+TRACK_POINT_COLUMNS = TRACK_POINT_DTYPE.newbyteorder("=")
 
 
 class TrackPoint:
@@ -31,7 +65,7 @@ class TrackPoint:
         totalv: int,
         maxv: int,
     ):
-        self.time = epoch(zone="UTC") + datetime.timedelta(milliseconds=tmillis)
+        self.time_millis = tmillis
         self.sonar_id = sonar_id
         self.min_bearing = minb
         self.max_bearing = maxb
@@ -45,6 +79,11 @@ class TrackPoint:
         self.total_value = totalv
         self.max_value = maxv
 
+    @property
+    def time(self) -> datetime.datetime:
+        """The time of this point, built from time_millis."""
+        return millis_to_datetime(self.time_millis, zone="UTC")
+
     def __str__(self):
         return (
             str(self.time)
@@ -76,63 +115,83 @@ class TrackPoint:
 
 
 class Track:
-    """A class that holds all the points of a track."""
+    """A class that holds all the points of a track. The points are
+    held as a structured array with one row per point, in the
+    TRACK_POINT_COLUMNS layout. TrackPoint objects are only built if
+    the points attribute is accessed."""
 
     def __init__(self):
-        self.points = []
-        self.time_start = epoch(zone="UTC")
-        self.time_end = epoch(zone="UTC")
+        self.columns = np.empty(0, dtype=TRACK_POINT_COLUMNS)
+        self._points = None
 
-    def add_point_from_dat(self, dat, offset) -> int:
-        # TODO - possibly set this with underscore for internal function
-        ds = offset
-        time_millis = struct.unpack(">q", dat[ds : ds + 8])[0]
-        sonar_id = struct.unpack(">h", dat[ds + 8 : ds + 10])[0]
-        min_bearing = struct.unpack(">f", dat[ds + 10 : ds + 14])[0]
-        max_bearing = struct.unpack(">f", dat[ds + 14 : ds + 18])[0]
-        peak_bearing = struct.unpack(">f", dat[ds + 18 : ds + 22])[0]
-        min_range = struct.unpack(">f", dat[ds + 22 : ds + 26])[0]
-        max_range = struct.unpack(">f", dat[ds + 26 : ds + 30])[0]
-        peak_range = struct.unpack(">f", dat[ds + 30 : ds + 34])[0]
-        obj_size = struct.unpack(">f", dat[ds + 34 : ds + 38])[0]
-        occupancy = struct.unpack(">f", dat[ds + 38 : ds + 42])[0]
-        average_value = struct.unpack(">h", dat[ds + 42 : ds + 44])[0]
-        total_value = struct.unpack(">i", dat[ds + 44 : ds + 48])[0]
-        max_value = struct.unpack(">h", dat[ds + 48 : ds + 50])[0]
-
-        if len(self.points) == 0:
-            self.time_start += datetime.timedelta(milliseconds=time_millis)
-            self.time_end += datetime.timedelta(milliseconds=time_millis)
-        else:
-            self.time_end = epoch(zone="UTC") + datetime.timedelta(
-                milliseconds=time_millis
-            )
+    @property
+    def points(self) -> list:
+        """The points of the track as TrackPoint objects, sorted by
+        time. These are created the first time they are asked for."""
+        if self._points is None:
+            self._points = [TrackPoint(*p) for p in self.columns.tolist()]
+
+        return self._points
+
+    @property
+    def times(self) -> np.ndarray:
+        """The times of the points as a datetime64[ms] array."""
+        return millis_to_datetime64(self.columns["time_millis"])
+
+    @property
+    def time_start(self) -> datetime.datetime:
+        """The time of the earliest point, or the epoch if empty."""
+        if len(self.columns) == 0:
+            return epoch(zone="UTC")
 
-        self.points.append(
-            TrackPoint(
-                time_millis,
-                sonar_id,
-                min_bearing,
-                max_bearing,
-                peak_bearing,
-                min_range,
-                max_range,
-                peak_range,
-                obj_size,
-                occupancy,
-                average_value,
-                total_value,
-                max_value,
+        return millis_to_datetime(self.columns["time_millis"][0], zone="UTC")
+
+    @property
+    def time_end(self) -> datetime.datetime:
+        """The time of the latest point, or the epoch if empty."""
+        if len(self.columns) == 0:
+            return epoch(zone="UTC")
+
+        return millis_to_datetime(self.columns["time_millis"][-1], zone="UTC")
+
+    def add_points_from_dat(self, dat, offset, num_points) -> int:
+        """Decode a block of num_points points in one go and add them
+        to the track. Returns the number of bytes read."""
+        if num_points > 0:
+            block = np.frombuffer(
+                dat, dtype=TRACK_POINT_DTYPE, count=num_points, offset=offset
             )
-        )
+            self.add_points(block)
+
+        return num_points * TRACK_POINT_DTYPE.itemsize
+
+    def add_point_from_dat(self, dat, offset) -> int:
+        """Decode a single point and add it to the track. Returns the
+        number of bytes read. Each call copies the points held so far,
+        so use add_points_from_dat when reading a whole record."""
+        return self.add_points_from_dat(dat, offset, 1)
+
+    def add_points(self, block: np.ndarray):
+        """Add a block of points, in either TRACK_POINT_DTYPE or
+        TRACK_POINT_COLUMNS layout, to the track. The points are
+        sorted by time once for the whole block, and not at all if
+        they are already in order."""
+        if len(self.columns) == 0:
+            columns = block.astype(TRACK_POINT_COLUMNS)
+        else:
+            columns = np.concatenate((self.columns, block.astype(TRACK_POINT_COLUMNS)))
 
         # Sort points by time going forward. Useful later
-        self.points = sorted(self.points, key=lambda point: point.time)
+        times = columns["time_millis"]
 
-        return 50
+        if np.any(times[1:] < times[:-1]):
+            columns = columns[np.argsort(times, kind="stable")]
+
+        self.columns = columns
+        self._points = None
 
     def __len__(self):
-        return self.track_length
+        return len(self.columns)
 
     def __str__(self):
         s = "["
@@ -149,33 +208,36 @@ class GeminiData:
     """A class representing a track from the Tritech Gemini sonar
     that has been annoted by the user."""
 
-    def __init__(self, dat, offset):
+    def __init__(self, dat, offset, pam_data=None, module_header=None):
+        # The PAMData and module header are not needed for Gemini tracks
         ds = offset
-        self.data_length = struct.unpack(">i", dat[ds : ds + 4])[0]
-        self.num_points = struct.unpack(">i", dat[ds + 4 : ds + 8])[0]
-        self.num_sonar = struct.unpack(">b", dat[ds + 8 : ds + 9])[0]
+        self.data_length = struct.unpack_from(">i", dat, ds)[0]
+        self.num_points = struct.unpack_from(">i", dat, ds + 4)[0]
+        self.num_sonar = struct.unpack_from(">b", dat, ds + 8)[0]
         self.sonar_ids = []
         ds += 9
 
         for i in range(self.num_sonar):
-            self.sonar_ids.append(struct.unpack(">h", dat[ds : ds + 2])[0])
+            self.sonar_ids.append(struct.unpack_from(">h", dat, ds)[0])
             ds += 2
 
-        self.straight_length = struct.unpack(">f", dat[ds : ds + 4])[0]
-        self.wobbly_length = struct.unpack(">f", dat[ds + 4 : ds + 8])[0]
-        self.mean_occupancy = struct.unpack(">f", dat[ds + 8 : ds + 12])[0]
+        self.straight_length = struct.unpack_from(">f", dat, ds)[0]
+        self.wobbly_length = struct.unpack_from(">f", dat, ds + 4)[0]
+        self.mean_occupancy = struct.unpack_from(">f", dat, ds + 8)[0]
         ds += 12
 
         # print("Nums",self.data_length, self.num_points, self.num_sonar, self.sonar_ids, self.straight_length, self.wobbly_length, self.mean_occupancy)
 
         self.track = Track()
-
-        for i in range(self.num_points):
-            rec_size = self.track.add_point_from_dat(dat, ds)
-            ds += rec_size
-
+        ds += self.track.add_points_from_dat(dat, ds, self.num_points)
         self.length = ds - offset
 
+    @property
+    def points(self) -> np.ndarray:
+        """The points of the track as a structured array, one row per
+        point, with the fields of TRACK_POINT_COLUMNS."""
+        return self.track.columns
+
     def __len__(self):
         return self.length
 
@@ -195,3 +257,45 @@ class GeminiData:
             + ","
             + str(self.wobbly_length)
         )
+
+
+def gemini_columns(objects: list):
+    """The Gemini specific columns for a list of PGObjects holding
+    GeminiData, and a points table with a row per track point.
+
+    Args:
+        objects (list): the PGObjects.
+
+    Returns:
+        tuple: a dict of columns with a row per object, and a dict
+        holding the points table, joined to the objects by UID.
+    """
+    columns = {
+        "num_points": np.array([o.data.num_points for o in objects], dtype=np.int32),
+        "num_sonar": np.array([o.data.num_sonar for o in objects], dtype=np.int8),
+        "straight_length": np.array(
+            [o.data.straight_length for o in objects], dtype=np.float32
+        ),
+        "wobbly_length": np.array(
+            [o.data.wobbly_length for o in objects], dtype=np.float32
+        ),
+        "mean_occupancy": np.array(
+            [o.data.mean_occupancy for o in objects], dtype=np.float32
+        ),
+    }
+
+    if len(objects) > 0:
+        points = np.concatenate([o.data.points for o in objects])
+    else:
+        points = np.empty(0, dtype=TRACK_POINT_COLUMNS)
+
+    uids = np.repeat(
+        np.array([o.pam.UID for o in objects], dtype=np.int64),
+        [len(o.data.points) for o in objects],
+    )
+    table = {"UID": uids}
+    table.update({name: points[name].copy() for name in points.dtype.names})
+    return columns, {"points": table}
+
+
+DECODER = Decoder(GeminiData, gemini_columns)
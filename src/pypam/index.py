@@ -0,0 +1,296 @@
+""" A sidecar index of the objects in a pgdf file, so that single
+objects can be found without decoding the whole file.
+
+The index is built in one pass that hops from record to record using
+the record lengths, reading only the millis and UID of each object.
+It is saved next to the file as <file>.pgdf.idx.
+
+This module contains the following:
+    - PGDFIndex - The offsets, lengths, identifiers, millis and UIDs
+      of the objects in a pgdf file
+    - index_path - The path of the sidecar index for a pgdf file
+    - open_index - Load the index for a file, rebuilding it if stale
+
+Examples:
+
+    >>> from pypam.index import open_index
+    >>> index = open_index("test.pgdf")
+    >>> positions = index.find_uids([1861000198, 1861000199])
+
+"""
+
+__all__ = ["INDEX_DTYPE", "PGDFIndex", "index_path", "open_index"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import os
+import struct
+
+import numpy as np
+
+from pypam.pamdata import FLAG_BITMAP, get_layout
+from pypam.util.read import open_buffer
+
+# Bump this if the layout of the saved index changes.
+INDEX_VERSION = 3
+
+INDEX_DTYPE = np.dtype(
+    [
+        ("offset", np.int64),
+        ("length", np.int32),
+        ("identifier", np.int32),
+        ("millis", np.int64),
+        ("uid", np.int64),
+    ]
+)
+
+
+def index_path(pgdf_path: str) -> str:
+    """The path of the sidecar index for a pgdf file."""
+    return str(pgdf_path) + ".idx"
+
+
+class PGDFIndex:
+    """The offsets, lengths, identifiers, millis and UIDs of the data
+    objects in a pgdf file, in file order. The position of an object
+    is its row in records. Objects without a UID have a uid of -1.
+
+    Background records are not objects, so are kept apart, in the same
+    form, in background. Finding objects by time or UID never returns
+    them, but copying a file, as subset_pgdf does, can keep them."""
+
+    def __init__(
+        self,
+        records: np.ndarray,
+        file_size: int,
+        file_mtime: int,
+        footer_offset: int = -1,
+        footer_objects: int = -1,
+        background=None,
+    ):
+        self.records = records
+        self.background = (
+            background if background is not None else np.empty(0, INDEX_DTYPE)
+        )
+        self.file_size = file_size
+        self.file_mtime = file_mtime
+        self.footer_offset = footer_offset
+        self.footer_objects = footer_objects
+        self._uid_order = None
+
+    @staticmethod
+    def build(pgdf_path: str, memory_map=True):
+        """Build the index for a pgdf file in one pass.
+
+        Args:
+            pgdf_path (str): full path and name of the pgdf file.
+            memory_map (bool): map the file rather than reading it.
+
+        Returns:
+            PGDFIndex: the index of the file.
+        """
+        stat = os.stat(pgdf_path)
+        rows = []
+        background = []
+        file_version = 0
+        footer_offset = -1
+        footer_objects = -1
+
+        with open_buffer(pgdf_path, memory_map) as dat:
+            ds = 0
+
+            # A truncated record at the end is left out.
+            while ds + 8 <= len(dat):
+                length, identifier = struct.unpack_from(">ii", dat, ds)
+
+                if length <= 0 or ds + length > len(dat):
+                    break
+
+                if identifier == -1:
+                    file_version = struct.unpack_from(">i", dat, ds + 8)[0]
+                elif identifier == -2:
+                    footer_offset = ds
+                    footer_objects = struct.unpack_from(">i", dat, ds + 8)[0]
+                elif identifier < -5 or identifier >= 0:
+                    millis = struct.unpack_from(">q", dat, ds + 8)[0]
+                    # Background records are -6
+                    found = background if identifier == -6 else rows
+                    found.append(
+                        (ds, length, identifier, millis)
+                        + _read_uid(dat, ds, file_version)
+                    )
+
+                ds += length
+
+        return PGDFIndex(
+            np.array(rows, dtype=INDEX_DTYPE),
+            stat.st_size,
+            stat.st_mtime_ns,
+            footer_offset,
+            footer_objects,
+            np.array(background, dtype=INDEX_DTYPE),
+        )
+
+    @staticmethod
+    def load(idx_path: str):
+        """Load a saved index.
+
+        Args:
+            idx_path (str): full path and name of the index file.
+
+        Returns:
+            PGDFIndex: the index, or None if it is not one we can read.
+        """
+        try:
+            with np.load(idx_path, allow_pickle=False) as saved:
+                meta = saved["meta"]
+                records = saved["records"]
+                background = saved["background"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        if meta[0] != INDEX_VERSION or records.dtype != INDEX_DTYPE:
+            return None
+
+        meta = [int(m) for m in meta[1:]]
+        return PGDFIndex(records, *meta, background=background)
+
+    def save(self, idx_path: str):
+        """Save the index. It is written to a temporary file first, so
+        a reader never sees half an index."""
+        meta = np.array(
+            [
+                INDEX_VERSION,
+                self.file_size,
+                self.file_mtime,
+                self.footer_offset,
+                self.footer_objects,
+            ],
+            dtype=np.int64,
+        )
+        tmp_path = idx_path + ".tmp"
+
+        with open(tmp_path, "wb") as f:
+            np.savez(f, meta=meta, records=self.records, background=self.background)
+
+        os.replace(tmp_path, idx_path)
+
+    def is_valid(self, pgdf_path: str) -> bool:
+        """Check the index still matches the file - its size, mtime
+        and, if it had one, the FileFooter."""
+        try:
+            stat = os.stat(pgdf_path)
+        except OSError:
+            return False
+
+        if stat.st_size != self.file_size or stat.st_mtime_ns != self.file_mtime:
+            return False
+
+        if self.footer_offset < 0:
+            return True
+
+        with open(pgdf_path, "rb") as f:
+            f.seek(self.footer_offset)
+            footer = f.read(12)
+
+        if len(footer) < 12:
+            return False
+
+        _, identifier, num_objects = struct.unpack(">iii", footer)
+        return identifier == -2 and num_objects == self.footer_objects
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return self.records["offset"]
+
+    @property
+    def millis(self) -> np.ndarray:
+        return self.records["millis"]
+
+    @property
+    def uids(self) -> np.ndarray:
+        return self.records["uid"]
+
+    def find_uids(self, uids) -> np.ndarray:
+        """The positions of the objects with any of the given UIDs,
+        in file order. UIDs that are not in the file are ignored."""
+        if self._uid_order is None:
+            self._uid_order = np.argsort(self.uids, kind="stable")
+
+        wanted = np.unique(np.asarray(uids, dtype=np.int64))
+        sorted_uids = self.uids[self._uid_order]
+        lo = np.searchsorted(sorted_uids, wanted, side="left")
+        hi = np.searchsorted(sorted_uids, wanted, side="right")
+        found = [self._uid_order[a:b] for a, b in zip(lo, hi) if b > a]
+
+        if len(found) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        return np.sort(np.concatenate(found))
+
+    def find_times(self, start_millis: int, end_millis: int) -> np.ndarray:
+        """The positions of the objects with millis between start_millis
+        and end_millis inclusive, in file order."""
+        millis = self.millis
+
+        if np.all(millis[1:] >= millis[:-1]):
+            lo = np.searchsorted(millis, start_millis, side="left")
+            hi = np.searchsorted(millis, end_millis, side="right")
+            return np.arange(lo, hi, dtype=np.int64)
+
+        return np.flatnonzero((millis >= start_millis) & (millis <= end_millis))
+
+    def __len__(self):
+        return len(self.records)
+
+
+def _read_uid(dat, offset: int, file_version: int) -> tuple:
+    """Read just the UID of the object at offset, or -1 if it has none."""
+    ds = offset + 16
+    flag_bitmap = 0
+
+    if file_version >= 3:
+        flag_bitmap = FLAG_BITMAP.unpack_from(dat, ds)[0]
+        ds += FLAG_BITMAP.size
+
+    layout = get_layout(flag_bitmap, file_version)
+
+    if layout.uid_offset is None:
+        return (-1,)
+
+    return struct.unpack_from(">q", dat, ds + layout.uid_offset)
+
+
+def open_index(pgdf_path: str, rebuild=True, save=True):
+    """Load the sidecar index for a pgdf file. If there is none, or it
+    no longer matches the file, build a new one.
+
+    Args:
+        pgdf_path (str): full path and name of the pgdf file.
+        rebuild (bool): build the index if it is missing or stale.
+        save (bool): save a rebuilt index next to the file.
+
+    Returns:
+        PGDFIndex: the index, or None if rebuild is False and there is
+        no valid index.
+    """
+    idx_path = index_path(pgdf_path)
+    index = None
+
+    if os.path.exists(idx_path):
+        index = PGDFIndex.load(idx_path)
+
+        if index is not None and not index.is_valid(pgdf_path):
+            index = None
+
+    if index is None and rebuild:
+        index = PGDFIndex.build(pgdf_path)
+
+        if save:
+            try:
+                index.save(idx_path)
+            except OSError:
+                # A read-only directory just means we rebuild next time.
+                pass
+
+    return index
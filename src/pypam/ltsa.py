@@ -0,0 +1,193 @@
+""" Long term spectral averages (LTSA).
+
+Each LTSA object is the average spectrum over an interval, written as
+int8 levels with the value that 127 stands for. The FFT length, hop and
+interval are written once, in the module header.
+
+A few months of spectra is too much to hold in memory, so ltsa_memmap
+decodes files straight into a memory mapped .npy file of time x
+frequency, one spectrum at a time. np.load with mmap_mode="r" opens it
+again later.
+
+This module contains the following:
+    - LTSAHeader - The FFT settings from the module header
+    - LTSAData - A single averaged spectrum
+    - ltsa_columns - The columns of a list of spectra
+    - ltsa_memmap - Decode files into a memory mapped spectrogram
+
+Examples:
+
+    >>> from pypam.ltsa import ltsa_memmap
+    >>> paths = sorted(glob.glob("/data/LTSA_*.pgdf"))
+    >>> spectra, millis = ltsa_memmap(paths, "ltsa.npy")
+    >>> spectra.shape
+    (87840, 512)
+
+"""
+
+__all__ = ["DECODER", "LTSAData", "LTSAHeader", "ltsa_columns", "ltsa_memmap"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import struct
+
+import numpy as np
+
+from pypam.decoders import Decoder
+from pypam.index import open_index
+from pypam.pgdf import PGDF
+
+
+class LTSAHeader:
+    """The FFT length and hop, in samples, and the seconds averaged
+    over, from the module specific part of the ModuleHeader."""
+
+    def __init__(self, module_header):
+        dat = module_header.binary
+        self.fft_length = 0
+        self.fft_hop = 0
+        self.interval_seconds = 0
+
+        if len(dat) >= 12:
+            (
+                self.fft_length,
+                self.fft_hop,
+                self.interval_seconds,
+            ) = struct.unpack_from(">iii", dat, 0)
+
+    def __str__(self):
+        return (
+            str(self.fft_length)
+            + ","
+            + str(self.fft_hop)
+            + ","
+            + str(self.interval_seconds)
+        )
+
+
+class LTSAData:
+    """The average of num_ffts spectra up to end_millis. levels holds
+    the int8 levels as written; spectrum scales them when asked for."""
+
+    def __init__(self, dat, offset, pam_data, module_header):
+        ds = offset
+        version = module_header.version if module_header is not None else 2
+        self.data_length = struct.unpack_from(">i", dat, ds)[0]
+        ds += 4
+        end = ds + self.data_length
+
+        if version <= 1:
+            self.start_sample, self.channel_map = struct.unpack_from(">qi", dat, ds)
+            ds += 12
+        else:
+            self.start_sample = pam_data.start_sample
+            self.channel_map = pam_data.channel_map
+
+        self.end_millis, self.num_ffts, self.max_value = struct.unpack_from(
+            ">qif", dat, ds
+        )
+        ds += 16
+        # The rest of the object is the spectrum, so we need not know
+        # the FFT length to read it. Copied to release the buffer.
+        self.levels = np.frombuffer(dat, np.int8, end - ds, ds).copy()
+        self.length = 4 + self.data_length
+
+    @property
+    def scale(self) -> float:
+        """The level of one step of the int8 levels."""
+        return self.max_value / 127
+
+    @property
+    def spectrum(self) -> np.ndarray:
+        """The spectrum as float32 levels."""
+        return self.levels.astype(np.float32) * self.scale
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return (
+            str(self.length)
+            + ","
+            + str(self.end_millis)
+            + ","
+            + str(self.num_ffts)
+            + ","
+            + str(self.max_value)
+        )
+
+
+def ltsa_columns(objects: list):
+    """The LTSA columns for a list of PGObjects holding LTSAData. The
+    spectra go into a single int8 "levels" array of objects x frequency
+    bins, and level_scale turns them into levels.
+
+    Args:
+        objects (list): the PGObjects.
+
+    Returns:
+        tuple: a dict of columns with a row per object, and an empty
+        dict as there are no further tables.
+    """
+    spectra = [o.data for o in objects]
+    num_bins = max((len(s.levels) for s in spectra), default=0)
+    levels = np.zeros((len(spectra), num_bins), dtype=np.int8)
+
+    for i, s in enumerate(spectra):
+        levels[i, : len(s.levels)] = s.levels
+
+    columns = {
+        "end_millis": np.array([s.end_millis for s in spectra], dtype=np.int64),
+        "num_ffts": np.array([s.num_ffts for s in spectra], dtype=np.int32),
+        "level_scale": np.array([s.scale for s in spectra], dtype=np.float32),
+        "levels": levels,
+    }
+    return columns, {}
+
+
+def ltsa_memmap(pgdf_paths: list, out_path: str, dtype=np.float32) -> tuple:
+    """Decode LTSA files, in the order given, into a memory mapped .npy
+    file of time x frequency. Each spectrum is written to the file as
+    it is decoded, so memory use does not grow with the number of
+    spectra. The sidecar index of each file, built if need be, gives
+    the number of spectra up front.
+
+    Args:
+        pgdf_paths (list): the LTSA files, in time order.
+        out_path (str): where to write the .npy file.
+        dtype (numpy.dtype): the type of the levels written.
+
+    Returns:
+        tuple: the spectra as a numpy.memmap with a row per spectrum,
+        and the millis of each row.
+    """
+    indexes = [open_index(p) for p in pgdf_paths]
+    num_rows = sum(len(index.offsets) for index in indexes)
+    millis = np.concatenate(
+        [index.millis for index in indexes] + [np.empty(0, np.int64)]
+    )
+    spectra = None
+    row = 0
+
+    for pgdf_path, index in zip(pgdf_paths, indexes):
+        for obj in PGDF.read_objects_at(pgdf_path, index.offsets):
+            levels = obj.data.levels
+
+            if spectra is None:
+                spectra = np.lib.format.open_memmap(
+                    out_path, "w+", dtype, (num_rows, len(levels))
+                )
+            elif len(levels) != spectra.shape[1]:
+                raise ValueError(pgdf_path + " has a different FFT length")
+
+            spectra[row] = levels * obj.data.scale
+            row += 1
+
+    if spectra is None:
+        spectra = np.lib.format.open_memmap(out_path, "w+", dtype, (0, 0))
+
+    spectra.flush()
+    return spectra, millis
+
+
+DECODER = Decoder(LTSAData, ltsa_columns, LTSAHeader)
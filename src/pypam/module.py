@@ -1,11 +1,17 @@
 """ The module headers and footers for the
 PAMGuard binary files."""
 
-__all__ = ["ModuleHeader", "ModuleFooter", "PGModule", "PGObject"]
+__all__ = ["ModuleHeader", "ModuleFooter", "PGBackground", "PGModule", "PGObject"]
 __version__ = "0.1"
 __author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
 
 import struct
+
+import numpy as np
+
+from pypam.columns import ModuleColumns
+from pypam.util.time import millis_to_datetime64, nanos_to_datetime64
+
 from .pamdata import PAMData
 
 
@@ -19,24 +25,144 @@ class PGObject:
         self.pam = pam_data
         self.data = data
 
+    def __len__(self):
+        """Return the length of the whole record in bytes
+
+        Returns:
+            int: the number of bytes long this record is.
+        """
+        return self.pam.binary_length
+
     def __str__(self):
         return "pgobject:" + str(self.pam)
 
 
+class PGBackground:
+    """Some modules write a measure of the background noise, such as
+    its spectrum, every so often between their objects. These records
+    are kept apart from the objects. The PamData is always a PAMData
+    object, and data is what the module's background decoder made of
+    the rest, or None if it has none."""
+
+    def __init__(self, pam_data: PAMData, data):
+        self.pam = pam_data
+        self.data = data
+
+    def __len__(self):
+        return self.pam.binary_length
+
+    def __str__(self):
+        return "pgbackground:" + str(self.pam)
+
+
 class PGModule:
     """The binary file has a module inside it (maybe more than one?)
-    containing a header, footer and a number of objects."""
+    containing a header, footer and a number of objects. decoder is the
+    Decoder of the file, FileHeader.decoder, used to build its columns."""
 
-    def __init__(self, header):
+    def __init__(self, header, module_type=None, decoder=None):
         self.header = header
+        self.module_type = module_type
+        self.decoder = decoder
         self.objects = []
+        self.background = []
         self.footer = None
+        self._by_uid = None
+        self._columns = None
 
     def add_footer(self, footer):
         self.footer = footer
 
     def add_object(self, obj: PGObject):
         self.objects.append(obj)
+        self._columns = None
+
+        if self._by_uid is not None:
+            self._by_uid.setdefault(obj.pam.UID, obj)
+
+    def add_background(self, background: PGBackground):
+        self.background.append(background)
+
+    def find_uid(self, uid: int) -> PGObject:
+        """The object with the given UID, or None if there is none.
+        A lookup table of UIDs is built on the first call, so each
+        lookup after that takes constant time."""
+        if self._by_uid is None:
+            self._by_uid = {}
+
+            for obj in self.objects:
+                self._by_uid.setdefault(obj.pam.UID, obj)
+
+        return self._by_uid.get(int(uid))
+
+    def find_uids(self, uids) -> list:
+        """The objects with any of the given UIDs, in the order of the
+        UIDs. UIDs that are not in the module are ignored."""
+        found = (self.find_uid(uid) for uid in uids)
+        return [obj for obj in found if obj is not None]
+
+    def millis(self) -> np.ndarray:
+        """The millis of every object in the module as an int64 array."""
+        return np.fromiter(
+            (obj.pam.millis for obj in self.objects),
+            dtype=np.int64,
+            count=len(self.objects),
+        )
+
+    def times(self, unit="ms") -> np.ndarray:
+        """The times of every object in the module as a datetime64 array.
+
+        Args:
+            unit (str): "ms" to use the millis of each object, or "ns"
+                to use its time_nanos.
+
+        Returns:
+            np.ndarray: a datetime64[ms] or datetime64[ns] array.
+        """
+        if unit == "ms":
+            return millis_to_datetime64(self.millis())
+
+        if unit == "ns":
+            nanos = np.fromiter(
+                (obj.pam.time_nanos for obj in self.objects),
+                dtype=np.int64,
+                count=len(self.objects),
+            )
+            return nanos_to_datetime64(nanos)
+
+        raise ValueError("unit must be ms or ns, not " + str(unit))
+
+    def to_columns(self) -> ModuleColumns:
+        """The objects of the module as columns. These are built once
+        and kept until another object is added."""
+        if self._columns is None:
+            self._columns = ModuleColumns.from_objects(
+                self.module_type, self.objects, self.decoder
+            )
+
+        return self._columns
+
+    def background_columns(self) -> ModuleColumns:
+        """The background records of the module as columns, with the
+        columns of the module's background decoder if it has one."""
+        return ModuleColumns.from_objects(
+            self.module_type, self.background, self.decoder, background=True
+        )
+
+    def to_dataframe(self, table=None):
+        """A pandas DataFrame with a row per object, built from the
+        columns of the module rather than object by object. Needs
+        pandas.
+
+        Args:
+            table (str): the name of a further table to use instead of
+                the objects, for example "points" for the points of
+                Gemini tracks, with their track UID.
+
+        Returns:
+            pandas.DataFrame: the objects, or the rows of the table.
+        """
+        return self.to_columns().to_dataframe(table)
 
     def __len__(self):
         return len(self.objects)
@@ -46,16 +172,24 @@ class PGModule:
 
 
 class ModuleHeader:
-    """The header for each PAMGuard module inside the pgdf."""
+    """The header for each PAMGuard module inside the pgdf. binary
+    holds the module specific part, such as the bands of a noise
+    monitor, and data what the module's decoder made of it, if
+    anything."""
 
     def __init__(self, dat: bytes, offset: int):
         ds = offset
         # There is a module header first
-        self.length = struct.unpack(">i", dat[ds : ds + 4])[0]
-        self.identifier = struct.unpack(">i", dat[ds + 4 : ds + 8])[0]
-        self.version = struct.unpack(">i", dat[ds + 8 : ds + 12])[0]
-        self.binary_length = struct.unpack(">i", dat[ds + 12 : ds + 16])[0]
+        (
+            self.length,
+            self.identifier,
+            self.version,
+            self.binary_length,
+        ) = struct.unpack_from(">iiii", dat, ds)
         ds += 16
+        self.binary = bytes(dat[ds : ds + self.binary_length])
+        self.data = None
+        ds += self.binary_length
         self.length = ds - offset
 
     def __len__(self):
@@ -79,9 +213,9 @@ class ModuleFooter:
     def __init__(self, dat: bytes, offset: int):
         ds = offset
         # There is a module header first
-        self.length = struct.unpack(">i", dat[ds : ds + 4])[0]
-        self.identifier = struct.unpack(">i", dat[ds + 4 : ds + 8])[0]
-        self.binary_length = struct.unpack(">i", dat[ds + 8 : ds + 12])[0]
+        self.length, self.identifier, self.binary_length = struct.unpack_from(
+            ">iii", dat, ds
+        )
 
     def __len__(self):
         return self.length
@@ -0,0 +1,204 @@
+""" Noise levels from the Noise Monitor, the Noise Band monitor and the
+filtered noise measurement (NoiseBand) modules.
+
+The Noise Monitor and Noise Band monitor write a level for each band
+and each measure - mean, median and so on - at regular times. The band
+edges and measures are written once, in the module header, and read
+into NoiseBands. Each object's levels are read with one np.frombuffer
+call, and noise_columns fills one preallocated array of objects x
+bands x measures for a whole module.
+
+This module contains the following:
+    - NoiseBands - The bands and measures from the module header
+    - NoiseData - The levels of the bands at one time
+    - NoiseBandData - A filtered noise measurement
+    - noise_columns - The columns of a list of NoiseData
+    - noise_band_columns - The columns of a list of NoiseBandData
+
+Examples:
+
+    >>> from pypam.pgdf import PGDF
+    >>> pgdf = PGDF("Noise_Monitor_20220722_000000.pgdf")
+    >>> bands = pgdf.module.header.data
+    >>> levels = pgdf.module.to_columns()["noise"]
+    >>> levels.shape
+    (1440, 7, 3)
+
+"""
+
+__all__ = [
+    "BAND_DECODER",
+    "DECODER",
+    "NoiseBandData",
+    "NoiseBands",
+    "NoiseData",
+    "noise_band_columns",
+    "noise_columns",
+]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import struct
+
+import numpy as np
+
+from pypam.decoders import Decoder
+
+
+class NoiseBands:
+    """The bands of a noise monitor, read once from the module specific
+    part of its ModuleHeader. stats_types is a bitmap of the measures
+    written for each band."""
+
+    def __init__(self, module_header):
+        dat = module_header.binary
+        self.num_bands = 0
+        self.stats_types = 0
+        self.low_edges = np.empty(0, dtype=np.float32)
+        self.high_edges = np.empty(0, dtype=np.float32)
+
+        if len(dat) >= 4:
+            self.num_bands, self.stats_types = struct.unpack_from(">hh", dat, 0)
+            n = self.num_bands
+            self.low_edges = np.frombuffer(dat, ">f4", n, 4).astype(np.float32)
+            self.high_edges = np.frombuffer(dat, ">f4", n, 4 + 4 * n).astype(np.float32)
+
+    @property
+    def num_measures(self) -> int:
+        """The number of measures written for each band."""
+        return bin(self.stats_types).count("1")
+
+    def __str__(self):
+        return (
+            str(self.num_bands)
+            + ","
+            + str(self.stats_types)
+            + ","
+            + str(list(self.low_edges))
+            + ","
+            + str(list(self.high_edges))
+        )
+
+
+class NoiseData:
+    """The levels, in dB, of each band of a noise monitor at one time,
+    as a float32 array of bands x measures."""
+
+    def __init__(self, dat, offset, pam_data, module_header):
+        ds = offset
+        version = module_header.version if module_header is not None else 2
+        self.data_length = struct.unpack_from(">i", dat, ds)[0]
+        ds += 4
+        self.channel = None
+
+        if version <= 1:
+            self.channel = struct.unpack_from(">h", dat, ds)[0]
+            ds += 2
+
+        num_bands, num_measures = struct.unpack_from(">hh", dat, ds)
+        ds += 4
+        levels = np.frombuffer(dat, ">i2", num_bands * num_measures, ds)
+        # Written as hundredths of a dB, band after band
+        self.noise = levels.astype(np.float32).reshape(num_bands, num_measures) / 100
+        self.bands = module_header.data if module_header is not None else None
+        self.length = 4 + self.data_length
+
+    @property
+    def num_bands(self) -> int:
+        return self.noise.shape[0]
+
+    @property
+    def num_measures(self) -> int:
+        return self.noise.shape[1]
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return str(self.length) + "," + str(self.noise.tolist())
+
+
+class NoiseBandData:
+    """A filtered noise measurement - the RMS, zero to peak and peak to
+    peak levels in dB and, from version 2, the sound exposure level and
+    the seconds it was summed over."""
+
+    def __init__(self, dat, offset, pam_data, module_header):
+        ds = offset
+        version = module_header.version if module_header is not None else 2
+        self.data_length = struct.unpack_from(">i", dat, ds)[0]
+        ds += 4
+        levels = struct.unpack_from(">hhh", dat, ds)
+        self.rms, self.zero_peak, self.peak_peak = [v / 100 for v in levels]
+        ds += 6
+        self.sel = np.nan
+        self.sel_secs = 0
+
+        if version >= 2:
+            sel, self.sel_secs = struct.unpack_from(">hh", dat, ds)
+            self.sel = sel / 100
+            ds += 4
+
+        self.length = 4 + self.data_length
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return (
+            str(self.length)
+            + ","
+            + str(self.rms)
+            + ","
+            + str(self.zero_peak)
+            + ","
+            + str(self.peak_peak)
+            + ","
+            + str(self.sel)
+        )
+
+
+def noise_columns(objects: list):
+    """The noise monitor columns for a list of PGObjects holding
+    NoiseData. The levels go into a single float32 "noise" array of
+    objects x bands x measures, filled with NaN where an object has
+    fewer bands or measures than the most.
+
+    Args:
+        objects (list): the PGObjects.
+
+    Returns:
+        tuple: a dict of columns with a row per object, and an empty
+        dict as there are no further tables.
+    """
+    num_bands = max((o.data.num_bands for o in objects), default=0)
+    num_measures = max((o.data.num_measures for o in objects), default=0)
+    noise = np.full((len(objects), num_bands, num_measures), np.nan, np.float32)
+
+    for i, o in enumerate(objects):
+        noise[i, : o.data.num_bands, : o.data.num_measures] = o.data.noise
+
+    return {"noise": noise}, {}
+
+
+def noise_band_columns(objects: list):
+    """The columns for a list of PGObjects holding NoiseBandData.
+
+    Args:
+        objects (list): the PGObjects.
+
+    Returns:
+        tuple: a dict of columns with a row per object, and an empty
+        dict as there are no further tables.
+    """
+    measures = [o.data for o in objects]
+    columns = {
+        name: np.array([getattr(m, name) for m in measures], dtype=np.float32)
+        for name in ("rms", "zero_peak", "peak_peak", "sel")
+    }
+    columns["sel_secs"] = np.array([m.sel_secs for m in measures], dtype=np.int16)
+    return columns, {}
+
+
+DECODER = Decoder(NoiseData, noise_columns, NoiseBands)
+BAND_DECODER = Decoder(NoiseBandData, noise_band_columns)
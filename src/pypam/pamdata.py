@@ -9,28 +9,126 @@ __author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
 import datetime
 import struct
 from pypam.annotations import Annotations
-from pypam.util.time import epoch
-from pypam.util.byteops import bitwise_and_bytes
-
-TIMEMILLIS = bytes(b"\x00\x01")
-TIMENANOS = bytes(b"\x00\x02")
-CHANNELMAP = bytes(b"\x00\x04")
-UID = bytes(b"\x00\x08")
-STARTSAMPLE = bytes(b"\x00\x10")
-SAMPLEDURATION = bytes(b"\x00\x20")
-FREQUENCYLIMITS = bytes(b"\x00\x40")
-MILLISDURATION = bytes(b"\x00\x80")
-TIMEDELAYSECS = bytes(b"\x01\x00")
-HASBINARYANNOTATIONS = bytes(b"\x02\x00")
-HASSEQUENCEMAP = bytes(b"\x04\x00")
-HASNOISE = bytes(b"\x08\x00")
-HASSIGNAL = bytes(b"\x10\x00")
-HASSIGNALEXCESS = bytes(b"\x20\x00")
+from pypam.util.time import millis_to_datetime
+
+TIMEMILLIS = 0x0001
+TIMENANOS = 0x0002
+CHANNELMAP = 0x0004
+UID = 0x0008
+STARTSAMPLE = 0x0010
+SAMPLEDURATION = 0x0020
+FREQUENCYLIMITS = 0x0040
+MILLISDURATION = 0x0080
+TIMEDELAYSECS = 0x0100
+HASBINARYANNOTATIONS = 0x0200
+HASSEQUENCEMAP = 0x0400
+HASNOISE = 0x0800
+HASSIGNAL = 0x1000
+HASSIGNALEXCESS = 0x2000
+
+# The optional fields in the order they are written, with the flag that
+# says whether each one is present and its struct format.
+OPTIONAL_FIELDS = [
+    (TIMENANOS, "time_nanos", "q"),
+    (CHANNELMAP, "channel_map", "i"),
+    (UID, "UID", "q"),
+    (STARTSAMPLE, "start_sample", "q"),
+    (SAMPLEDURATION, "sample_duration", "i"),
+    (FREQUENCYLIMITS, "freq_limits", "ff"),
+    (MILLISDURATION, "duration_millis", "f"),
+    (TIMEDELAYSECS, "num_time_delays", "h"),
+    (HASSEQUENCEMAP, "sequence_map", "i"),
+    (HASNOISE, "noise", "f"),
+    (HASSIGNAL, "signal", "f"),
+    (HASSIGNALEXCESS, "signal_excess", "f"),
+]
+
+# Length, identifier and millis come first in every object.
+OBJECT_HEAD = struct.Struct(">iiq")
+FLAG_BITMAP = struct.Struct(">H")
+
+
+class PAMDataLayout:
+    """The fixed-size fields present for one flag bitmap and file
+    version, compiled into struct.Struct objects. The time delays are
+    the only variable length field, so the fields are split into those
+    up to and including the number of time delays (head) and those
+    after the delays themselves (tail)."""
+
+    def __init__(self, flag_bitmap: int, file_version: int):
+        self.flag_bitmap = flag_bitmap
+        self.file_version = file_version
+        self.has_time_delays = bool(flag_bitmap & TIMEDELAYSECS)
+
+        if file_version == 2:
+            # Version 2 always has the nanos and channel map
+            flag_bitmap |= TIMENANOS | CHANNELMAP
+
+        head_fmt = ""
+        tail_fmt = ""
+        self.head_names = []
+        self.tail_names = []
+        in_tail = False
+
+        # Where the UID sits, relative to the start of the optional
+        # fields, so it can be read without decoding the rest.
+        self.uid_offset = None
+
+        for flag, name, fmt in OPTIONAL_FIELDS:
+            if not flag_bitmap & flag:
+                continue
+
+            if flag == UID:
+                self.uid_offset = struct.calcsize(">" + head_fmt)
+
+            # Frequency limits are two values, so give the second a
+            # name of None and join them up afterwards.
+            names = [name] + [None] * (len(fmt) - 1)
+
+            if in_tail:
+                tail_fmt += fmt
+                self.tail_names += names
+            else:
+                head_fmt += fmt
+                self.head_names += names
+
+            if flag == TIMEDELAYSECS:
+                in_tail = True
+
+        self.head = struct.Struct(">" + head_fmt)
+        self.tail = struct.Struct(">" + tail_fmt)
+
+    def set_fields(self, pam_data, names, values):
+        """Set the decoded values as attributes on pam_data."""
+        for i, name in enumerate(names):
+            if name == "freq_limits":
+                pam_data.freq_limits = [values[i], values[i + 1]]
+            elif name is not None:
+                setattr(pam_data, name, values[i])
+
+
+# One compiled layout per distinct flag bitmap and file version. The
+# bitmap rarely changes within a file, so this stays very small.
+_layouts = {}
+
+
+def get_layout(flag_bitmap: int, file_version: int) -> PAMDataLayout:
+    """Look up, or build and cache, the layout for this flag bitmap
+    and file version."""
+    key = (flag_bitmap, file_version)
+    layout = _layouts.get(key)
+
+    if layout is None:
+        layout = PAMDataLayout(flag_bitmap, file_version)
+        _layouts[key] = layout
+
+    return layout
 
 
 class PAMData:
     def __init__(self, dat: bytes, offset: int, file_version: int):
         self.length = 0
+        self.binary_length = 0
         self.identifier = 0
         self.is_background = False
         self.millis = 0
@@ -47,101 +145,69 @@ class PAMData:
         self.sequence_map = 0
         self.has_annotations = False
         self.anno_length = 0
-        self.annotations = None
+        self._annotation_bytes = None
+        self._annotations = None
         self.noise = 0
         self.signal = 0
         self.signal_excess = 0
-        self.date = epoch(zone="GMT")  # TODO - BST didn't work in Windows
 
         # We have to provide big endian here weirdly otherwise it doesn't work :/
         ds = offset
-        binary_length = struct.unpack(">i", dat[ds : ds + 4])[0]
-        self.identifier = struct.unpack(">i", dat[ds + 4 : ds + 8])[0]
+        self.binary_length, self.identifier, self.millis = OBJECT_HEAD.unpack_from(
+            dat, ds
+        )
         self._next_obj = (
-            offset + binary_length
+            offset + self.binary_length
         )  # Next object in case there is an error reading this one
-        ds += 8
-
+        ds += OBJECT_HEAD.size
         self.is_background = self.identifier == -6
-        self.millis = struct.unpack(">q", dat[ds : ds + 8])[0]
-        self.date += datetime.timedelta(milliseconds=self.millis)
-        ds += 8
 
         if file_version >= 3:
-            self.flag_bitmap = dat[ds : ds + 2]
-            ds += 2
-
-        if (
-            file_version == 2
-            or bitwise_and_bytes(self.flag_bitmap, TIMENANOS) != b"\x00\x00"
-        ):
-            self.time_nanos = struct.unpack(">q", dat[ds : ds + 8])[0]
-            ds += 8
-
-        if (
-            file_version == 2
-            or bitwise_and_bytes(self.flag_bitmap, CHANNELMAP) != b"\x00\x00"
-        ):
-            self.channel_map = struct.unpack(">i", dat[ds : ds + 4])[0]
-            ds += 4
-
-        if bitwise_and_bytes(self.flag_bitmap, UID) != b"\x00\x00":
-            self.UID = struct.unpack(">q", dat[ds : ds + 8])[0]
-            ds += 8
-
-        if bitwise_and_bytes(self.flag_bitmap, STARTSAMPLE) != b"\x00\x00":
-            self.sample_duration = struct.unpack(">i", dat[ds : ds + 4])[0]
-            ds += 4
-
-        if bitwise_and_bytes(self.flag_bitmap, SAMPLEDURATION) != b"\x00\x00":
-            self.sample_duration = struct.unpack(">i", dat[ds : ds + 4])[0]
-            ds += 4
-
-        if bitwise_and_bytes(self.flag_bitmap, FREQUENCYLIMITS) != b"\x00\x00":
-            self.freq_limits[0] = struct.unpack(">f", dat[ds : ds + 4])[0]
-            self.freq_limits[1] = struct.unpack(">f", dat[ds + 4 : ds + 8])[0]
-            ds += 8
-
-        if bitwise_and_bytes(self.flag_bitmap, MILLISDURATION) != b"\x00\x00":
-            self.duration_millis = struct.unpack(">f", dat[ds : ds + 4])[0]
-            ds += 4
-
-        if bitwise_and_bytes(self.flag_bitmap, TIMEDELAYSECS) != b"\x00\x00":
-            self.num_time_delays = struct.unpack(">h", dat[ds : ds + 2])[0]
-            ds += 2
-
-            for i in range(self.num_time_delays):
-                self.time_delays.append(struct.unpack(">f", dat[ds : ds + 4])[0])
-                ds += 4
-
-        if bitwise_and_bytes(self.flag_bitmap, HASSEQUENCEMAP) != b"\x00\x00":
-            self.sequence_map = struct.unpack(">i", dat[ds : ds + 4])[0]
-            ds += 4
-
-        if bitwise_and_bytes(self.flag_bitmap, HASNOISE) != b"\x00\x00":
-            self.noise = struct.unpack(">f", dat[ds : ds + 4])[0]
-            ds += 4
-
-        if bitwise_and_bytes(self.flag_bitmap, HASSIGNAL) != b"\x00\x00":
-            self.duration_millis = struct.unpack(">f", dat[ds : ds + 4])[0]
-            ds += 4
-
-        if bitwise_and_bytes(self.flag_bitmap, HASSIGNALEXCESS) != b"\x00\x00":
-            self.signal_excess = struct.unpack(">f", dat[ds : ds + 4])[0]
-            ds += 4
+            self.flag_bitmap = FLAG_BITMAP.unpack_from(dat, ds)[0]
+            ds += FLAG_BITMAP.size
+
+        layout = get_layout(self.flag_bitmap, file_version)
+        layout.set_fields(self, layout.head_names, layout.head.unpack_from(dat, ds))
+        ds += layout.head.size
+
+        if layout.has_time_delays:
+            n = self.num_time_delays
+            self.time_delays = list(struct.unpack_from(">" + str(n) + "f", dat, ds))
+            ds += 4 * n
+            layout.set_fields(self, layout.tail_names, layout.tail.unpack_from(dat, ds))
+            ds += layout.tail.size
 
         self.length = ds - offset
 
+    @property
+    def date(self) -> datetime.datetime:
+        """The time of this object, built from millis."""
+        # TODO - BST didn't work in Windows
+        return millis_to_datetime(self.millis, zone="GMT")
+
     def read_annotations(self, dat, offset) -> int:
-        """Called at the end of the Module - read any annotations
-        we might have, return how far we've read along."""
-        if bitwise_and_bytes(self.flag_bitmap, HASBINARYANNOTATIONS) != b"\x00\x00":
+        """Called at the end of the Module - keep any annotations
+        we might have, return how far we've read along.
+
+        The annotations run to the end of the object. Their bytes are
+        copied, so the buffer can be released, but they are not decoded
+        until annotations is accessed."""
+        if self.flag_bitmap & HASBINARYANNOTATIONS:
             self.has_annotations = True
-            self.annotations = Annotations(dat, offset)
-            return len(self.annotations)
+            self._annotation_bytes = bytes(dat[offset : self._next_obj])
+            self.anno_length = len(self._annotation_bytes)
+            return self.anno_length
 
         return 0
 
+    @property
+    def annotations(self) -> Annotations:
+        """The annotations of this object, or None if it has none."""
+        if self._annotations is None and self._annotation_bytes is not None:
+            self._annotations = Annotations(self._annotation_bytes, 0)
+
+        return self._annotations
+
     def __len__(self):
         return self.length
 
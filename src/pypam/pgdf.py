@@ -12,149 +12,288 @@ Examples:
 
 """
 
-__all__ = ["PGDF"]
+__all__ = ["PGDF", "read_record"]
 __version__ = "0.1"
 __author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
 
+import os
 import struct
-from pypam.module import ModuleHeader, ModuleFooter, PGObject, PGModule
-from pypam.gemini import GeminiData
+
+import numpy as np
+
+from pypam.index import open_index
+from pypam.module import ModuleHeader, ModuleFooter, PGBackground, PGObject, PGModule
 from pypam.pamdata import PAMData
 from pypam.file import FileHeader, FileFooter
+from pypam.util.read import open_buffer
+from pypam.util.time import as_millis
+
+# The longest a FileFooter can be - every field of the latest version.
+MAX_FOOTER_LENGTH = 64
+
+# The identifier of background records
+BACKGROUND = -6
 
 
 class PGDF:
     """The top structure for the PAMGuard binary file. Contains
     a header, footer and a number of modules."""
 
-    def __init__(self, pgdf_path):
-        """Initialise our PGDF object. This will read the entire
-        binary file into memory at initialisation time.
+    def __init__(self, pgdf_path, memory_map=True, background=True):
+        """Initialise our PGDF object. This will decode the entire
+        binary file at initialisation time.
 
         Args:
             pgdf_path (str): full path and name of the pgdf file.
+            memory_map (bool): map the file into memory and decode it
+                in place, rather than reading it all in first.
+            background (bool): decode the background records into the
+                background of the module, rather than skipping them.
         """
         # TODO - can we have multiple modules or not?
         # TODO - potentially __enter__ and __exit__?
+        self.header = None
+        self.footer = None
         self.module = None
+        self.length = 0
 
-        with open(pgdf_path, "rb") as f:
-            dat = f.read()
+        for record in PGDF.iter_objects(pgdf_path, memory_map, background):
+            self.length = len(record)
+
+            if isinstance(record, FileHeader):
+                self.header = record
+            elif isinstance(record, FileFooter):
+                self.footer = record
+            elif isinstance(record, ModuleHeader):
+                self.module = PGModule(
+                    record, self.header.module_type, self.header.decoder
+                )
+            elif isinstance(record, ModuleFooter):
+                assert self.module is not None
+                self.module.add_footer(record)
+            elif isinstance(record, PGBackground):
+                assert self.module is not None
+                self.module.add_background(record)
+            else:
+                assert self.module is not None
+                self.module.add_object(record)
+
+    @staticmethod
+    def iter_objects(pgdf_path, memory_map=True, background=True):
+        """Walk the binary file, yielding each record as soon as it
+        has been decoded. Records come out in file order - the
+        FileHeader, then the ModuleHeader, a PGObject per data
+        record, the ModuleFooter and finally the FileFooter. Background
+        records come out as PGBackground, between the PGObjects.
+
+        Nothing is kept once it has been yielded. With memory_map set,
+        only the pages being decoded need to be in memory, so a file of
+        any size can be walked in roughly constant memory. Without it
+        the whole file is read in first. The file stays open until the
+        generator is exhausted, closed or garbage collected, so wrap it
+        in contextlib.closing when stopping early.
+
+        Args:
+            pgdf_path (str): full path and name of the pgdf file.
+            memory_map (bool): map the file into memory and decode it
+                in place, rather than reading it all in first.
+            background (bool): decode the background records, rather
+                than skipping over them by their length.
+
+        Yields:
+            FileHeader | ModuleHeader | PGObject | PGBackground |
+            ModuleFooter | FileFooter: the next record in the file.
+        """
+        header = None
+        module_header = None
+
+        with open_buffer(pgdf_path, memory_map) as dat:
             ds = 0
 
             while ds < len(dat):
-                # Read the two integers, length and type
-                # These two are common to all but we just want to check
-                # the type and length first
-                self.length = struct.unpack(">i", dat[ds : ds + 4])[0]
-                rec_type = struct.unpack(">i", dat[ds + 4 : ds + 8])[0]
+                if not background:
+                    length, rec_type = struct.unpack_from(">ii", dat, ds)
 
-                # The following are the datatypes we might have in this record
-                if rec_type == -1:
-                    # File Header
-                    self.header = FileHeader(dat, ds)
-                    ds += len(self.header)
+                    if rec_type == BACKGROUND:
+                        ds += length
+                        continue
+
+                record = read_record(dat, ds, header, module_header)
+
+                if isinstance(record, FileHeader):
+                    header = record
+                elif isinstance(record, ModuleHeader):
+                    module_header = record
+
+                ds += len(record)
+                yield record
+
+    @staticmethod
+    def read_header(pgdf_path) -> FileHeader:
+        """Read just the FileHeader at the start of a pgdf file.
+
+        Args:
+            pgdf_path (str): full path and name of the pgdf file.
+
+        Returns:
+            FileHeader: the header of the file.
+        """
+        with open(pgdf_path, "rb") as f:
+            dat = f.read(4)
+            dat += f.read(struct.unpack(">i", dat)[0] - 4)
+
+        return FileHeader(dat, 0)
+
+    @staticmethod
+    def read_footer(pgdf_path) -> FileFooter:
+        """Read just the FileFooter at the end of a pgdf file, without
+        reading the objects before it.
+
+        Args:
+            pgdf_path (str): full path and name of the pgdf file.
+
+        Returns:
+            FileFooter: the footer of the file, or None if the file has
+            no footer, for example because it is still being written.
+        """
+        header = PGDF.read_header(pgdf_path)
+        size = os.path.getsize(pgdf_path)
+
+        with open(pgdf_path, "rb") as f:
+            f.seek(max(0, size - MAX_FOOTER_LENGTH))
+            dat = f.read()
+
+        # The footer is the last record, so its length takes us exactly
+        # to the end of the file.
+        for length in range(12, len(dat) + 1):
+            ds = len(dat) - length
+
+            if struct.unpack_from(">ii", dat, ds) == (length, -2):
+                return FileFooter(header.file_version, dat, ds)
+
+        return None
+
+    @staticmethod
+    def iter_between(
+        pgdf_path, start_millis, end_millis, slack_millis=0, memory_map=True
+    ):
+        """Decode only the objects with millis between start_millis and
+        end_millis inclusive.
+
+        If the file has a valid sidecar index it is used to go straight
+        to the objects. Otherwise the file is walked using the record
+        lengths, reading only the millis of each object, and objects
+        outside the window are never decoded. The walk stops at the
+        first object more than slack_millis past end_millis. PAMGuard
+        writes objects in order, but some modules write an object a
+        while after its millis - Gemini tracks are written when the
+        track ends - so for those set slack_millis to the longest such
+        delay.
+
+        Args:
+            pgdf_path (str): full path and name of the pgdf file.
+            start_millis (int | datetime): the start of the window.
+            end_millis (int | datetime): the end of the window.
+            slack_millis (int): how far past end_millis to keep looking.
+            memory_map (bool): map the file into memory and decode it
+                in place, rather than reading it all in first.
+
+        Yields:
+            PGObject: the objects in the window, in file order.
+        """
+        start_millis = as_millis(start_millis)
+        end_millis = as_millis(end_millis)
+        index = open_index(pgdf_path, rebuild=False)
+
+        if index is not None:
+            offsets = index.offsets[index.find_times(start_millis, end_millis)]
+            yield from PGDF.read_objects_at(pgdf_path, offsets, memory_map)
+            return
 
-                elif rec_type == -2:
-                    # FileFooter
-                    # Get the leading digit on the version number string.
-                    self.footer = FileFooter(self.header.file_version, dat, ds)
-                    ds += len(self.footer)
+        stop_millis = end_millis + slack_millis
 
+        with open_buffer(pgdf_path, memory_map) as dat:
+            header = None
+            module_header = None
+            ds = 0
+
+            while ds + 8 <= len(dat):
+                length, rec_type = struct.unpack_from(">ii", dat, ds)
+
+                if length <= 0 or ds + length > len(dat):
+                    break
+
+                if rec_type == -1:
+                    header = FileHeader(dat, ds)
                 elif rec_type == -3:
-                    # Module Header - lets start a new module
-                    # Get the leading digit on the version number string.
-                    module_header = ModuleHeader(dat, ds)
-                    self.module = PGModule(module_header)
-                    ds += len(module_header)
-
-                elif rec_type == -4:
-                    # Module Footer
-                    module_footer = ModuleFooter(dat, ds)
-                    assert self.module is not None
-                    self.module.add_footer(module_footer)
-                    ds += len(module_footer)
-
-                elif rec_type == -5:
-                    # Data
-                    print("Unsupported rec type -5")
-                    assert False
-
-                else:
-                    file_version = self.header.file_version
-                    PAM_data = PAMData(dat, ds, file_version)
-                    ds += len(PAM_data)
-
-                    if PAM_data.is_background:
-                        # TODO - some module_types are background not data
-                        print("Read Background not yet implemented")
-                        return
+                    module_header = _read_module_header(dat, ds, header)
+                elif rec_type < BACKGROUND or rec_type >= 0:
+                    millis = struct.unpack_from(">q", dat, ds + 8)[0]
 
-                    # Now read the rest of the module
-                    # Now make a decision based on what data is inside
-                    # this particular file
-                    if self.header.module_type == "AIS Processing":
-                        print("Not yet implemented")
-                        raise NotImplementedError
+                    if millis > stop_millis:
                         return
-                    elif (
-                        self.header.module_type == "Click Detector"
-                        or self.header.module_type == "SoundTrap Click Detector"
-                    ):
-                        print("Not yet implemented")
-                        raise NotImplementedError
-                    elif self.header.module_type == "Clip Generator":
-                        print("Not yet implemented")
-                        raise NotImplementedError
-                    elif self.header.module_type == "Deep Learning Classifier":
-                        print("Not yet implemented")
-                        raise NotImplementedError
-                    elif self.header.module_type == "DbHt":
-                        print("Not yet implemented")
-                        raise NotImplementedError
-                    elif self.header.module_type == "DIFAR Processing":
-                        print("Not yet implemented")
-                        raise NotImplementedError
-                    elif self.header.module_type == "LTSA":
-                        print("Not yet implemented")
-                        raise NotImplementedError
-                    elif (
-                        self.header.module_type == "Noise Monitor"
-                        or self.header.module_type == "Noise Band"
-                    ):
-                        print("Not yet implemented")
-                        raise NotImplementedError
-                    elif self.header.module_type == "NoiseBand":
-                        print("Not yet implemented")
-                        raise NotImplementedError
-                    elif self.header.module_type == "RW Edge Detector":
-                        print("Not yet implemented")
-                        raise NotImplementedError
-                    elif self.header.module_type == "WhistlesMoans":
-                        print("Not yet implemented")
-                        raise NotImplementedError
-                    elif self.header.module_type == "Ipi module":
-                        print("Not yet implemented")
-                        raise NotImplementedError
-                    elif self.header.module_type == "Gemini Threshold Detector":
-                        # print("Loading Gemini")
-                        data = GeminiData(dat, ds)
-                        # print ("Gemini Length", len(data))
-                        ds += len(data)
-                        # Create the object then add to the module
-                        pam_object = PGObject(PAM_data, data)
-                        assert self.module is not None
-                        self.module.add_object(pam_object)
-
-                    else:
-                        print("Unknown module type", self.header.module_type)
-                        raise NotImplementedError
-
-                    # Now see if there are any binary annotations on PAMData
-                    # len_anno = PAM_data.read_annotations(dat, ds)
-                    # ds += len_anno
-
-                    ds = PAM_data._next_obj
+
+                    if start_millis <= millis <= end_millis:
+                        yield _read_data(dat, ds, header, module_header)
+
+                ds += length
+
+    @staticmethod
+    def read_objects_at(pgdf_path, offsets, memory_map=True):
+        """Decode only the data objects at the given byte offsets,
+        skipping everything else in the file.
+
+        Args:
+            pgdf_path (str): full path and name of the pgdf file.
+            offsets (list): byte offsets of the objects, for example
+                from a PGDFIndex.
+            memory_map (bool): map the file into memory and decode it
+                in place, rather than reading it all in first.
+
+        Yields:
+            PGObject: the object at each offset, in the order given.
+        """
+        with open_buffer(pgdf_path, memory_map) as dat:
+            header = FileHeader(dat, 0)
+            # The module header always follows the file header
+            module_header = _read_module_header(dat, len(header), header)
+
+            for offset in offsets:
+                yield _read_data(dat, int(offset), header, module_header)
+
+    @staticmethod
+    def objects_at(pgdf_path, positions) -> list:
+        """Decode the objects at the given positions in the file, using
+        (and if need be building) the sidecar index.
+
+        Args:
+            pgdf_path (str): full path and name of the pgdf file.
+            positions (list): the positions of the objects in the file,
+                counting from 0.
+
+        Returns:
+            list: the PGObjects, in the order given.
+        """
+        index = open_index(pgdf_path)
+        offsets = index.offsets[np.asarray(positions, dtype=np.int64)]
+        return list(PGDF.read_objects_at(pgdf_path, offsets))
+
+    @staticmethod
+    def objects_by_uid(pgdf_path, uids) -> list:
+        """Decode the objects with the given UIDs, using the sidecar
+        index. Objects are returned in file order."""
+        index = open_index(pgdf_path)
+        offsets = index.offsets[index.find_uids(uids)]
+        return list(PGDF.read_objects_at(pgdf_path, offsets))
+
+    @staticmethod
+    def objects_between(pgdf_path, start_millis, end_millis) -> list:
+        """Decode the objects with millis between start_millis and
+        end_millis inclusive, using the sidecar index. Objects are
+        returned in file order."""
+        index = open_index(pgdf_path)
+        offsets = index.offsets[index.find_times(start_millis, end_millis)]
+        return list(PGDF.read_objects_at(pgdf_path, offsets))
 
     def __len__(self):
         """Return the length of our object in bytes
@@ -173,3 +312,92 @@ class PGDF:
             + ":Length:"
             + str(self.__len__())
         )
+
+
+def read_record(dat, offset: int, header: FileHeader, module_header=None):
+    """Decode the record at offset, whatever its type.
+
+    Args:
+        dat (bytes): the buffer holding the file.
+        offset (int): the byte offset of the record in dat.
+        header (FileHeader): the header of the file, or None if the
+            record is the header itself.
+        module_header (ModuleHeader): the header of the module, which
+            some decoders need to read their objects.
+
+    Returns:
+        FileHeader | ModuleHeader | PGObject | PGBackground | ModuleFooter |
+        FileFooter: the record.
+    """
+    # Read the type - common to all records
+    rec_type = struct.unpack_from(">i", dat, offset + 4)[0]
+
+    # The following are the datatypes we might have in this record
+    if rec_type == -1:
+        return FileHeader(dat, offset)
+
+    if rec_type == -2:
+        return FileFooter(header.file_version, dat, offset)
+
+    if rec_type == -3:
+        return _read_module_header(dat, offset, header)
+
+    if rec_type == -4:
+        return ModuleFooter(dat, offset)
+
+    if rec_type == -5:
+        raise ValueError("Unsupported record type -5 at offset " + str(offset))
+
+    return _read_data(dat, offset, header, module_header)
+
+
+def _read_module_header(dat, offset: int, header: FileHeader) -> ModuleHeader:
+    """Read the ModuleHeader at offset, and have the decoder for the
+    file read its module specific part, if it has one, into data."""
+    module_header = ModuleHeader(dat, offset)
+    decoder = header.decoder
+
+    if decoder is not None and decoder.header is not None:
+        module_header.data = decoder.header(module_header)
+
+    return module_header
+
+
+def _read_data(dat, offset: int, header: FileHeader, module_header=None):
+    """Decode the data object at offset, using the FileHeader to
+    decide how to read the module specific part.
+
+    Args:
+        dat (bytes): the buffer holding the file.
+        offset (int): the byte offset of the object in dat.
+        header (FileHeader): the header of the file.
+        module_header (ModuleHeader): the header of the module.
+
+    Returns:
+        PGObject | PGBackground: the object, or the background record.
+    """
+    ds = offset
+    PAM_data = PAMData(dat, ds, header.file_version)
+    ds += len(PAM_data)
+    # The decoder is looked up once per file and kept on the header
+    decoder = header.decoder
+
+    if PAM_data.is_background:
+        data = None
+
+        if decoder is not None and decoder.background is not None:
+            data = decoder.background.data(dat, ds, PAM_data, module_header)
+
+        return PGBackground(PAM_data, data)
+
+    if decoder is None:
+        raise NotImplementedError("No decoder for module type " + header.module_type)
+
+    data = decoder.data(dat, ds, PAM_data, module_header)
+    ds += len(data)
+    pam_object = PGObject(PAM_data, data)
+
+    # Now see if there are any binary annotations on PAMData
+    ds += PAM_data.read_annotations(dat, ds)
+
+    return pam_object
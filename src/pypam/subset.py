@@ -0,0 +1,295 @@
+""" Cutting objects out of pgdf files, and joining pgdf files together,
+by copying their records as raw bytes.
+
+No object is decoded. The objects to keep are picked using the millis
+and UIDs of the sidecar index, runs of neighbouring records are copied
+in one go, and only the dates, counts, UID range and length in the
+FileHeader and FileFooter are rewritten. Module headers and footers
+are copied as they are, and so are the background records among the
+objects copied.
+
+This module contains the following:
+    - subset_pgdf - Write the objects of a file in a time window or
+      with given UIDs to a new file
+    - merge_pgdf - Join files of the same module into one file
+
+Examples:
+
+    >>> from pypam.subset import merge_pgdf, subset_pgdf
+    >>> subset_pgdf("day.pgdf", "hour.pgdf", 1658448004000, 1658451604000)
+    >>> merge_pgdf(["00.pgdf", "01.pgdf", "02.pgdf"], "day.pgdf")
+
+"""
+
+__all__ = ["merge_pgdf", "subset_pgdf"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import struct
+
+import numpy as np
+
+from pypam.file import FileFooter, FileHeader, pack_file_footer
+from pypam.index import open_index
+from pypam.util.read import open_buffer
+from pypam.util.time import as_millis
+
+
+def _find_records(dat, start: int, stop: int) -> dict:
+    """The offset and length of each record between start and stop,
+    by identifier. Used to find the headers and footers either side of
+    the objects."""
+    records = {}
+    ds = start
+
+    while ds + 8 <= stop:
+        length, identifier = struct.unpack_from(">ii", dat, ds)
+
+        if length <= 0 or ds + length > stop:
+            break
+
+        records.setdefault(identifier, (ds, length))
+        ds += length
+
+    return records
+
+
+def _in_file_order(*records) -> np.ndarray:
+    """Rows of the index, such as its objects and background records,
+    together in file order."""
+    records = np.concatenate(records)
+    return records[np.argsort(records["offset"], kind="stable")]
+
+
+class _Source:
+    """The parts of one pgdf file that are copied - the bytes of its
+    headers and footers, and the index of its objects."""
+
+    def __init__(self, pgdf_path: str, dat):
+        self.index = open_index(pgdf_path)
+        records = _in_file_order(self.index.records, self.index.background)
+
+        if len(records) > 0:
+            first = int(records["offset"][0])
+            last = int(records["offset"][-1] + records["length"][-1])
+            around = _find_records(dat, 0, first)
+            around.update(_find_records(dat, last, len(dat)))
+        else:
+            around = _find_records(dat, 0, len(dat))
+
+        if -1 not in around or -3 not in around:
+            raise ValueError(pgdf_path + " has no file or module header")
+
+        self.parts = {i: bytes(dat[o : o + n]) for i, (o, n) in around.items()}
+        self.header = FileHeader(self.parts[-1], 0)
+        self.footer = None
+
+        if -2 in self.parts:
+            self.footer = FileFooter(self.header.file_version, self.parts[-2], 0)
+
+
+def _header_bytes(source: _Source, data_millis: int) -> bytes:
+    """The FileHeader of source with its data date replaced."""
+    header = bytearray(source.parts[-1])
+    pamguard_version = source.header.pamguard_version.encode("utf-8")
+    branch = source.header.branch.encode("utf-8")
+    # The data date follows the two version strings.
+    ds = 28 + len(pamguard_version) + len(branch)
+    struct.pack_into(">q", header, ds, data_millis)
+    return bytes(header)
+
+
+def _footer_bytes(
+    source: _Source,
+    num_objects: int,
+    end_millis: int,
+    uids: np.ndarray,
+    file_length: int,
+) -> bytes:
+    """The FileFooter of source, or a new one if it has none, with its
+    count, end date, UID range and file length replaced."""
+    version = source.header.file_version
+    uids = uids[uids >= 0]
+    lowest = int(uids.min()) if len(uids) > 0 else -1
+    highest = int(uids.max()) if len(uids) > 0 else -1
+
+    if source.footer is None:
+        footer = bytearray(
+            pack_file_footer(0, 0, 0, 0, 0, version=version, end_reason=None)
+        )
+    else:
+        footer = bytearray(source.parts[-2])
+
+    struct.pack_into(">iq", footer, 8, num_objects, end_millis)
+    ds = 36
+
+    if version >= 3:
+        struct.pack_into(">qq", footer, ds, lowest, highest)
+        ds += 16
+
+    struct.pack_into(">q", footer, ds, file_length + len(footer))
+    return bytes(footer)
+
+
+def _write_runs(f, dat, records: np.ndarray) -> int:
+    """Write the records out, copying each run of records that sit
+    next to each other in dat with a single write. Returns the number
+    of bytes written."""
+    if len(records) == 0:
+        return 0
+
+    starts = records["offset"]
+    ends = starts + records["length"]
+    breaks = np.flatnonzero(starts[1:] != ends[:-1]) + 1
+    run_starts = starts[np.concatenate(([0], breaks))]
+    run_ends = ends[np.concatenate((breaks - 1, [len(records) - 1]))]
+
+    for start, end in zip(run_starts, run_ends):
+        f.write(dat[int(start) : int(end)])
+
+    return int(np.sum(records["length"]))
+
+
+def subset_pgdf(pgdf_path: str, out_path: str, start=None, end=None, uids=None) -> int:
+    """Write the objects of a file that are between start and end
+    and/or have one of the given UIDs to a new file. The background
+    records between start and end are written too, though if UIDs are
+    given only those among the objects kept.
+
+    Args:
+        pgdf_path (str): full path and name of the pgdf file.
+        out_path (str): where to write the new file.
+        start (int | datetime): the start of the time window, or None
+            for no start.
+        end (int | datetime): the end of the time window (inclusive),
+            or None for no end.
+        uids (list): the UIDs to keep, or None to keep any UID.
+
+    Returns:
+        int: the number of objects written.
+    """
+    with open_buffer(pgdf_path) as dat:
+        source = _Source(pgdf_path, dat)
+        records = source.index.records
+        keep = np.ones(len(records), dtype=bool)
+
+        if start is not None:
+            keep &= records["millis"] >= as_millis(start)
+
+        if end is not None:
+            keep &= records["millis"] <= as_millis(end)
+
+        if uids is not None:
+            keep &= np.isin(records["uid"], np.asarray(uids, dtype=np.int64))
+
+        kept = records[keep]
+        background = source.index.background
+        keep = np.ones(len(background), dtype=bool)
+
+        if start is not None:
+            keep &= background["millis"] >= as_millis(start)
+
+        if end is not None:
+            keep &= background["millis"] <= as_millis(end)
+
+        if uids is not None and len(kept) > 0:
+            offsets = background["offset"]
+            keep &= (offsets > kept["offset"][0]) & (offsets < kept["offset"][-1])
+        elif uids is not None:
+            keep[:] = False
+
+        data_millis = source.header.data_millis
+
+        if source.footer is not None:
+            end_millis = source.footer.data_millis
+        else:
+            end_millis = int(records["millis"].max()) if len(records) else data_millis
+
+        if start is not None:
+            data_millis = max(data_millis, as_millis(start))
+
+        if end is not None:
+            end_millis = min(end_millis, as_millis(end))
+
+        with open(out_path, "wb") as f:
+            length = f.write(_header_bytes(source, data_millis))
+            length += f.write(source.parts[-3])
+            length += _write_runs(f, dat, _in_file_order(kept, background[keep]))
+
+            if -4 in source.parts:
+                length += f.write(source.parts[-4])
+
+            f.write(_footer_bytes(source, len(kept), end_millis, kept["uid"], length))
+
+    return len(kept)
+
+
+def merge_pgdf(pgdf_paths: list, out_path: str) -> int:
+    """Join several files of the same module into one, in time order
+    of their FileHeaders. The FileHeader and module header come from
+    the first file, and the ModuleFooter and FileFooter from the last.
+
+    Args:
+        pgdf_paths (list): the files to join. They must all have the
+            same file version, module type, module name, stream name
+            and module header.
+        out_path (str): where to write the new file.
+
+    Returns:
+        int: the number of objects written.
+    """
+    sources = []
+
+    for pgdf_path in pgdf_paths:
+        with open_buffer(pgdf_path) as dat:
+            sources.append((pgdf_path, _Source(pgdf_path, dat)))
+
+    if len(sources) == 0:
+        raise ValueError("there are no files to merge")
+
+    sources.sort(key=lambda s: (s[1].header.data_millis, s[0]))
+    first = sources[0][1]
+    last = sources[-1][1]
+
+    for pgdf_path, source in sources:
+        same = (
+            source.header.file_version == first.header.file_version
+            and source.header.module_type == first.header.module_type
+            and source.header.module_name == first.header.module_name
+            and source.header.stream_name == first.header.stream_name
+            and source.parts[-3] == first.parts[-3]
+        )
+
+        if not same:
+            raise ValueError(pgdf_path + " is not from the same module")
+
+    num_objects = 0
+    uids = []
+    end_millis = 0
+
+    with open(out_path, "wb") as f:
+        length = f.write(first.parts[-1])
+        length += f.write(first.parts[-3])
+
+        for pgdf_path, source in sources:
+            records = source.index.records
+            everything = _in_file_order(records, source.index.background)
+
+            with open_buffer(pgdf_path) as dat:
+                length += _write_runs(f, dat, everything)
+
+            num_objects += len(records)
+            uids.append(records["uid"])
+
+            if source.footer is not None:
+                end_millis = max(end_millis, source.footer.data_millis)
+            elif len(records) > 0:
+                end_millis = max(end_millis, int(records["millis"].max()))
+
+        if -4 in last.parts:
+            length += f.write(last.parts[-4])
+
+        uids = np.concatenate(uids)
+        f.write(_footer_bytes(last, num_objects, end_millis, uids, length))
+
+    return num_objects
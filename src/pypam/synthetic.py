@@ -0,0 +1,481 @@
+""" Writing synthetic pgdf files, for tests and benchmarks that should
+not depend on real recordings.
+
+Everything is deterministic - the same arguments, including the seed,
+always give the same bytes.
+
+This module contains the following:
+    - write_gemini_pgdf - Write a Gemini Threshold Detector file
+    - write_pgdf - Write a file of any module from its objects' data
+    - pack_file_header, pack_file_footer - The records around a file
+    - pack_module_header, pack_module_footer - The records around a module
+    - pack_pam_data - A data object, with the fields its flags ask for
+    - pack_annotations - The annotations at the end of a data object
+    - pack_gemini - The Gemini part of a data object
+    - gemini_points - Track points to pass to pack_gemini
+    - pack_click - The click detector part of a data object
+    - pack_whistle - The whistle and moan detector part of a data object
+    - pack_noise, pack_noise_header - The noise monitor data and bands
+    - pack_ltsa, pack_ltsa_header - The LTSA data and FFT settings
+    - pack_dl_result - The result of one deep learning model
+    - pack_dl_annotation - The results of each model, as an annotation
+    - pack_dl_detection, pack_dl_model_data - Deep learning data objects
+    - pack_spectrum_background - The data of a background record
+
+Examples:
+
+    >>> from pypam.synthetic import write_gemini_pgdf
+    >>> write_gemini_pgdf("test.pgdf", num_objects=1000, num_points=50)
+    >>> pgdf = PGDF("test.pgdf")
+
+"""
+
+__all__ = [
+    "FIELD_DEFAULTS",
+    "gemini_points",
+    "pack_annotations",
+    "pack_click",
+    "pack_dl_annotation",
+    "pack_dl_detection",
+    "pack_dl_model_data",
+    "pack_dl_result",
+    "pack_file_footer",
+    "pack_file_header",
+    "pack_gemini",
+    "pack_java_string",
+    "pack_ltsa",
+    "pack_ltsa_header",
+    "pack_module_footer",
+    "pack_module_header",
+    "pack_noise",
+    "pack_noise_header",
+    "pack_pam_data",
+    "pack_spectrum_background",
+    "pack_whistle",
+    "write_gemini_pgdf",
+    "write_pgdf",
+]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import functools
+import struct
+
+import numpy as np
+
+from pypam.file import pack_file_footer
+from pypam.gemini import TRACK_POINT_DTYPE
+from pypam.pamdata import (
+    CHANNELMAP,
+    HASBINARYANNOTATIONS,
+    OPTIONAL_FIELDS,
+    TIMEDELAYSECS,
+    TIMENANOS,
+)
+
+# The values written for the optional PAMData fields unless others are
+# given. time_nanos and UID are worked out per object.
+FIELD_DEFAULTS = {
+    "channel_map": 1,
+    "start_sample": 0,
+    "sample_duration": 0,
+    "freq_limits": (0.0, 0.0),
+    "duration_millis": 33.0,
+    "sequence_map": 1,
+    "noise": 0.0,
+    "signal": 0.0,
+    "signal_excess": 0.0,
+}
+
+GEMINI = "Gemini Threshold Detector"
+
+
+def pack_java_string(s: str) -> bytes:
+    """A string as Java's DataOutputStream.writeUTF writes it."""
+    b = s.encode("utf-8")
+    return struct.pack(">h", len(b)) + b
+
+
+def pack_file_header(
+    module_type: str,
+    module_name: str,
+    stream_name: str,
+    start_millis: int,
+    version=3,
+    pamguard="2.02.03",
+) -> bytes:
+    """The FileHeader record."""
+    body = struct.pack(">i", version) + b"PAMGUARDDATA"
+    body += pack_java_string(pamguard) + pack_java_string("CORE")
+    body += struct.pack(">qqq", start_millis, start_millis, 0)
+    body += pack_java_string(module_type)
+    body += pack_java_string(module_name)
+    body += pack_java_string(stream_name)
+    body += struct.pack(">i", 0)
+    return struct.pack(">ii", 8 + len(body), -1) + body
+
+
+def pack_module_header(version=1, binary=b"") -> bytes:
+    """The ModuleHeader record, with any module specific binary."""
+    return struct.pack(">iiii", 16 + len(binary), -3, version, len(binary)) + binary
+
+
+def pack_module_footer(binary=b"") -> bytes:
+    """The ModuleFooter record, with any module specific binary."""
+    return struct.pack(">iii", 12 + len(binary), -4, len(binary)) + binary
+
+
+def pack_pam_data(
+    millis: int,
+    data: bytes,
+    flag_bitmap=0x8D,
+    version=3,
+    uid=0,
+    identifier=1,
+    time_delays=(),
+    annotations=b"",
+    **fields,
+) -> bytes:
+    """A whole data object - the PAMData fields its flag bitmap asks
+    for, followed by the module specific data.
+
+    Args:
+        millis (int): the time of the object.
+        data (bytes): the module specific data.
+        flag_bitmap (int): which optional fields to write.
+        version (int): the file version. Version 2 has no flag bitmap
+            and always has the nanos and channel map.
+        uid (int): the UID of the object.
+        identifier (int): the record identifier.
+        time_delays (list): the delays written if TIMEDELAYSECS is set.
+        annotations (bytes): the annotations, from pack_annotations,
+            written if HASBINARYANNOTATIONS is set.
+        fields: values for any other optional fields, by the names in
+            OPTIONAL_FIELDS. The rest come from FIELD_DEFAULTS.
+
+    Returns:
+        bytes: the record.
+    """
+    values = dict(FIELD_DEFAULTS)
+    values.update(time_nanos=millis * 1000000, UID=uid)
+    values.update(num_time_delays=len(time_delays))
+    values.update(fields)
+    present = flag_bitmap
+
+    if version == 2:
+        present |= TIMENANOS | CHANNELMAP
+
+    body = [struct.pack(">q", millis)]
+
+    if version >= 3:
+        body.append(struct.pack(">H", flag_bitmap))
+
+    for flag, name, fmt in OPTIONAL_FIELDS:
+        if present & flag:
+            value = values[name]
+            value = value if isinstance(value, (list, tuple)) else [value]
+            body.append(struct.pack(">" + fmt, *value))
+
+            if flag == TIMEDELAYSECS:
+                delays_fmt = ">" + str(len(time_delays)) + "f"
+                body.append(struct.pack(delays_fmt, *time_delays))
+
+    body.append(data)
+
+    if flag_bitmap & HASBINARYANNOTATIONS:
+        body.append(annotations)
+
+    body = b"".join(body)
+    return struct.pack(">ii", 8 + len(body), identifier) + body
+
+
+def pack_annotations(annotations) -> bytes:
+    """The annotations of a data object, from a list of (id, version,
+    data) tuples, where data is the bytes of the annotation."""
+    body = b""
+
+    for anno_id, anno_ver, data in annotations:
+        entry = pack_java_string(anno_id) + struct.pack(">h", anno_ver) + data
+        # The length of each includes the length field itself
+        body += struct.pack(">h", 2 + len(entry)) + entry
+
+    return struct.pack(">hh", 4 + len(body), len(annotations)) + body
+
+
+def gemini_points(millis: int, num_points: int, rng, sonar_id=3) -> np.ndarray:
+    """Track points every 100 ms from millis, with random bearings,
+    ranges and sizes."""
+    points = np.zeros(num_points, dtype=TRACK_POINT_DTYPE)
+    points["time_millis"] = millis + np.arange(num_points, dtype=np.int64) * 100
+    points["sonar_id"] = sonar_id
+    bearings = np.sort(rng.uniform(-1.0, 1.0, (num_points, 3)), axis=1)
+    ranges = np.sort(rng.uniform(0.5, 50.0, (num_points, 3)), axis=1)
+    points["min_bearing"], points["peak_bearing"], points["max_bearing"] = bearings.T
+    points["min_range"], points["peak_range"], points["max_range"] = ranges.T
+    points["obj_size"] = rng.uniform(0.1, 2.0, num_points)
+    points["occupancy"] = rng.uniform(0.0, 100.0, num_points)
+    points["average_value"] = rng.integers(0, 255, num_points)
+    points["total_value"] = rng.integers(0, 100000, num_points)
+    points["max_value"] = rng.integers(0, 255, num_points)
+    return points
+
+
+def pack_gemini(
+    points: np.ndarray,
+    sonar_ids=(3,),
+    straight_length=1.5,
+    wobbly_length=2.5,
+    mean_occupancy=0.25,
+) -> bytes:
+    """The Gemini specific part of a data object."""
+    points = np.asarray(points).astype(TRACK_POINT_DTYPE)
+    body = struct.pack(">ib", len(points), len(sonar_ids))
+    body += struct.pack(">" + str(len(sonar_ids)) + "h", *sonar_ids)
+    body += struct.pack(">fff", straight_length, wobbly_length, mean_occupancy)
+    body += points.tobytes()
+    return struct.pack(">i", len(body)) + body
+
+
+def pack_click(
+    wave: np.ndarray,
+    max_value=1.0,
+    trigger_map=1,
+    click_type=0,
+    flags=0,
+    angles=(),
+    angle_errors=(),
+) -> bytes:
+    """The click specific part of a data object, as version 4 of the
+    click detector writes it. wave holds int8 samples, a row per
+    channel. The channel map and duration go in the PAMData."""
+    wave = np.asarray(wave, dtype=np.int8)
+    body = struct.pack(">ihi", trigger_map, click_type, flags)
+
+    for floats in (angles, angle_errors):
+        body += struct.pack(">h" + str(len(floats)) + "f", len(floats), *floats)
+
+    body += struct.pack(">f", max_value) + wave.tobytes()
+    return struct.pack(">i", len(body)) + body
+
+
+def pack_whistle(slice_numbers, peaks, amplitude=100.0) -> bytes:
+    """The whistle specific part of a data object, as version 2 of the
+    WhistlesMoans detector writes it. peaks has an array per slice of
+    its peaks, a row of low, peak and high bins and link per peak."""
+    body = struct.pack(">hh", len(slice_numbers), int(amplitude * 100))
+
+    for slice_number, slice_peaks in zip(slice_numbers, peaks):
+        slice_peaks = np.asarray(slice_peaks, dtype=">i2").reshape(-1, 4)
+        body += struct.pack(">ib", slice_number, len(slice_peaks))
+        body += slice_peaks.tobytes()
+
+    return struct.pack(">i", len(body)) + body
+
+
+def pack_noise_header(low_edges, high_edges, stats_types=0x3) -> bytes:
+    """The module specific part of a noise monitor's ModuleHeader."""
+    n = len(low_edges)
+    body = struct.pack(">hh", n, stats_types)
+    return body + struct.pack(">" + str(2 * n) + "f", *low_edges, *high_edges)
+
+
+def pack_noise(noise) -> bytes:
+    """The noise monitor part of a data object, as version 2 writes
+    it, from the levels in dB as an array of bands x measures."""
+    noise = np.asarray(noise)
+    body = struct.pack(">hh", *noise.shape)
+    body += np.round(noise * 100).astype(">i2").tobytes()
+    return struct.pack(">i", len(body)) + body
+
+
+def pack_ltsa_header(fft_length=1024, fft_hop=512, interval_seconds=60) -> bytes:
+    """The module specific part of an LTSA ModuleHeader."""
+    return struct.pack(">iii", fft_length, fft_hop, interval_seconds)
+
+
+def pack_ltsa(end_millis: int, levels, max_value=1.0, num_ffts=1) -> bytes:
+    """The LTSA part of a data object, as version 2 writes it, from the
+    int8 levels of the spectrum."""
+    body = struct.pack(">qif", end_millis, num_ffts, max_value)
+    body += np.asarray(levels, dtype=np.int8).tobytes()
+    return struct.pack(">i", len(body)) + body
+
+
+def pack_dl_result(
+    predictions, class_ids, model_type=1, is_binary=False, scale=32767.0
+) -> bytes:
+    """The result of one deep learning model, with the predictions
+    written as int16 values of prediction x scale."""
+    scores = np.round(np.asarray(predictions) * scale).astype(">i2")
+    body = struct.pack(">b?fh", model_type, is_binary, scale, len(scores))
+    body += scores.tobytes()
+    return (
+        body
+        + struct.pack(">h", len(class_ids))
+        + np.asarray(class_ids, ">i2").tobytes()
+    )
+
+
+def pack_dl_annotation(results) -> bytes:
+    """The data of a "Delt" annotation, from a list of the results of
+    each model from pack_dl_result."""
+    return struct.pack(">h", len(results)) + b"".join(results)
+
+
+def pack_dl_detection(wave, max_value=32767.0) -> bytes:
+    """The detections stream part of a deep learning classifier data
+    object, from int16 samples, a row per channel."""
+    wave = np.asarray(wave, dtype=">i2")
+    body = struct.pack(">hif", *wave.shape, max_value) + wave.tobytes()
+    return struct.pack(">i", len(body)) + body
+
+
+def pack_dl_model_data(result: bytes) -> bytes:
+    """The model data stream part of a deep learning classifier data
+    object, from a result from pack_dl_result."""
+    return struct.pack(">i", len(result)) + result
+
+
+def pack_spectrum_background(background, first_bin=0) -> bytes:
+    """The data of a background record holding a noise spectrum. Pass
+    it to pack_pam_data with an identifier of -6."""
+    background = np.asarray(background, dtype=">f4")
+    body = struct.pack(">ii", first_bin, len(background)) + background.tobytes()
+    return struct.pack(">i", len(body)) + body
+
+
+def write_pgdf(
+    pgdf_path: str,
+    module_type: str,
+    objects: list,
+    module_name=None,
+    stream_name="",
+    version=3,
+    module_version=1,
+    module_binary=b"",
+    start_millis=None,
+    end_millis=None,
+    end_reason=1,
+) -> str:
+    """Write a file of any module type, from the module specific data
+    of each object.
+
+    Args:
+        pgdf_path (str): where to write the file.
+        module_type (str): the module type in the FileHeader.
+        objects (list): a dict per object of the arguments to pass to
+            pack_pam_data - at least millis and data. Give background
+            records an identifier of -6.
+        module_name (str): the module name, or None to use the type.
+        stream_name (str): the stream name in the FileHeader.
+        version (int): the file version.
+        module_version (int): the version in the ModuleHeader.
+        module_binary (bytes): the module specific part of the
+            ModuleHeader.
+        start_millis (int): the FileHeader date, or None for the time
+            of the first object.
+        end_millis (int): the FileFooter date, or None for the time of
+            the last object.
+        end_reason (int): the FileFooter end reason, or None to leave
+            it out as older files do.
+
+    Returns:
+        str: pgdf_path.
+    """
+    millis = [obj["millis"] for obj in objects]
+    uids = [obj.get("uid", 0) for obj in objects]
+    start_millis = min(millis, default=0) if start_millis is None else start_millis
+    end_millis = max(millis, default=start_millis) if end_millis is None else end_millis
+    records = [
+        pack_file_header(
+            module_type,
+            module_type if module_name is None else module_name,
+            stream_name,
+            start_millis,
+            version,
+        ),
+        pack_module_header(module_version, module_binary),
+    ]
+    records += [pack_pam_data(version=version, **obj) for obj in objects]
+    records.append(pack_module_footer())
+    footer = functools.partial(
+        pack_file_footer,
+        len(objects),
+        end_millis,
+        min(uids, default=-1),
+        max(uids, default=-1),
+        version=version,
+        end_reason=end_reason,
+    )
+    # The file length includes the footer, which is always the same size.
+    file_length = sum(len(r) for r in records) + len(footer(0))
+    records.append(footer(file_length))
+
+    with open(pgdf_path, "wb") as f:
+        f.write(b"".join(records))
+
+    return str(pgdf_path)
+
+
+def write_gemini_pgdf(
+    pgdf_path: str,
+    num_objects=5,
+    num_points=4,
+    flag_bitmap=0x8D,
+    version=3,
+    start_millis=1658448004000,
+    first_uid=1861000000,
+    interval_millis=1000,
+    stream_name="Sonar Tracks",
+    end_reason=1,
+    seed=0,
+    annotations=b"",
+) -> str:
+    """Write a Gemini Threshold Detector file with num_objects tracks of
+    num_points points, one track every interval_millis from
+    start_millis, with UIDs counting up from first_uid.
+
+    Args:
+        pgdf_path (str): where to write the file.
+        num_objects (int): the number of tracks.
+        num_points (int): the number of points in each track.
+        flag_bitmap (int): the PAMData fields of each object.
+        version (int): the file version.
+        start_millis (int): the time of the first track.
+        first_uid (int): the UID of the first track.
+        interval_millis (int): the time between tracks.
+        stream_name (str): the stream name in the FileHeader.
+        end_reason (int): the FileFooter end reason, or None to leave
+            it out as older files do.
+        seed (int): the seed for the point values.
+        annotations (bytes): the annotations of every track, from
+            pack_annotations, if flag_bitmap has HASBINARYANNOTATIONS.
+
+    Returns:
+        str: pgdf_path.
+    """
+    rng = np.random.default_rng(seed)
+    objects = []
+
+    for i in range(num_objects):
+        millis = start_millis + i * interval_millis
+        objects.append(
+            {
+                "millis": millis,
+                "data": pack_gemini(gemini_points(millis, num_points, rng)),
+                "flag_bitmap": flag_bitmap,
+                "uid": first_uid + i,
+                "annotations": annotations,
+            }
+        )
+
+    return write_pgdf(
+        pgdf_path,
+        GEMINI,
+        objects,
+        stream_name=stream_name,
+        version=version,
+        start_millis=start_millis,
+        end_millis=start_millis + num_objects * interval_millis,
+        end_reason=end_reason,
+    )
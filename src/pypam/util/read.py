@@ -1,18 +1,21 @@
 """ Support functions and classes we need when reading the
 various PAMGuard and related files. """
 
-__all__ = ["read_java_string"]
+__all__ = ["open_buffer", "read_java_string"]
 __version__ = "0.1"
 __author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
 
+import mmap
+import os
 import struct
+from contextlib import contextmanager
 from typing import Tuple
 
 
 def read_java_string(dat, offset) -> Tuple[str, int]:
     """Utility function for reading java strings"""
     ds = offset
-    dt = struct.unpack(">h", dat[ds : ds + 2])[0]
+    dt = struct.unpack_from(">h", dat, ds)[0]
     ds += 2
     java_str = ""
 
@@ -21,3 +24,40 @@ def read_java_string(dat, offset) -> Tuple[str, int]:
         ds += dt
 
     return (java_str, dt + 2)
+
+
+@contextmanager
+def open_buffer(path: str, memory_map: bool = True):
+    """Open a file and yield a read-only buffer over its contents.
+
+    With memory_map set, the buffer is a memoryview over an mmap of
+    the file, so pages are only read in from disk as the decoders
+    touch them. Otherwise the whole file is read into a bytes object.
+    Decoders must not hold on to slices of the buffer once they
+    return, as the map is closed when the context exits.
+
+    Args:
+        path (str): full path and name of the file.
+        memory_map (bool): map the file rather than reading it.
+
+    Yields:
+        memoryview | bytes: the contents of the file.
+    """
+    with open(path, "rb") as f:
+        # Empty files cannot be mapped.
+        if not memory_map or os.fstat(f.fileno()).st_size == 0:
+            yield f.read()
+            return
+
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+
+        view = memoryview(mm)
+
+        try:
+            yield view
+        finally:
+            view.release()
+            mm.close()
@@ -1,15 +1,32 @@
-""" Time related support functions """
+""" Time related support functions.
 
-__all__ = ["epoch"]
+PAMGuard stores times as integer milliseconds (and sometimes
+nanoseconds) since the Unix epoch. We keep those integers as they
+are and only build datetime objects when asked for them.
+"""
+
+__all__ = [
+    "as_millis",
+    "epoch",
+    "millis_to_datetime",
+    "millis_to_datetime64",
+    "nanos_to_datetime64",
+]
 __version__ = "0.1"
 __author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
 
 
 import datetime
+from functools import lru_cache
+
+import numpy as np
 import pytz
 
 
+@lru_cache(maxsize=None)
 def epoch(zone="UTC"):
+    """The Unix epoch in the given timezone. This is cached, as the
+    datetime returned is immutable and building it is slow."""
     epoch_str = "1970-01-01 00:00:00"
     epoch_format = "%Y-%m-%d %H:%M:%S"
     epoch = datetime.datetime.strptime(epoch_str, epoch_format)
@@ -17,3 +34,43 @@ def epoch(zone="UTC"):
     epoch = tz.localize(epoch)
     return epoch
 
+
+def millis_to_datetime(millis: int, zone="UTC") -> datetime.datetime:
+    """Convert milliseconds since the epoch to a datetime.
+
+    Args:
+        millis (int): milliseconds since the epoch.
+        zone (str): the timezone of the returned datetime.
+
+    Returns:
+        datetime.datetime: the timezone aware datetime.
+    """
+    return epoch(zone) + datetime.timedelta(milliseconds=int(millis))
+
+
+def millis_to_datetime64(millis) -> np.ndarray:
+    """Convert an array of milliseconds since the epoch to a
+    numpy datetime64[ms] array, in UTC."""
+    return np.asarray(millis, dtype=np.int64).astype("datetime64[ms]")
+
+
+def nanos_to_datetime64(nanos) -> np.ndarray:
+    """Convert an array of nanoseconds since the epoch to a
+    numpy datetime64[ns] array, in UTC."""
+    return np.asarray(nanos, dtype=np.int64).astype("datetime64[ns]")
+
+
+def as_millis(t) -> int:
+    """Milliseconds since the epoch for a time given as an integer
+    (already in millis), a datetime (naive ones are taken as UTC) or a
+    numpy datetime64."""
+    if isinstance(t, datetime.datetime):
+        if t.tzinfo is None:
+            t = t.replace(tzinfo=datetime.timezone.utc)
+
+        return (t - epoch()) // datetime.timedelta(milliseconds=1)
+
+    if isinstance(t, np.datetime64):
+        return int(t.astype("datetime64[ms]").astype(np.int64))
+
+    return int(t)
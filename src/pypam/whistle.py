@@ -0,0 +1,200 @@
+""" Whistle and moan contours from the WhistlesMoans detector.
+
+Each contour is a run of FFT slices, and each slice has one or more
+peaks, given as the FFT bins of their low, peak and high frequencies
+and a link to a peak in the next slice. Frequencies stay as bins, as
+the file does not hold the FFT length or sample rate.
+
+Rather than a list per slice, the slices of a contour are kept in flat
+arrays, and the slices of every contour of a module go into one
+contours table, in object order. contour_offsets gives where each
+contour starts in it, so statistics over contours can be worked out
+with numpy, for example with np.add.reduceat.
+
+This module contains the following:
+    - WhistleData - A single whistle or moan contour
+    - whistle_columns - The columns of a list of contours
+    - contour_offsets - Where each contour starts in the contours table
+
+Examples:
+
+    >>> from pypam.pgdf import PGDF
+    >>> from pypam.whistle import contour_offsets
+    >>> columns = PGDF("WhistlesMoans_20220722_000000.pgdf").module.to_columns()
+    >>> peaks = columns.tables["contours"]["peak_bin"]
+    >>> offsets = contour_offsets(columns)
+    >>> mean_peak = np.add.reduceat(peaks, offsets[:-1]) / columns["num_slices"]
+
+"""
+
+__all__ = ["DECODER", "WhistleData", "contour_offsets", "whistle_columns"]
+__version__ = "0.1"
+__author__ = "Benjamin Blundell <bjb8@st-andrews.ac.uk>"
+
+import struct
+
+import numpy as np
+
+from pypam.background import DECODER as BACKGROUND_DECODER
+from pypam.decoders import Decoder
+
+# A slice with a single peak, by far the most common, so a contour
+# made only of these can be read in one np.frombuffer call.
+SINGLE_PEAK_SLICE = np.dtype(
+    [("slice", ">i4"), ("num_peaks", "i1"), ("peak", ">i2", 4)]
+)
+
+
+class WhistleData:
+    """A whistle or moan contour.
+
+    slice_numbers and num_peaks have a row per slice. peaks has a row
+    per peak, the peaks of each slice one after the other, with the low,
+    peak and high frequency bins and the link to the next slice."""
+
+    def __init__(self, dat, offset, pam_data, module_header):
+        ds = offset
+        version = module_header.version if module_header is not None else 2
+        self.data_length = struct.unpack_from(">i", dat, ds)[0]
+        ds += 4
+
+        if version < 2:
+            self.start_sample, self.channel_map = struct.unpack_from(">qi", dat, ds)
+            ds += 12
+        else:
+            self.start_sample = pam_data.start_sample
+            self.channel_map = pam_data.channel_map
+
+        self.num_slices = struct.unpack_from(">h", dat, ds)[0]
+        ds += 2
+        self.amplitude = 0.0
+
+        if version >= 1:
+            self.amplitude = struct.unpack_from(">h", dat, ds)[0] / 100
+            ds += 2
+
+        self.delays = np.empty(0, dtype=np.int16)
+
+        if version == 1:
+            num_delays = struct.unpack_from(">b", dat, ds)[0]
+            self.delays = np.frombuffer(dat, ">i2", num_delays, ds + 1).astype(np.int16)
+            ds += 1 + 2 * num_delays
+
+        end = offset + 4 + self.data_length
+        slices = None
+
+        if ds + self.num_slices * SINGLE_PEAK_SLICE.itemsize <= end:
+            slices = np.frombuffer(dat, SINGLE_PEAK_SLICE, self.num_slices, ds)
+
+        if slices is not None and np.all(slices["num_peaks"] == 1):
+            self.slice_numbers = slices["slice"].astype(np.int32)
+            self.num_peaks = np.ones(self.num_slices, dtype=np.int8)
+            self.peaks = slices["peak"].astype(np.int16)
+        else:
+            self._read_slices(dat, ds)
+
+        self.length = 4 + self.data_length
+
+    def _read_slices(self, dat, ds: int):
+        """Read slices with any number of peaks, one slice at a time."""
+        slice_numbers = []
+        num_peaks = []
+        peaks = []
+
+        for i in range(self.num_slices):
+            slice_number, n = struct.unpack_from(">ib", dat, ds)
+            ds += 5
+            slice_numbers.append(slice_number)
+            num_peaks.append(n)
+            peaks.append(np.frombuffer(dat, ">i2", 4 * n, ds))
+            ds += 8 * n
+
+        self.slice_numbers = np.array(slice_numbers, dtype=np.int32)
+        self.num_peaks = np.array(num_peaks, dtype=np.int8)
+        self.peaks = np.concatenate(peaks or [np.empty(0, ">i2")])
+        self.peaks = self.peaks.astype(np.int16).reshape(-1, 4)
+
+    @property
+    def peak_offsets(self) -> np.ndarray:
+        """Where the peaks of each slice start in peaks, with the
+        total number of peaks at the end."""
+        return np.concatenate(([0], np.cumsum(self.num_peaks, dtype=np.int64)))
+
+    @property
+    def contour(self) -> np.ndarray:
+        """The first peak of each slice - its low, peak and high
+        frequency bins and link - a row per slice."""
+        return self.peaks[self.peak_offsets[:-1]]
+
+    @property
+    def peak_bin(self) -> np.ndarray:
+        """The peak frequency bin of each slice of the contour."""
+        return self.contour[:, 1]
+
+    @property
+    def contour_width(self) -> np.ndarray:
+        """The width, in bins, of each slice of the contour."""
+        contour = self.contour
+        return contour[:, 2] - contour[:, 0] + 1
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return (
+            str(self.length)
+            + ","
+            + str(self.channel_map)
+            + ","
+            + str(self.num_slices)
+            + ","
+            + str(self.amplitude)
+        )
+
+
+def whistle_columns(objects: list):
+    """The whistle specific columns for a list of PGObjects holding
+    WhistleData, and a contours table with a row per slice, holding
+    the first peak of each slice.
+
+    Args:
+        objects (list): the PGObjects.
+
+    Returns:
+        tuple: a dict of columns with a row per object, and a dict
+        holding the contours table, joined to the objects by UID.
+    """
+    whistles = [o.data for o in objects]
+    num_slices = np.array([w.num_slices for w in whistles], dtype=np.int32)
+    columns = {
+        "num_slices": num_slices,
+        "amplitude": np.array([w.amplitude for w in whistles], dtype=np.float32),
+    }
+
+    if len(whistles) > 0:
+        slice_numbers = np.concatenate([w.slice_numbers for w in whistles])
+        contours = np.concatenate([w.contour for w in whistles])
+    else:
+        slice_numbers = np.empty(0, dtype=np.int32)
+        contours = np.empty((0, 4), dtype=np.int16)
+
+    uids = np.repeat(np.array([o.pam.UID for o in objects], dtype=np.int64), num_slices)
+    table = {
+        "UID": uids,
+        "slice_number": slice_numbers,
+        "low_bin": contours[:, 0].copy(),
+        "peak_bin": contours[:, 1].copy(),
+        "high_bin": contours[:, 2].copy(),
+    }
+    return columns, {"contours": table}
+
+
+def contour_offsets(columns) -> np.ndarray:
+    """Where the slices of each contour start in the contours table of
+    some ModuleColumns, with the number of rows at the end. The table
+    must still be in object order, as it is unless the columns have
+    been sorted."""
+    return np.concatenate(([0], np.cumsum(columns["num_slices"], dtype=np.int64)))
+
+
+DECODER = Decoder(WhistleData, whistle_columns, background=BACKGROUND_DECODER)
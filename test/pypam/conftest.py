@@ -0,0 +1,17 @@
+""" Fixtures shared by the pypam tests."""
+
+import pytest
+
+from pypam.synthetic import write_gemini_pgdf as write_synthetic
+
+
+@pytest.fixture
+def write_gemini_pgdf(tmp_path):
+    """Returns a function that writes a small synthetic Gemini PGDF
+    file into tmp_path and returns its path. It takes the arguments of
+    pypam.synthetic.write_gemini_pgdf, plus the name of the file."""
+
+    def write(name="gemini.pgdf", **kwargs):
+        return write_synthetic(tmp_path / name, **kwargs)
+
+    return write
@@ -0,0 +1,68 @@
+"""Tests for reading pgdf files from asyncio code."""
+
+import asyncio
+
+from pypam.aio import iter_directory_async, load_columns_async, open_pgdf_async
+from pypam.file import FileHeader
+from pypam.pgdf import PGDF
+
+
+def test_open_pgdf_async(write_gemini_pgdf):
+    pgdf_path = write_gemini_pgdf(num_objects=7)
+
+    async def read(**kwargs):
+        return [obj async for obj in open_pgdf_async(pgdf_path, **kwargs)]
+
+    objects = asyncio.run(read(batch_size=3))
+    expected = PGDF(pgdf_path).module.objects
+    assert [str(o.pam) for o in objects] == [str(o.pam) for o in expected]
+
+    records = asyncio.run(read(batch_size=100, records=True))
+    assert len(records) == 7 + 4
+    assert isinstance(records[0], FileHeader)
+
+    columns = asyncio.run(load_columns_async(pgdf_path))
+    assert list(columns["UID"]) == [o.pam.UID for o in expected]
+
+
+def test_open_pgdf_async_early_stop(write_gemini_pgdf):
+    pgdf_path = write_gemini_pgdf(num_objects=7)
+
+    async def first_two():
+        found = []
+
+        async for obj in open_pgdf_async(pgdf_path, batch_size=2):
+            found.append(obj.pam.UID)
+
+            if len(found) == 2:
+                break
+
+        return found
+
+    assert asyncio.run(first_two()) == [1861000000, 1861000001]
+
+
+def test_iter_directory_async(write_gemini_pgdf, tmp_path):
+    for i in range(5):
+        write_gemini_pgdf(
+            name=str(i) + ".pgdf", num_objects=4, first_uid=1861000000 + i * 10
+        )
+
+    async def read():
+        return [
+            item
+            async for item in iter_directory_async(
+                str(tmp_path), max_concurrency=2, batch_size=3
+            )
+        ]
+
+    items = asyncio.run(read())
+    assert len(items) == 20
+    assert sorted(obj.pam.UID for _, obj in items) == sorted(
+        1861000000 + i * 10 + j for i in range(5) for j in range(4)
+    )
+
+    # Objects of each file still come in file order.
+    for i in range(5):
+        uids = [obj.pam.UID for path, obj in items if path.endswith(str(i) + ".pgdf")]
+        assert uids == sorted(uids)
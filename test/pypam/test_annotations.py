@@ -0,0 +1,63 @@
+"""Tests for the lazy annotation decoding."""
+
+import struct
+
+import numpy as np
+
+from pypam.pgdf import PGDF
+from pypam.synthetic import pack_annotations, pack_java_string
+
+
+def bearing(angles, errors, ref_angles):
+    data = pack_java_string("TDOA") + struct.pack(">IhIh", 3, 1, 4, len(angles))
+    data += struct.pack(">" + str(len(angles)) + "f", *angles)
+    data += struct.pack(">h" + str(len(errors)) + "f", len(errors), *errors)
+    data += struct.pack(">h" + str(len(ref_angles)) + "f", len(ref_angles), *ref_angles)
+    return data
+
+
+def test_annotations(write_gemini_pgdf):
+    annotations = pack_annotations(
+        [
+            ("Bearing", 2, bearing([0.5, 1.5], [0.1, 0.2], [3.0])),
+            ("XXXX", 1, b"unknown to us"),
+            (
+                "BCLS",
+                1,
+                pack_java_string("seal")
+                + pack_java_string("rf")
+                + struct.pack(">f", 0.75),
+            ),
+        ]
+    )
+    pgdf_path = write_gemini_pgdf(
+        num_objects=3, flag_bitmap=0x8D | 0x200, annotations=annotations
+    )
+    objects = PGDF(pgdf_path).module.objects
+
+    # Nothing is decoded until it is asked for
+    assert objects[0].pam.has_annotations
+    assert objects[0].pam._annotations is None
+    assert [o.pam.UID for o in objects] == [1861000000, 1861000001, 1861000002]
+
+    annos = objects[1].pam.annotations
+    assert len(annos) == len(annotations)
+    assert list(annos.entries) == ["Bearing", "XXXX", "BCLS"]
+    assert "XXXX" in annos
+    assert "bearing" not in vars(annos)
+
+    assert annos.bearing.algorithm_name == "TDOA"
+    assert annos.bearing.angles.dtype == np.float32
+    assert np.allclose(annos.bearing.angles, [0.5, 1.5])
+    assert np.allclose(annos.bearing.errors, [0.1, 0.2])
+    assert np.allclose(annos.bearing.ref_angles, [3.0])
+    assert annos.basic_classification.label == "seal"
+    assert annos.basic_classification.score == 0.75
+    assert annos.target_motion is None
+
+
+def test_no_annotations(write_gemini_pgdf):
+    pgdf_path = write_gemini_pgdf(num_objects=2)
+    obj = PGDF(pgdf_path).module.objects[0]
+    assert not obj.pam.has_annotations
+    assert obj.pam.annotations is None
@@ -0,0 +1,96 @@
+"""Tests for reading background records."""
+
+import numpy as np
+
+from pypam.follow import PGDFFollower
+from pypam.index import PGDFIndex
+from pypam.module import PGBackground, PGObject
+from pypam.pgdf import PGDF
+from pypam.subset import merge_pgdf, subset_pgdf
+from pypam.synthetic import pack_spectrum_background, pack_whistle, write_pgdf
+
+START = 1658448004000
+
+
+def write_whistles(pgdf_path):
+    """Four whistles, with a background record after the first and the
+    third."""
+    objects = []
+
+    for i in range(4):
+        data = pack_whistle([100 + i], [[[10, 12, 14, 0]]])
+        objects.append({"millis": START + i * 10, "data": data, "uid": 1861000000 + i})
+
+        if i % 2 == 0:
+            spectrum = pack_spectrum_background(np.arange(i, i + 6), first_bin=2)
+            objects.append(
+                {"millis": START + i * 10 + 5, "data": spectrum, "identifier": -6}
+            )
+
+    return write_pgdf(pgdf_path, "WhistlesMoans", objects, module_version=2)
+
+
+def test_background(tmp_path):
+    pgdf_path = write_whistles(tmp_path / "wm.pgdf")
+    module = PGDF(pgdf_path).module
+
+    # Reading carries on past the background records
+    assert [o.pam.UID for o in module.objects] == [1861000000 + i for i in range(4)]
+    assert len(module.background) == 2
+    assert module.background[1].pam.millis == START + 25
+    assert module.background[1].data.first_bin == 2
+    assert np.array_equal(module.background[1].data.background, np.arange(2, 8))
+
+    columns = module.background_columns()
+    assert columns["background"].shape == (2, 6)
+    assert list(columns["millis"]) == [START + 5, START + 25]
+    assert len(module.to_columns()["UID"]) == 4
+
+    records = list(PGDF.iter_objects(pgdf_path))
+    assert [type(r) for r in records[2:6]] == [
+        PGObject,
+        PGBackground,
+        PGObject,
+        PGObject,
+    ]
+
+
+def test_skip_background(tmp_path):
+    pgdf_path = write_whistles(tmp_path / "wm.pgdf")
+    pgdf = PGDF(pgdf_path, background=False)
+    assert len(pgdf.module.objects) == 4
+    assert pgdf.module.background == []
+    assert pgdf.footer is not None
+
+    # Background records are not objects, so are indexed apart, and
+    # not found or polled with them
+    index = PGDFIndex.build(pgdf_path)
+    assert list(index.uids) == [1861000000 + i for i in range(4)]
+    assert list(index.background["millis"]) == [START + 5, START + 25]
+    assert list(index.find_times(START, START + 30)) == [0, 1, 2, 3]
+    between = PGDF.iter_between(pgdf_path, START, START + 30)
+    assert len(list(between)) == 4
+    polled = PGDFFollower(pgdf_path).poll()
+    assert not any(isinstance(r, PGBackground) for r in polled)
+    polled = PGDFFollower(pgdf_path, background=True).poll()
+    assert sum(isinstance(r, PGBackground) for r in polled) == 2
+
+
+def test_subset_and_merge_background(tmp_path):
+    pgdf_path = write_whistles(tmp_path / "wm.pgdf")
+    other_path = write_whistles(tmp_path / "other.pgdf")
+
+    def counts(path):
+        module = PGDF(path).module
+        return len(module.objects), len(module.background)
+
+    out_path = str(tmp_path / "out.pgdf")
+    assert subset_pgdf(pgdf_path, out_path) == 4
+    assert counts(out_path) == (4, 2)
+    subset_pgdf(pgdf_path, out_path, start=START, end=START + 15)
+    assert counts(out_path) == (2, 1)
+    subset_pgdf(pgdf_path, out_path, uids=[1861000001, 1861000003])
+    assert counts(out_path) == (2, 1)
+
+    assert merge_pgdf([pgdf_path, other_path], out_path) == 8
+    assert counts(out_path) == (8, 4)
@@ -0,0 +1,74 @@
+""" Tests for the cache of decoded files."""
+
+import os
+
+import numpy as np
+
+from pypam.cache import ColumnCache
+from pypam.dataset import PGDFDataset, load_columns
+
+
+def test_cache_round_trip(write_gemini_pgdf, tmp_path):
+    pgdf_path = write_gemini_pgdf(num_objects=4, num_points=3)
+    cache = ColumnCache(str(tmp_path / "cache"))
+
+    assert cache.get(pgdf_path) is None
+    columns = cache.load(pgdf_path)
+    assert len(cache) == 1
+
+    cached = cache.get(pgdf_path)
+    assert cached.module_type == columns.module_type
+    assert cached.columns.keys() == columns.columns.keys()
+
+    for name in columns.columns:
+        assert np.array_equal(cached[name], columns[name])
+
+    points = cached.tables["points"]
+    assert np.array_equal(points["UID"], columns.tables["points"]["UID"])
+    assert np.array_equal(points["min_range"], columns.tables["points"]["min_range"])
+
+    # A rewritten file misses the cache.
+    write_gemini_pgdf(num_objects=2)
+    assert cache.get(pgdf_path) is None
+    assert len(cache.load(pgdf_path)) == 2
+
+
+def test_cache_eviction(write_gemini_pgdf, tmp_path):
+    cache = ColumnCache(str(tmp_path / "cache"))
+    paths = [write_gemini_pgdf(name=str(i) + ".pgdf") for i in range(3)]
+
+    for i, path in enumerate(paths):
+        cache.load(path)
+        os.utime(cache.entry_path(path), ns=(i * 10**9, i * 10**9))
+
+    # Using the oldest entry makes it the most recent.
+    cache.get(paths[0])
+    entry_size = os.path.getsize(cache.entry_path(paths[0]))
+    cache.evict(2 * entry_size)
+
+    assert len(cache) == 2
+    assert not os.path.exists(cache.entry_path(paths[1]))
+    assert cache.get(paths[0]) is not None
+
+    cache.clear()
+    assert cache.size() == 0
+
+
+def test_cache_warm(write_gemini_pgdf, tmp_path):
+    for i in range(3):
+        write_gemini_pgdf(name=str(i) + ".pgdf", first_uid=1861000000 + i * 10)
+
+    cache = ColumnCache(str(tmp_path / "cache"))
+    assert cache.warm(str(tmp_path), max_workers=1) == 3
+    assert cache.warm(str(tmp_path), max_workers=1) == 0
+
+    dataset = PGDFDataset(str(tmp_path), max_workers=1, cache=cache)
+    assert len(dataset.load()) == 15
+
+    window = dataset.load(1658448005000, 1658448005000)
+    assert sorted(window["UID"]) == [1861000001, 1861000011, 1861000021]
+    assert len(window.tables["points"]["UID"]) == 12
+    assert np.array_equal(
+        load_columns(os.path.join(str(tmp_path), "0.pgdf"))["UID"],
+        cache.get(os.path.join(str(tmp_path), "0.pgdf"))["UID"],
+    )
@@ -0,0 +1,95 @@
+"""Tests for the click detector decoder."""
+
+import struct
+
+import numpy as np
+import pytest
+
+from pypam.columns import ModuleColumns
+from pypam.export import export_pgdf
+from pypam.pgdf import PGDF
+from pypam.synthetic import pack_click, write_pgdf
+
+# Millis, channel map, UID, sample duration and millis duration
+CLICK_FLAGS = 0xAD
+
+
+def random_waves(rng, durations, num_channels=2):
+    return [
+        rng.integers(-127, 128, (num_channels, n)).astype(np.int8) for n in durations
+    ]
+
+
+def write_clicks(pgdf_path, waves, module_type="Click Detector"):
+    objects = [
+        {
+            "millis": 1658448004000 + i,
+            "data": pack_click(wave, max_value=0.5, click_type=i, angles=[0.25]),
+            "flag_bitmap": CLICK_FLAGS,
+            "uid": 1861000000 + i,
+            "channel_map": 0b101,
+            "sample_duration": wave.shape[1],
+        }
+        for i, wave in enumerate(waves)
+    ]
+    return write_pgdf(pgdf_path, module_type, objects, module_version=4)
+
+
+def test_clicks(tmp_path):
+    waves = random_waves(np.random.default_rng(0), [5, 8, 6])
+    module = PGDF(write_clicks(tmp_path / "clicks.pgdf", waves)).module
+    clicks = [o.data for o in module.objects]
+
+    assert [c.type for c in clicks] == [0, 1, 2]
+    assert [c.duration for c in clicks] == [5, 8, 6]
+    assert all(c.num_channels == 2 for c in clicks)
+    assert np.array_equal(clicks[1].wave, waves[1])
+    assert clicks[1].waveform.dtype == np.float32
+    assert np.allclose(clicks[1].waveform, waves[1] * 0.5 / 127)
+    assert np.allclose(clicks[2].angles, [0.25])
+    assert len(clicks[2].angle_errors) == 0
+
+    columns = module.to_columns()
+    assert columns["wave"].shape == (3, 2, 8)
+    assert columns["wave"].dtype == np.int8
+    assert np.array_equal(columns["wave"][0, :, :5], waves[0])
+    assert not columns["wave"][0, :, 5:].any()
+    assert list(columns["duration"]) == [5, 8, 6]
+    assert np.allclose(columns["angle"], 0.25)
+    assert np.all(np.isnan(columns["angle_error"]))
+
+    # Files padded to different lengths are padded again when joined
+    more = random_waves(np.random.default_rng(1), [11])
+    other = PGDF(write_clicks(tmp_path / "more.pgdf", more, "SoundTrap Click Detector"))
+    joined = ModuleColumns.concatenate([columns, other.module.to_columns()])
+    assert joined["wave"].shape == (4, 2, 11)
+    assert np.array_equal(joined["wave"][3], more[0])
+
+
+def test_click_version_3(tmp_path):
+    wave = np.arange(-4, 4, dtype=np.int8).reshape(2, 4)
+    data = struct.pack(">qiihi", 480, 0b11, 1, 3, 0)
+    data += struct.pack(">hf", 1, 0.001) + struct.pack(">hf", 1, 1.5)
+    data += struct.pack(">hf", 1, 0.1) + struct.pack(">if", 4, 1.0) + wave.tobytes()
+    objects = [{"millis": 1658448004000, "data": struct.pack(">i", len(data)) + data}]
+    pgdf_path = write_pgdf(
+        tmp_path / "v3.pgdf", "Click Detector", objects, module_version=3
+    )
+    click = PGDF(pgdf_path).module.objects[0].data
+
+    assert click.start_sample == 480
+    assert click.channel_map == 3
+    assert np.allclose(click.delays, [0.001])
+    assert np.allclose(click.angle_errors, [0.1])
+    assert np.array_equal(click.wave, wave)
+
+
+def test_export_clicks(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    waves = random_waves(np.random.default_rng(0), [5, 8])
+    pgdf_path = write_clicks(tmp_path / "clicks.pgdf", waves)
+
+    # Each batch is padded to its own longest click
+    paths = export_pgdf(pgdf_path, str(tmp_path), batch_size=1)
+    rows = pq.read_table(paths["objects"]).column("wave").to_pylist()
+    assert rows == [w.tolist() for w in waves]
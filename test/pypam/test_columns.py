@@ -0,0 +1,40 @@
+""" Tests for the columns of decoded objects."""
+
+import numpy as np
+import pytest
+
+from pypam.columns import ModuleColumns
+from pypam.pgdf import PGDF
+
+
+def test_module_columns(write_gemini_pgdf):
+    module = PGDF(write_gemini_pgdf(num_objects=4, num_points=3)).module
+    columns = module.to_columns()
+
+    assert module.to_columns() is columns
+    assert columns.module_type == "Gemini Threshold Detector"
+    assert np.array_equal(columns["millis"], module.millis())
+    assert list(columns["duration_millis"]) == [33.0] * 4
+    assert list(columns["min_freq"]) == [0.0] * 4
+
+    both = ModuleColumns.concatenate([columns, columns]).sorted("millis")
+    assert len(both) == 8
+    assert list(both["UID"][:2]) == [1861000000, 1861000000]
+    assert len(both.tables["points"]["UID"]) == 24
+
+
+def test_to_dataframe(write_gemini_pgdf):
+    pytest.importorskip("pandas")
+    module = PGDF(write_gemini_pgdf(num_objects=4, num_points=3)).module
+
+    frame = module.to_dataframe()
+    assert len(frame) == 4
+    assert list(frame["UID"]) == [obj.pam.UID for obj in module.objects]
+    assert frame["date"][0] == module.objects[0].pam.date
+
+    points = module.to_dataframe("points")
+    assert len(points) == 12
+    assert list(points["UID"][2:4]) == [1861000000, 1861000001]
+    track = module.objects[1].data.track
+    assert points["time"][3] == track.points[0].time
+    assert list(points["min_range"][3:6]) == [p.min_range for p in track.points]
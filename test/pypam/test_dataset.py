@@ -0,0 +1,92 @@
+""" Tests for reading many pgdf files at once."""
+
+import datetime
+import os
+
+import numpy as np
+
+from pypam.dataset import PGDFDataset, load_columns
+
+
+def write_hours(write_gemini_pgdf, hours=3):
+    """Write one file per hour, named so that glob order is not time
+    order."""
+    for hour in range(hours):
+        write_gemini_pgdf(
+            num_objects=4,
+            num_points=2 + hour,
+            name="z" * (hours - hour) + ".pgdf",
+            start_millis=1658448004000 + hour * 3600000,
+            first_uid=1861000000 + hour * 100,
+        )
+
+
+def test_load_columns(write_gemini_pgdf):
+    columns = load_columns(write_gemini_pgdf(num_objects=3, num_points=5))
+
+    assert columns.module_type == "Gemini Threshold Detector"
+    assert len(columns) == 3
+    assert list(columns["UID"]) == [1861000000, 1861000001, 1861000002]
+    assert list(columns["num_points"]) == [5, 5, 5]
+
+    points = columns.tables["points"]
+    assert len(points["UID"]) == 15
+    assert list(points["UID"][4:6]) == [1861000000, 1861000001]
+
+
+def test_dataset(write_gemini_pgdf, tmp_path):
+    write_hours(write_gemini_pgdf)
+
+    for max_workers in (1, 2):
+        dataset = PGDFDataset(str(tmp_path), max_workers=max_workers, chunksize=2)
+        assert len(dataset) == 3
+        assert [os.path.basename(p) for p in dataset.paths] == [
+            "zzz.pgdf",
+            "zz.pgdf",
+            "z.pgdf",
+        ]
+
+        columns = dataset.load()
+        assert len(columns) == 12
+        assert np.all(np.diff(columns["millis"]) > 0)
+        assert columns["UID"][4] == 1861000100
+        assert len(columns.tables["points"]["UID"]) == 4 * (2 + 3 + 4)
+
+
+def test_dataset_glob(write_gemini_pgdf, tmp_path):
+    write_hours(write_gemini_pgdf)
+    dataset = PGDFDataset(os.path.join(str(tmp_path), "zz*.pgdf"), max_workers=1)
+    assert len(dataset) == 2
+    assert PGDFDataset([], max_workers=1).load() is None
+
+
+def test_dataset_between(write_gemini_pgdf, tmp_path):
+    write_hours(write_gemini_pgdf)
+    dataset = PGDFDataset(str(tmp_path), max_workers=1)
+
+    # The second hour only, from header and footer dates alone.
+    start = datetime.datetime(2022, 7, 22, 1, 0, 0)
+    end = datetime.datetime(2022, 7, 22, 1, 0, 5)
+    assert [os.path.basename(p) for p in dataset.files_between(start, end)] == [
+        "zz.pgdf"
+    ]
+
+    columns = dataset.load(start, end)
+    assert list(columns["UID"]) == [1861000100, 1861000101]
+    assert list(columns.tables["points"]["UID"]) == [1861000100] * 3 + [1861000101] * 3
+
+    assert dataset.load(0, 1000) is None
+
+
+def test_dataset_uids(write_gemini_pgdf, tmp_path):
+    write_hours(write_gemini_pgdf)
+    dataset = PGDFDataset(str(tmp_path), max_workers=1)
+
+    uids = [1861000203, 1861000001, 1861000150, 42]
+    assert [os.path.basename(p) for p in dataset.files_with_uids(uids)] == [
+        "zzz.pgdf",
+        "z.pgdf",
+    ]
+    objects = dataset.objects_by_uid(uids)
+    assert [obj.pam.UID for obj in objects] == [1861000001, 1861000203]
+    assert dataset.files_with_uids([]) == []
@@ -0,0 +1,95 @@
+""" Tests for the module type decoder registry."""
+
+import struct
+
+import numpy as np
+import pytest
+
+from pypam import decoders
+from pypam.dataset import load_columns
+from pypam.decoders import Decoder, get_decoder, register_decoder
+from pypam.pgdf import PGDF
+from pypam.synthetic import (
+    pack_file_footer,
+    pack_file_header,
+    pack_module_footer,
+    pack_module_header,
+    pack_pam_data,
+)
+
+
+class Count:
+    def __init__(self, dat, offset, pam_data, module_header):
+        self.count = struct.unpack_from(">i", dat, offset)[0]
+
+    def __len__(self):
+        return 4
+
+
+COUNT_DECODER = Decoder(Count)
+
+
+def write_counts(pgdf_path, module_type, module_name, counts):
+    records = [
+        pack_file_header(module_type, module_name, "Counts", 1658448004000),
+        pack_module_header(),
+    ]
+    records += [pack_pam_data(1658448004000, struct.pack(">i", c)) for c in counts]
+    records.append(pack_module_footer())
+    records.append(pack_file_footer(len(counts), 1658448005000, 0, 0, 0))
+
+    with open(pgdf_path, "wb") as f:
+        f.write(b"".join(records))
+
+    return pgdf_path
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Keep any registrations made by a test to that test."""
+    monkeypatch.setattr(decoders, "DECODERS", dict(decoders.DECODERS))
+
+
+def test_gemini_registered(registry):
+    decoder = get_decoder("Gemini Threshold Detector")
+    assert isinstance(decoder, Decoder)
+    # Resolved once, then kept
+    assert decoders.DECODERS["Gemini Threshold Detector"] is decoder
+    assert get_decoder("No Such Detector") is None
+
+
+def test_register_decoder(registry, tmp_path):
+    pgdf_path = write_counts(tmp_path / "counts.pgdf", "Counter", "Left", [3, 1, 4])
+
+    with pytest.raises(NotImplementedError):
+        PGDF(pgdf_path)
+
+    register_decoder("Counter", Decoder(Count))
+    pgdf = PGDF(pgdf_path)
+    assert [o.data.count for o in pgdf.module.objects] == [3, 1, 4]
+    assert list(pgdf.module.to_columns()["millis"]) == [1658448004000] * 3
+
+    # A decoder for one module name comes before the one for the type
+    register_decoder("Counter", Decoder(len), module_name="Left")
+    assert get_decoder("Counter", "Left").data is len
+    assert get_decoder("Counter", "Right").data is Count
+
+    # A string is only imported when the decoder is first needed
+    register_decoder("Lazy Counter", "test_decoders:COUNT_DECODER")
+    assert isinstance(decoders.DECODERS["Lazy Counter"], str)
+    assert get_decoder("Lazy Counter") is COUNT_DECODER
+
+
+def count_columns(objects):
+    return {"count": np.array([o.data.count for o in objects])}, {}
+
+
+def test_columns_by_module_name(registry, tmp_path):
+    pgdf_path = write_counts(tmp_path / "counts.pgdf", "Counter", "Left", [3, 1, 4])
+    register_decoder("Counter", Decoder(Count))
+    register_decoder("Counter", Decoder(Count, count_columns), module_name="Left")
+
+    # The columns come from the decoder the file was read with
+    columns = PGDF(pgdf_path).module.to_columns()
+    assert list(columns["count"]) == [3, 1, 4]
+    assert list(load_columns(pgdf_path)["count"]) == [3, 1, 4]
@@ -0,0 +1,107 @@
+"""Tests for the deep learning classifier decoder."""
+
+import numpy as np
+
+from pypam.dataset import PGDFDataset
+from pypam.deeplearning import DLDetectionData, DLModelData, dl_predictions
+from pypam.pgdf import PGDF
+from pypam.synthetic import (
+    pack_annotations,
+    pack_dl_annotation,
+    pack_dl_detection,
+    pack_dl_model_data,
+    pack_dl_result,
+    write_pgdf,
+)
+
+MODULE_TYPE = "Deep Learning Classifier"
+# Millis, UID and annotations
+DL_FLAGS = 0x9 | 0x200
+
+
+def write_detections(pgdf_path, scores):
+    objects = []
+
+    for i, (first, second) in enumerate(scores):
+        results = [pack_dl_result(first, [3, 4, 5])]
+
+        if second is not None:
+            results.append(pack_dl_result(second, [7, 8], is_binary=True))
+
+        wave = np.full((2, 4 + i), i, dtype=np.int16)
+        annotations = pack_annotations([("Delt", 1, pack_dl_annotation(results))])
+        objects.append(
+            {
+                "millis": 1658448004000 + i,
+                "data": pack_dl_detection(wave, max_value=4.0),
+                "flag_bitmap": DL_FLAGS,
+                "uid": 1861000000 + i,
+                "annotations": annotations,
+            }
+        )
+
+    return write_pgdf(pgdf_path, MODULE_TYPE, objects, stream_name="DL_detection")
+
+
+def test_detections(tmp_path):
+    scores = [([0.1, 0.8, 0.1], [0.25, 0.75]), ([0.6, 0.3, 0.1], None)]
+    module = PGDF(write_detections(tmp_path / "dl.pgdf", scores)).module
+
+    detection = module.objects[1].data
+    assert isinstance(detection, DLDetectionData)
+    assert detection.wave.shape == (2, 5)
+    assert np.allclose(detection.waveform, 0.25)
+
+    anno = module.objects[0].pam.annotations.dl_classification
+    assert anno.num_models == 2
+    assert np.allclose(anno.models[1].predictions, [0.25, 0.75], atol=1e-4)
+    # The class ids of a model are read once and shared
+    models = [o.pam.annotations.dl_classification.models[0] for o in module.objects]
+    assert models[0].class_ids is models[1].class_ids
+
+    names = ["noise", "", "", "dolphin", "porpoise", "seal", "", "no", "yes"]
+    first, second = dl_predictions(module.objects, names)
+    assert first.scores.dtype == np.float32
+    assert np.allclose(first.scores, [s for s, _ in scores], atol=1e-4)
+    assert list(first.uids) == [1861000000, 1861000001]
+    assert first.class_names == ["dolphin", "porpoise", "seal"]
+    assert list(second.uids) == [1861000000]
+    assert second.class_names == ["no", "yes"]
+    assert second.is_binary.all()
+
+    columns = module.to_columns()
+    assert columns["wave"].shape == (2, 2, 5)
+    assert list(columns["num_samples"]) == [4, 5]
+
+
+def test_model_data(tmp_path):
+    objects = [
+        {
+            "millis": 1658448004000 + i,
+            "data": pack_dl_model_data(pack_dl_result(p, [0, 1])),
+            "uid": 1861000000 + i,
+        }
+        for i, p in enumerate([[0.2, 0.8], [0.9, 0.1], [0.5, 0.5]])
+    ]
+    pgdf_path = write_pgdf(
+        tmp_path / "dl.pgdf", MODULE_TYPE, objects, stream_name="DL_Model_Data"
+    )
+    module = PGDF(pgdf_path).module
+    assert isinstance(module.objects[0].data, DLModelData)
+
+    predictions = dl_predictions(module.objects)[0]
+    assert predictions.scores.shape == (3, 2)
+    assert np.allclose(predictions.scores[:, 1], [0.8, 0.1, 0.5], atol=1e-4)
+    assert np.allclose(module.to_columns()["predictions"], predictions.scores)
+
+
+def test_empty_detections(tmp_path):
+    # An empty detections file has the same columns as any other, so
+    # the two can be loaded together
+    paths = [
+        write_detections(tmp_path / "empty.pgdf", []),
+        write_detections(tmp_path / "dl.pgdf", [([0.1, 0.8, 0.1], None)]),
+    ]
+    columns = PGDFDataset(paths, max_workers=1).load()
+    assert columns["wave"].shape == (1, 2, 4)
+    assert "model_type" not in columns.columns
@@ -0,0 +1,55 @@
+""" Tests for exporting pgdf files to Parquet and Arrow."""
+
+import os
+
+import numpy as np
+import pytest
+
+from pypam.export import columns_to_table, export_pgdf
+from pypam.pgdf import PGDF
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def test_columns_to_table():
+    table = columns_to_table(
+        {"UID": np.arange(3, dtype=np.int64), "wave": np.ones((3, 2, 4), np.int8)}
+    )
+    assert table.num_rows == 3
+    assert table.column("wave").to_pylist()[0] == [[1, 1, 1, 1], [1, 1, 1, 1]]
+
+
+def test_export_parquet(write_gemini_pgdf, tmp_path):
+    pgdf_path = write_gemini_pgdf(num_objects=7, num_points=3)
+    paths = export_pgdf(pgdf_path, str(tmp_path / "out"), batch_size=3)
+    assert paths["objects"] == str(tmp_path / "out" / "gemini.parquet")
+    assert paths["points"] == str(tmp_path / "out" / "gemini.points.parquet")
+
+    pgdf = PGDF(pgdf_path)
+    tracks = pq.ParquetFile(paths["objects"])
+    assert tracks.metadata.num_row_groups == 3
+    tracks = tracks.read()
+    assert tracks.column("UID").to_pylist() == [o.pam.UID for o in pgdf.module.objects]
+    assert tracks.column("num_points").to_pylist() == [3] * 7
+
+    points = pq.read_table(paths["points"])
+    assert points.num_rows == 21
+    assert points.column("UID").to_pylist()[:4] == [1861000000] * 3 + [1861000001]
+    track = pgdf.module.objects[0].data.points
+    assert points.column("min_range").to_pylist()[:3] == track["min_range"].tolist()
+
+
+def test_export_arrow(write_gemini_pgdf, tmp_path):
+    pgdf_path = write_gemini_pgdf(num_objects=0)
+    paths = export_pgdf(pgdf_path, str(tmp_path), export_format="arrow")
+
+    with pa.OSFile(paths["objects"]) as f:
+        table = pa.ipc.open_file(f).read_all()
+
+    assert table.num_rows == 0
+    assert "UID" in table.column_names
+    assert os.path.exists(paths["points"])
+
+    with pytest.raises(ValueError):
+        export_pgdf(pgdf_path, str(tmp_path), export_format="csv")
@@ -0,0 +1,81 @@
+""" Tests for following pgdf files as they are written."""
+
+import os
+
+from pypam.follow import PGDFFollower, follow
+from pypam.module import PGObject
+from pypam.pgdf import PGDF
+
+
+def grow(path: str, dat: bytes, upto: int):
+    """Write the first upto bytes of dat to path, as if PAMGuard were
+    part way through writing it."""
+    with open(path, "wb") as f:
+        f.write(dat[:upto])
+
+
+def test_follower(write_gemini_pgdf, tmp_path):
+    pgdf_path = write_gemini_pgdf(name="full.pgdf", num_objects=6)
+    objects = PGDF(pgdf_path).module.objects
+
+    with open(pgdf_path, "rb") as f:
+        dat = f.read()
+
+    live_path = str(tmp_path / "live.pgdf")
+    follower = PGDFFollower(live_path)
+    assert follower.poll() == []
+
+    # Half way through the header, then half way through the third object.
+    grow(live_path, dat, 20)
+    assert follower.poll() == []
+    assert follower.header is None
+
+    third = len(dat) - len(PGDF(pgdf_path).footer) - 12 - 4 * len(objects[0])
+    grow(live_path, dat, third + 10)
+    records = [r for r in follower.poll() if isinstance(r, PGObject)]
+    assert [r.pam.UID for r in records] == [o.pam.UID for o in objects[:2]]
+    assert follower.module_header is not None
+    assert follower.offset == third
+    assert not follower.finished
+
+    grow(live_path, dat, len(dat))
+    records = [r for r in follower.poll() if isinstance(r, PGObject)]
+    assert [r.pam.UID for r in records] == [o.pam.UID for o in objects[2:]]
+    assert follower.finished
+    assert follower.poll() == []
+
+
+def test_follow_rolls_over(write_gemini_pgdf, tmp_path):
+    live = tmp_path / "live"
+    os.mkdir(live)
+    files = []
+
+    for hour in range(2):
+        pgdf_path = write_gemini_pgdf(
+            name="Gemini_20220722_0" + str(hour) + "0000.pgdf",
+            num_objects=3,
+            first_uid=1861000000 + hour * 100,
+        )
+
+        with open(pgdf_path, "rb") as f:
+            files.append((str(live / os.path.basename(pgdf_path)), f.read()))
+
+    # The first file is still being written, without its footer.
+    grow(files[0][0], files[0][1], len(files[0][1]) - 10)
+    polls = []
+
+    def stop():
+        polls.append(1)
+
+        if len(polls) == 1:
+            # PAMGuard closes the first file and starts the second.
+            grow(files[0][0], files[0][1], len(files[0][1]))
+            grow(files[1][0], files[1][1], len(files[1][1]) - 100)
+
+        return len(polls) > 3
+
+    uids = [
+        obj.pam.UID
+        for obj in follow(str(live), interval=0, use_inotify=False, stop=stop)
+    ]
+    assert uids == [1861000000, 1861000001, 1861000002, 1861000100, 1861000101]
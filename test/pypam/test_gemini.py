@@ -0,0 +1,85 @@
+""" Tests for the Gemini track decoding."""
+
+import struct
+
+import numpy as np
+
+from pypam.gemini import TRACK_POINT_DTYPE, GeminiData, Track
+
+
+def pack_gemini(times):
+    """Pack a Gemini record with one point per entry in times."""
+    points = np.zeros(len(times), dtype=TRACK_POINT_DTYPE)
+    points["time_millis"] = times
+    points["sonar_id"] = 7
+    points["min_bearing"] = np.arange(len(times))
+    points["max_bearing"] = np.arange(len(times)) + 1
+    points["obj_size"] = 0.5
+    points["occupancy"] = 0.75
+    points["average_value"] = 10
+    points["total_value"] = np.arange(len(times)) + 200
+    points["max_value"] = 30
+    body = struct.pack(">ibhfff", len(times), 1, 7, 1.5, 2.5, 0.25)
+    body += points.tobytes()
+    return struct.pack(">i", len(body)) + body
+
+
+def test_gemini_points():
+    dat = pack_gemini([1000, 3000, 2000])
+    data = GeminiData(dat, 0)
+
+    assert len(data) == len(dat)
+    assert data.num_points == 3
+    assert data.sonar_ids == [7]
+    assert len(data.track) == 3
+
+    points = data.points
+    assert list(points["time_millis"]) == [1000, 2000, 3000]
+    assert list(points["total_value"]) == [200, 202, 201]
+    assert points["min_bearing"][1] == 2.0
+
+    track_points = data.track.points
+    assert len(track_points) == 3
+    assert track_points[2].max_bearing == 2.0
+    assert track_points[0].time < track_points[1].time < track_points[2].time
+
+
+def test_gemini_empty():
+    data = GeminiData(pack_gemini([]), 0)
+    assert len(data.track) == 0
+    assert data.track.points == []
+
+
+def test_track_times():
+    data = GeminiData(pack_gemini([5000, 1000, 3000]), 0)
+    assert data.track.time_start < data.track.time_end
+    assert (data.track.time_end - data.track.time_start).total_seconds() == 4
+
+
+def test_track_sorted_once(monkeypatch):
+    """Tracks are sorted once per record, and not at all if the points
+    are already in time order."""
+    calls = []
+    argsort = np.argsort
+
+    def counting_argsort(*args, **kwargs):
+        calls.append(1)
+        return argsort(*args, **kwargs)
+
+    monkeypatch.setattr(np, "argsort", counting_argsort)
+
+    data = GeminiData(pack_gemini(list(range(0, 50000, 100))), 0)
+    assert len(calls) == 0
+    assert len(data.track) == 500
+
+    data = GeminiData(pack_gemini(list(range(50000, 0, -100))), 0)
+    assert len(calls) == 1
+    assert list(data.points["time_millis"][:2]) == [100, 200]
+
+
+def test_track_add_point():
+    dat = pack_gemini([3000, 1000])
+    track = Track()
+    assert track.add_point_from_dat(dat, 23) == 50
+    assert track.add_point_from_dat(dat, 73) == 50
+    assert list(track.columns["time_millis"]) == [1000, 3000]
@@ -0,0 +1,56 @@
+""" Tests for the sidecar offset index."""
+
+import os
+
+import numpy as np
+
+from pypam.index import PGDFIndex, index_path, open_index
+from pypam.pgdf import PGDF
+
+
+def test_build_index(write_gemini_pgdf):
+    pgdf_path = write_gemini_pgdf(num_objects=6)
+    pgdf = PGDF(pgdf_path)
+    index = PGDFIndex.build(pgdf_path)
+
+    assert len(index) == 6
+    assert list(index.uids) == [obj.pam.UID for obj in pgdf.module.objects]
+    assert list(index.millis) == [obj.pam.millis for obj in pgdf.module.objects]
+    assert list(index.records["length"]) == [len(o) for o in pgdf.module.objects]
+    assert index.footer_objects == 6
+
+
+def test_open_index(write_gemini_pgdf):
+    pgdf_path = write_gemini_pgdf(num_objects=4)
+    assert not os.path.exists(index_path(pgdf_path))
+
+    index = open_index(pgdf_path)
+    assert os.path.exists(index_path(pgdf_path))
+
+    loaded = PGDFIndex.load(index_path(pgdf_path))
+    assert loaded.is_valid(pgdf_path)
+    assert np.array_equal(loaded.records, index.records)
+
+    # Rewriting the file makes the index stale, so it gets rebuilt.
+    write_gemini_pgdf(num_objects=7)
+    assert not loaded.is_valid(pgdf_path)
+    assert open_index(pgdf_path, rebuild=False) is None
+    assert len(open_index(pgdf_path)) == 7
+
+
+def test_index_lookups(write_gemini_pgdf):
+    pgdf_path = write_gemini_pgdf(num_objects=10)
+    index = open_index(pgdf_path)
+
+    assert list(index.find_uids([1861000007, 1861000002, 42])) == [2, 7]
+    assert list(index.find_times(1658448006000, 1658448008000)) == [2, 3, 4]
+
+    objects = PGDF.objects_by_uid(pgdf_path, [1861000003, 1861000005])
+    assert [obj.pam.UID for obj in objects] == [1861000003, 1861000005]
+
+    objects = PGDF.objects_at(pgdf_path, [9, 0])
+    assert [obj.pam.UID for obj in objects] == [1861000009, 1861000000]
+    assert len(objects[0].data.track) == 4
+
+    objects = PGDF.objects_between(pgdf_path, 1658448004000, 1658448005000)
+    assert [obj.pam.UID for obj in objects] == [1861000000, 1861000001]
@@ -0,0 +1,62 @@
+"""Tests for the LTSA decoder."""
+
+import numpy as np
+
+from pypam.ltsa import ltsa_memmap
+from pypam.pgdf import PGDF
+from pypam.synthetic import pack_ltsa, pack_ltsa_header, write_pgdf
+
+
+def write_ltsa(pgdf_path, levels, start_millis=1658448004000):
+    objects = [
+        {
+            "millis": start_millis + i * 60000,
+            "data": pack_ltsa(start_millis + (i + 1) * 60000, row, max_value=2.54),
+        }
+        for i, row in enumerate(levels)
+    ]
+    return write_pgdf(
+        pgdf_path,
+        "LTSA",
+        objects,
+        module_version=2,
+        module_binary=pack_ltsa_header(fft_length=16),
+    )
+
+
+def random_levels(seed, num_rows):
+    return np.random.default_rng(seed).integers(-127, 128, (num_rows, 8))
+
+
+def test_ltsa(tmp_path):
+    levels = random_levels(0, 3)
+    pgdf = PGDF(write_ltsa(tmp_path / "ltsa.pgdf", levels))
+    assert pgdf.module.header.data.fft_length == 16
+
+    spectrum = pgdf.module.objects[1].data
+    assert np.array_equal(spectrum.levels, levels[1])
+    assert np.allclose(spectrum.spectrum, levels[1] * 0.02)
+    assert spectrum.end_millis == 1658448124000
+
+    columns = pgdf.module.to_columns()
+    assert columns["levels"].shape == (3, 8)
+    assert np.allclose(columns["level_scale"], 0.02)
+
+
+def test_ltsa_memmap(tmp_path):
+    first = random_levels(0, 3)
+    second = random_levels(1, 2)
+    paths = [
+        write_ltsa(tmp_path / "a.pgdf", first),
+        write_ltsa(tmp_path / "b.pgdf", second, start_millis=1658448184000),
+    ]
+    out_path = str(tmp_path / "ltsa.npy")
+    spectra, millis = ltsa_memmap(paths, out_path)
+
+    assert isinstance(spectra, np.memmap)
+    assert list(millis) == [1658448004000 + i * 60000 for i in range(5)]
+    expected = np.concatenate([first, second]) * 0.02
+    assert np.allclose(spectra, expected)
+
+    del spectra
+    assert np.allclose(np.load(out_path, mmap_mode="r"), expected)
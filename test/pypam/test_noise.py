@@ -0,0 +1,67 @@
+"""Tests for the noise monitor decoders."""
+
+import struct
+
+import numpy as np
+
+from pypam.columns import ModuleColumns
+from pypam.pgdf import PGDF
+from pypam.synthetic import pack_noise, pack_noise_header, write_pgdf
+
+LOW_EDGES = [10.0, 100.0, 1000.0]
+HIGH_EDGES = [100.0, 1000.0, 10000.0]
+
+
+def write_noise(pgdf_path, levels, module_type="Noise Monitor"):
+    objects = [
+        {"millis": 1658448004000 + i * 60000, "data": pack_noise(noise)}
+        for i, noise in enumerate(levels)
+    ]
+    return write_pgdf(
+        pgdf_path,
+        module_type,
+        objects,
+        module_version=2,
+        module_binary=pack_noise_header(LOW_EDGES, HIGH_EDGES, stats_types=0x3),
+    )
+
+
+def test_noise_monitor(tmp_path):
+    levels = np.random.default_rng(0).uniform(60, 120, (4, 3, 2)).round(2)
+    pgdf = PGDF(write_noise(tmp_path / "noise.pgdf", levels))
+
+    # The bands are read once, from the module header
+    bands = pgdf.module.header.data
+    assert bands.num_bands == 3
+    assert bands.num_measures == 2
+    assert np.allclose(bands.low_edges, LOW_EDGES)
+    assert np.allclose(bands.high_edges, HIGH_EDGES)
+    assert pgdf.module.objects[0].data.bands is bands
+
+    noise = pgdf.module.objects[1].data.noise
+    assert noise.dtype == np.float32
+    assert np.allclose(noise, levels[1], atol=0.005)
+
+    columns = pgdf.module.to_columns()
+    assert columns["noise"].shape == (4, 3, 2)
+    assert np.allclose(columns["noise"], levels, atol=0.005)
+
+    # Files with fewer bands are padded with NaN when joined
+    other = PGDF(write_noise(tmp_path / "other.pgdf", levels[:, :2], "Noise Band"))
+    joined = ModuleColumns.concatenate([columns, other.module.to_columns()])
+    assert joined["noise"].shape == (8, 3, 2)
+    assert np.all(np.isnan(joined["noise"][4:, 2]))
+
+
+def test_noise_band(tmp_path):
+    data = struct.pack(">hhhhh", 9050, 10025, 11000, 12000, 60)
+    objects = [{"millis": 1658448004000, "data": struct.pack(">i", 10) + data}]
+    pgdf_path = write_pgdf(
+        tmp_path / "band.pgdf", "NoiseBand", objects, module_version=2
+    )
+    module = PGDF(pgdf_path).module
+    measure = module.objects[0].data
+
+    assert (measure.rms, measure.zero_peak, measure.peak_peak) == (90.5, 100.25, 110.0)
+    assert (measure.sel, measure.sel_secs) == (120.0, 60)
+    assert module.to_columns()["rms"][0] == np.float32(90.5)
@@ -0,0 +1,85 @@
+""" Tests for the PAMData decoding."""
+
+import struct
+
+import pytest
+
+from pypam.pamdata import PAMData, get_layout
+
+
+def pack_pam(flags, version=3, num_delays=2):
+    """Pack the standard part of a data object, setting every field
+    that the flags say is present."""
+    body = struct.pack(">q", 1658448004000)
+
+    if version >= 3:
+        body += struct.pack(">H", flags)
+    if version == 2 or flags & 0x2:
+        body += struct.pack(">q", 1658448004000000001)
+    if version == 2 or flags & 0x4:
+        body += struct.pack(">i", 3)
+    if flags & 0x8:
+        body += struct.pack(">q", 1861000042)
+    if flags & 0x10:
+        body += struct.pack(">q", 2**40)
+    if flags & 0x20:
+        body += struct.pack(">i", 480)
+    if flags & 0x40:
+        body += struct.pack(">ff", 10.0, 20.0)
+    if flags & 0x80:
+        body += struct.pack(">f", 33.0)
+    if flags & 0x100:
+        body += struct.pack(">h", num_delays)
+        body += struct.pack(">" + str(num_delays) + "f", *range(num_delays))
+    if flags & 0x400:
+        body += struct.pack(">i", 7)
+    if flags & 0x800:
+        body += struct.pack(">f", 1.5)
+    if flags & 0x1000:
+        body += struct.pack(">f", 2.5)
+    if flags & 0x2000:
+        body += struct.pack(">f", 3.5)
+
+    return struct.pack(">ii", 8 + len(body), 1) + body
+
+
+def test_all_fields():
+    dat = b"\xff" * 3 + pack_pam(0x3DFF)
+    pam = PAMData(dat, 3, 3)
+
+    assert len(pam) == len(dat) - 3
+    assert pam.flag_bitmap == 0x3DFF
+    assert pam.time_nanos == 1658448004000000001
+    assert pam.channel_map == 3
+    assert pam.UID == 1861000042
+    assert pam.start_sample == 2**40
+    assert pam.sample_duration == 480
+    assert pam.freq_limits == [10.0, 20.0]
+    assert pam.duration_millis == 33.0
+    assert pam.num_time_delays == 2
+    assert pam.time_delays == [0.0, 1.0]
+    assert pam.sequence_map == 7
+    assert (pam.noise, pam.signal, pam.signal_excess) == (1.5, 2.5, 3.5)
+
+
+@pytest.mark.parametrize("flags", [0x0, 0x8D, 0x100, 0x108, 0x2100, 0x3C00])
+def test_flag_combinations(flags):
+    pam = PAMData(pack_pam(flags, num_delays=3), 0, 3)
+    assert len(pam) == pam.binary_length
+    assert pam.UID == (1861000042 if flags & 0x8 else 0)
+    assert pam.time_delays == ([0.0, 1.0, 2.0] if flags & 0x100 else [])
+    assert pam.signal_excess == (3.5 if flags & 0x2000 else 0)
+
+
+def test_version_two():
+    pam = PAMData(pack_pam(0, version=2), 0, 2)
+    assert pam.flag_bitmap == 0
+    assert pam.time_nanos == 1658448004000000001
+    assert pam.channel_map == 3
+    assert len(pam) == pam.binary_length
+
+
+def test_layout_cached():
+    assert get_layout(0x8D, 3) is get_layout(0x8D, 3)
+    assert get_layout(0x8D, 3) is not get_layout(0x8D, 2)
+    assert get_layout(0x8D, 3).head.format == ">iqf"
@@ -1,13 +1,25 @@
 """ Tests for the PGDF data."""
 
-from pypam.pgdf import PGDF 
+import mmap
 import os
+import struct
+
+import numpy as np
+import pytest
+
+import pypam.pgdf
+from pypam.file import FileFooter, FileHeader
+from pypam.index import open_index
+from pypam.module import ModuleFooter, ModuleHeader, PGObject
+from pypam.pgdf import PGDF
 
 
 def test_glf():
     pgdf_path = "./pypam_testdata/Gemini_Threshold_Detector_Gemini_Threshold_Detector_Sonar_Tracks_20220722_000004.pgdf"
-    assert os.path.exists(pgdf_path)
-  
+
+    if not os.path.exists(pgdf_path):
+        pytest.skip("the pypam_testdata submodule is not checked out")
+
     pgdf = PGDF(pgdf_path)
     print("PGDF Summary")
     print(pgdf)
@@ -15,4 +27,165 @@ def test_glf():
     print(pgdf.module.objects[0].data)
     print("First Track Points")
     print(pgdf.module.objects[0].data.track)
-    print("Identifier", pgdf.header.identifier)
\ No newline at end of file
+    print("Identifier", pgdf.header.identifier)
+
+
+def pgdf_summary(pgdf):
+    """Everything we decode from a Gemini file, as plain values."""
+    objects = [
+        (str(obj.pam), str(obj.data), obj.data.points.tolist())
+        for obj in pgdf.module.objects
+    ]
+    return (str(pgdf.header), str(pgdf.footer), len(pgdf), objects)
+
+
+def test_memory_map_round_trip(write_gemini_pgdf):
+    pgdf_path = write_gemini_pgdf(num_objects=6, num_points=3)
+    mapped = PGDF(pgdf_path, memory_map=True)
+    read = PGDF(pgdf_path, memory_map=False)
+
+    assert pgdf_summary(mapped) == pgdf_summary(read)
+    assert len(mapped.module) == 6
+    assert mapped.module.objects[5].pam.UID == 1861000005
+
+    for pgdf in (mapped, read):
+        assert pgdf.header.stream_name == "Sonar Tracks"
+        assert pgdf.header.module_type == "Gemini Threshold Detector"
+        assert pgdf.footer.end_reason == 1
+        assert pgdf.footer.lowest_UID == 1861000000
+
+
+def test_file_header_length(write_gemini_pgdf):
+    for stream_name in ("", "Sonar Tracks"):
+        pgdf_path = write_gemini_pgdf(stream_name=stream_name)
+
+        with open(pgdf_path, "rb") as f:
+            dat = f.read()
+
+        header_length = struct.unpack_from(">i", dat, 0)[0]
+        header = FileHeader(b"\x00" * 10 + dat, 10)
+        assert len(header) == header_length
+        assert header.stream_name == stream_name
+
+
+def test_file_footer_end_reason(write_gemini_pgdf):
+    for memory_map in (True, False):
+        pgdf_path = write_gemini_pgdf(end_reason=7)
+        pgdf = PGDF(pgdf_path, memory_map=memory_map)
+        assert pgdf.footer.end_reason == 7
+        assert pgdf.footer.file_length == os.path.getsize(pgdf_path)
+
+        # Older footers stop after the file length.
+        pgdf = PGDF(write_gemini_pgdf(end_reason=None), memory_map=memory_map)
+        assert pgdf.footer.end_reason == 0
+        assert len(pgdf.module) == 5
+
+
+def test_iter_objects(write_gemini_pgdf):
+    pgdf_path = write_gemini_pgdf(num_objects=4, num_points=3)
+    records = list(PGDF.iter_objects(pgdf_path))
+
+    assert [type(r) for r in records] == [
+        FileHeader,
+        ModuleHeader,
+        PGObject,
+        PGObject,
+        PGObject,
+        PGObject,
+        ModuleFooter,
+        FileFooter,
+    ]
+
+    pgdf = PGDF(pgdf_path)
+    assert [str(o.pam) for o in pgdf.module.objects] == [
+        str(r.pam) for r in records[2:6]
+    ]
+    assert [o.data.points.tolist() for o in pgdf.module.objects] == [
+        r.data.points.tolist() for r in records[2:6]
+    ]
+
+
+def test_iter_objects_close(write_gemini_pgdf, monkeypatch):
+    pgdf_path = write_gemini_pgdf()
+    maps = []
+    mmap_class = mmap.mmap
+
+    def recording_mmap(*args, **kwargs):
+        maps.append(mmap_class(*args, **kwargs))
+        return maps[-1]
+
+    monkeypatch.setattr(mmap, "mmap", recording_mmap)
+    records = PGDF.iter_objects(pgdf_path)
+    assert isinstance(next(records), FileHeader)
+    assert len(maps) == 1 and not maps[0].closed
+
+    records.close()
+    assert maps[0].closed
+
+
+def test_module_times(write_gemini_pgdf):
+    pgdf = PGDF(write_gemini_pgdf(num_objects=3))
+    times = pgdf.module.times()
+
+    assert times.dtype == np.dtype("datetime64[ms]")
+    assert list(pgdf.module.millis()) == [obj.pam.millis for obj in pgdf.module.objects]
+    assert times[1] - times[0] == np.timedelta64(1000, "ms")
+    assert pgdf.module.objects[0].pam.date == pgdf.header.data_date
+
+
+def test_read_footer(write_gemini_pgdf):
+    pgdf_path = write_gemini_pgdf(num_objects=3)
+    footer = PGDF.read_footer(pgdf_path)
+    assert str(footer) == str(PGDF(pgdf_path).footer)
+
+    pgdf_path = write_gemini_pgdf(num_objects=3, version=2, end_reason=None)
+    footer = PGDF.read_footer(pgdf_path)
+    assert footer.num_objects == 3
+    assert footer.lowest_UID == -1
+
+    # A file still being written has no footer yet.
+    with open(pgdf_path, "r+b") as f:
+        f.truncate(os.path.getsize(pgdf_path) - 10)
+
+    assert PGDF.read_footer(pgdf_path) is None
+
+
+def test_iter_between(write_gemini_pgdf, monkeypatch):
+    pgdf_path = write_gemini_pgdf(num_objects=10)
+    decoded = []
+    read_data = pypam.pgdf._read_data
+
+    def counting_read_data(dat, offset, *headers):
+        decoded.append(offset)
+        return read_data(dat, offset, *headers)
+
+    monkeypatch.setattr(pypam.pgdf, "_read_data", counting_read_data)
+
+    objects = list(PGDF.iter_between(pgdf_path, 1658448006000, 1658448008000))
+    assert [obj.pam.UID for obj in objects] == [1861000002, 1861000003, 1861000004]
+    assert len(decoded) == 3
+
+    # With an index the same objects are found without walking the file.
+    open_index(pgdf_path)
+    objects = list(PGDF.iter_between(pgdf_path, 1658448006000, 1658448008000))
+    assert [obj.pam.UID for obj in objects] == [1861000002, 1861000003, 1861000004]
+    assert list(PGDF.iter_between(pgdf_path, 0, 1000)) == []
+
+
+def test_module_find_uid(write_gemini_pgdf):
+    module = PGDF(write_gemini_pgdf(num_objects=5)).module
+
+    assert module.find_uid(1861000003) is module.objects[3]
+    assert module.find_uid(42) is None
+    found = module.find_uids([1861000004, 7, 1861000001])
+    assert found == [module.objects[4], module.objects[1]]
+
+    # Objects added after the first lookup are found too.
+    more = write_gemini_pgdf(name="more.pgdf", first_uid=1861000100)
+    module.add_object(PGDF(more).module.objects[0])
+    assert module.find_uid(1861000100) is module.objects[-1]
+
+
+def test_unsupported_record():
+    with pytest.raises(ValueError, match="offset 8"):
+        pypam.pgdf.read_record(struct.pack(">iiii", 8, 0, 8, -5), 8, None)
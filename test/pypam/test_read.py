@@ -0,0 +1,24 @@
+""" Tests for the read utilities."""
+
+import struct
+
+from pypam.util.read import open_buffer, read_java_string
+
+
+def test_open_buffer(tmp_path):
+    path = tmp_path / "buffer.bin"
+    path.write_bytes(struct.pack(">h", 5) + b"hello" + struct.pack(">i", 42))
+
+    for memory_map in (True, False):
+        with open_buffer(str(path), memory_map) as dat:
+            assert len(dat) == 11
+            assert read_java_string(dat, 0) == ("hello", 7)
+            assert struct.unpack_from(">i", dat, 7)[0] == 42
+
+
+def test_open_buffer_empty(tmp_path):
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+
+    with open_buffer(str(path)) as dat:
+        assert len(dat) == 0
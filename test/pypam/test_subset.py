@@ -0,0 +1,87 @@
+""" Tests for cutting and joining pgdf files as raw bytes."""
+
+import os
+
+import numpy as np
+import pytest
+
+from pypam.pgdf import PGDF
+from pypam.subset import merge_pgdf, subset_pgdf
+
+
+def same_objects(a, b):
+    """Check two lists of PGObjects decode to the same values."""
+    assert [str(o.pam) for o in a] == [str(o.pam) for o in b]
+
+    for x, y in zip(a, b):
+        assert np.array_equal(x.data.points, y.data.points)
+
+
+def test_subset_window(write_gemini_pgdf, tmp_path):
+    pgdf_path = write_gemini_pgdf(num_objects=10, num_points=3)
+    out_path = str(tmp_path / "window.pgdf")
+
+    assert subset_pgdf(pgdf_path, out_path, 1658448006000, 1658448008000) == 3
+
+    before = PGDF(pgdf_path)
+    after = PGDF(out_path)
+    same_objects(after.module.objects, before.module.objects[2:5])
+    assert after.header.data_millis == 1658448006000
+    assert after.header.stream_name == before.header.stream_name
+    assert after.footer.num_objects == 3
+    assert after.footer.data_millis == 1658448008000
+    assert (after.footer.lowest_UID, after.footer.highest_UID) == (
+        1861000002,
+        1861000004,
+    )
+    assert after.footer.file_length == os.path.getsize(out_path)
+    assert after.footer.end_reason == before.footer.end_reason
+
+
+def test_subset_uids(write_gemini_pgdf, tmp_path):
+    pgdf_path = write_gemini_pgdf(num_objects=10)
+    out_path = str(tmp_path / "uids.pgdf")
+
+    assert subset_pgdf(pgdf_path, out_path, uids=[1861000009, 1861000001, 5]) == 2
+    after = PGDF(out_path)
+    assert [o.pam.UID for o in after.module.objects] == [1861000001, 1861000009]
+    assert after.header.data_millis == PGDF(pgdf_path).header.data_millis
+
+    assert subset_pgdf(pgdf_path, out_path, uids=[]) == 0
+    after = PGDF(out_path)
+    assert len(after.module) == 0
+    assert after.footer.lowest_UID == -1
+
+
+def test_merge(write_gemini_pgdf, tmp_path):
+    paths = [
+        write_gemini_pgdf(
+            name=str(hour) + ".pgdf",
+            num_objects=3 + hour,
+            start_millis=1658448004000 + hour * 3600000,
+            first_uid=1861000000 + hour * 100,
+            seed=hour,
+        )
+        for hour in range(3)
+    ]
+    out_path = str(tmp_path / "day.pgdf")
+
+    assert merge_pgdf(list(reversed(paths)), out_path) == 12
+
+    parts = [PGDF(path) for path in paths]
+    merged = PGDF(out_path)
+    objects = [obj for p in parts for obj in p.module.objects]
+    same_objects(merged.module.objects, objects)
+    assert merged.header.data_millis == parts[0].header.data_millis
+    assert merged.footer.data_millis == parts[-1].footer.data_millis
+    assert merged.footer.num_objects == 12
+    assert (merged.footer.lowest_UID, merged.footer.highest_UID) == (
+        1861000000,
+        1861000204,
+    )
+    assert merged.footer.file_length == os.path.getsize(out_path)
+
+    other = write_gemini_pgdf(name="other.pgdf", stream_name="Other")
+
+    with pytest.raises(ValueError):
+        merge_pgdf([paths[0], other], out_path)
@@ -0,0 +1,39 @@
+""" Tests for the time utilities."""
+
+import datetime
+
+import numpy as np
+
+from pypam.util.time import (
+    as_millis,
+    epoch,
+    millis_to_datetime,
+    millis_to_datetime64,
+    nanos_to_datetime64,
+)
+
+
+def test_millis_to_datetime():
+    assert epoch() is epoch()
+    dt = millis_to_datetime(1658448004123)
+    assert dt == datetime.datetime(
+        2022, 7, 22, 0, 0, 4, 123000, tzinfo=datetime.timezone.utc
+    )
+    assert millis_to_datetime(np.int64(0), zone="GMT") == epoch(zone="GMT")
+
+
+def test_datetime64():
+    times = millis_to_datetime64([0, 1658448004123])
+    assert times.dtype == np.dtype("datetime64[ms]")
+    assert times[1] == np.datetime64("2022-07-22T00:00:04.123")
+
+    times = nanos_to_datetime64([1658448004123456789])
+    assert times.dtype == np.dtype("datetime64[ns]")
+    assert times[0] == np.datetime64("2022-07-22T00:00:04.123456789")
+
+
+def test_as_millis():
+    assert as_millis(1658448004123) == 1658448004123
+    assert as_millis(millis_to_datetime(1658448004123)) == 1658448004123
+    assert as_millis(datetime.datetime(2022, 7, 22, 0, 0, 4, 123000)) == 1658448004123
+    assert as_millis(np.datetime64("2022-07-22T00:00:04.123")) == 1658448004123
@@ -0,0 +1,53 @@
+"""Tests for the whistle and moan decoder."""
+
+import numpy as np
+
+from pypam.pgdf import PGDF
+from pypam.synthetic import pack_whistle, write_pgdf
+from pypam.whistle import contour_offsets
+
+
+def contour(num_slices, first_bin, peaks_per_slice=1):
+    slices = np.arange(100, 100 + num_slices)
+    peaks = [
+        [
+            [first_bin + i - 2, first_bin + i + j * 10, first_bin + i + 3, 0]
+            for j in range(peaks_per_slice)
+        ]
+        for i in range(num_slices)
+    ]
+    return pack_whistle(slices, peaks, amplitude=95.5)
+
+
+def test_whistles(tmp_path):
+    data = [contour(4, 50), contour(3, 80, peaks_per_slice=2), contour(1, 20)]
+    objects = [
+        {"millis": 1658448004000 + i, "data": d, "uid": 1861000000 + i}
+        for i, d in enumerate(data)
+    ]
+    pgdf_path = write_pgdf(
+        tmp_path / "wm.pgdf", "WhistlesMoans", objects, module_version=2
+    )
+    module = PGDF(pgdf_path).module
+    whistles = [o.data for o in module.objects]
+
+    assert [w.num_slices for w in whistles] == [4, 3, 1]
+    assert whistles[0].amplitude == 95.5
+    assert list(whistles[0].slice_numbers) == [100, 101, 102, 103]
+    assert list(whistles[0].peak_bin) == [50, 51, 52, 53]
+    assert list(whistles[0].contour_width) == [6] * 4
+
+    # Slices with more than one peak keep them all
+    assert list(whistles[1].num_peaks) == [2, 2, 2]
+    assert whistles[1].peaks.shape == (6, 4)
+    assert list(whistles[1].peak_bin) == [80, 81, 82]
+
+    columns = module.to_columns()
+    contours = columns.tables["contours"]
+    offsets = contour_offsets(columns)
+    assert list(offsets) == [0, 4, 7, 8]
+    assert list(contours["UID"][3:5]) == [1861000000, 1861000001]
+    mean_peak = (
+        np.add.reduceat(contours["peak_bin"], offsets[:-1]) / columns["num_slices"]
+    )
+    assert list(mean_peak) == [51.5, 81.0, 20.0]